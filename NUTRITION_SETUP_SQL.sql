@@ -67,6 +67,8 @@ CREATE INDEX IF NOT EXISTS idx_nutrition_meals_plan ON public.nutrition_meals(pl
 CREATE INDEX IF NOT EXISTS idx_coach_chat_user ON public.coach_chat(user_id);
 CREATE INDEX IF NOT EXISTS idx_coach_chat_coach ON public.coach_chat(coach_id);
 CREATE INDEX IF NOT EXISTS idx_coach_chat_created ON public.coach_chat(created_at DESC);
+-- Keyset pagination (created_at, id) for coach chat history
+CREATE INDEX IF NOT EXISTS idx_coach_chat_user_created ON public.coach_chat(user_id, created_at DESC, id DESC);
 
 -- =====================================================
 -- 5. ROW LEVEL SECURITY
@@ -144,3 +146,210 @@ CREATE POLICY "Service role full access nutrition_meals" ON public.nutrition_mea
 CREATE POLICY "Service role full access coach_chat" ON public.coach_chat
     FOR ALL USING (true) WITH CHECK (true);
 
+-- =====================================================
+-- 8. MATERIALIZED VIEWS (coach dashboard)
+-- =====================================================
+-- Refreshed by the backend through refresh_materialized_view() (defined in
+-- SUPABASE_SETUP_SQL.txt); the coach endpoints fall back to live queries when stale
+-- or marked dirty by a write that is not in the view yet.
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_coach_unread AS
+SELECT
+    user_id,
+    COUNT(*) FILTER (WHERE sender_role = 'user' AND NOT is_read)::INTEGER AS unread_from_user,
+    COUNT(*) FILTER (WHERE sender_role = 'coach' AND NOT is_read)::INTEGER AS unread_from_coach,
+    MAX(created_at) AS last_message_at
+FROM public.coach_chat
+GROUP BY user_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_coach_unread_user ON public.mv_coach_unread(user_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_active_nutrition_plan AS
+SELECT DISTINCT ON (user_id)
+    user_id,
+    id AS plan_id,
+    name,
+    daily_calories,
+    updated_at
+FROM public.nutrition_plans
+WHERE is_active = true
+ORDER BY user_id, updated_at DESC;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_active_nutrition_plan_user ON public.mv_active_nutrition_plan(user_id);
+
+-- Materialized views bypass RLS: keep them backend-only
+REVOKE ALL ON public.mv_coach_unread FROM anon, authenticated;
+REVOKE ALL ON public.mv_active_nutrition_plan FROM anon, authenticated;
+
+-- =====================================================
+-- 9. BULK MEAL EDITS
+-- =====================================================
+-- Bulk meal edits: deletes plus a multi-row upsert in one transaction.
+-- p_upserts holds full meal rows (with "id" for existing meals); meals of
+-- other plans are never touched.
+CREATE OR REPLACE FUNCTION public.apply_meal_batch(p_plan_id UUID, p_upserts JSONB, p_delete_ids UUID[])
+RETURNS INTEGER AS $$
+DECLARE
+    affected INTEGER := 0;
+    upserted INTEGER;
+BEGIN
+    DELETE FROM public.nutrition_meals
+    WHERE plan_id = p_plan_id AND id = ANY(COALESCE(p_delete_ids, '{}'));
+    GET DIAGNOSTICS affected = ROW_COUNT;
+
+    INSERT INTO public.nutrition_meals (
+        id, plan_id, meal_type, meal_order, name, description, day_of_week,
+        calories, protein_grams, carbs_grams, fat_grams, time_suggestion, foods
+    )
+    SELECT
+        COALESCE(m.id, gen_random_uuid()), p_plan_id, m.meal_type, COALESCE(m.meal_order, 0), m.name,
+        m.description, m.day_of_week, m.calories, m.protein_grams, m.carbs_grams, m.fat_grams,
+        m.time_suggestion, COALESCE(m.foods, '[]'::jsonb)
+    FROM jsonb_to_recordset(COALESCE(p_upserts, '[]'::jsonb)) AS m(
+        id UUID, meal_type VARCHAR, meal_order INTEGER, name VARCHAR, description TEXT,
+        day_of_week VARCHAR, calories INTEGER, protein_grams NUMERIC, carbs_grams NUMERIC,
+        fat_grams NUMERIC, time_suggestion VARCHAR, foods JSONB
+    )
+    ON CONFLICT (id) DO UPDATE SET
+        meal_type = EXCLUDED.meal_type,
+        meal_order = EXCLUDED.meal_order,
+        name = EXCLUDED.name,
+        description = EXCLUDED.description,
+        day_of_week = EXCLUDED.day_of_week,
+        calories = EXCLUDED.calories,
+        protein_grams = EXCLUDED.protein_grams,
+        carbs_grams = EXCLUDED.carbs_grams,
+        fat_grams = EXCLUDED.fat_grams,
+        time_suggestion = EXCLUDED.time_suggestion,
+        foods = EXCLUDED.foods,
+        updated_at = NOW()
+    WHERE public.nutrition_meals.plan_id = p_plan_id;
+    GET DIAGNOSTICS upserted = ROW_COUNT;
+
+    RETURN affected + upserted;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+REVOKE ALL ON FUNCTION public.apply_meal_batch(UUID, JSONB, UUID[]) FROM anon, authenticated;
+
+-- =====================================================
+-- 10. PLAN TEMPLATES AND CLONING
+-- =====================================================
+-- Templates are plans owned by the coach (never active); plans cloned from a
+-- plan or template remember their source.
+ALTER TABLE public.nutrition_plans ADD COLUMN IF NOT EXISTS is_template BOOLEAN DEFAULT false;
+ALTER TABLE public.nutrition_plans ADD COLUMN IF NOT EXISTS template_id UUID REFERENCES public.nutrition_plans(id) ON DELETE SET NULL;
+CREATE INDEX IF NOT EXISTS idx_nutrition_plans_templates ON public.nutrition_plans(user_id) WHERE is_template;
+
+-- Copies a plan and all its meals to many users with two set-based inserts.
+-- With p_activate the users' current active plans are deactivated first.
+CREATE OR REPLACE FUNCTION public.clone_nutrition_plan(
+    p_plan_id UUID, p_user_ids UUID[], p_coach_id UUID DEFAULT NULL, p_activate BOOLEAN DEFAULT true
+)
+RETURNS TABLE(cloned_user_id UUID, cloned_plan_id UUID) AS $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.nutrition_plans WHERE id = p_plan_id) THEN
+        RAISE EXCEPTION 'Plan % not found', p_plan_id;
+    END IF;
+
+    IF p_activate THEN
+        UPDATE public.nutrition_plans SET is_active = false
+        WHERE user_id = ANY(p_user_ids) AND is_active AND NOT COALESCE(is_template, false);
+    END IF;
+
+    RETURN QUERY
+    WITH new_plans AS (
+        INSERT INTO public.nutrition_plans (
+            user_id, coach_id, name, description, daily_calories, protein_grams,
+            carbs_grams, fat_grams, notes, is_active, is_template, template_id
+        )
+        SELECT
+            u.id, COALESCE(p_coach_id, src.coach_id), src.name, src.description, src.daily_calories,
+            src.protein_grams, src.carbs_grams, src.fat_grams, src.notes, p_activate, false, src.id
+        FROM public.nutrition_plans src
+        CROSS JOIN (SELECT DISTINCT unnest(p_user_ids) AS id) u
+        WHERE src.id = p_plan_id
+        RETURNING id, user_id
+    ), new_meals AS (
+        INSERT INTO public.nutrition_meals (
+            plan_id, meal_type, meal_order, name, description, day_of_week, calories,
+            protein_grams, carbs_grams, fat_grams, time_suggestion, foods
+        )
+        SELECT
+            np.id, m.meal_type, m.meal_order, m.name, m.description, m.day_of_week, m.calories,
+            m.protein_grams, m.carbs_grams, m.fat_grams, m.time_suggestion, m.foods
+        FROM new_plans np
+        CROSS JOIN public.nutrition_meals m
+        WHERE m.plan_id = p_plan_id
+    )
+    SELECT np.user_id, np.id FROM new_plans np;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+REVOKE ALL ON FUNCTION public.clone_nutrition_plan(UUID, UUID[], UUID, BOOLEAN) FROM anon, authenticated;
+
+-- =====================================================
+-- 11. UNREAD COUNTS
+-- =====================================================
+-- Unread messages per chat and reader, in one grouped query (seeds the backend's
+-- in-process unread counters). "unread_for_user" counts the coach's unread messages.
+CREATE INDEX IF NOT EXISTS idx_coach_chat_unread_only ON public.coach_chat(user_id, sender_role) WHERE NOT is_read;
+
+CREATE OR REPLACE FUNCTION public.coach_chat_unread_counts(p_user_ids UUID[] DEFAULT NULL)
+RETURNS TABLE(chat_user_id UUID, unread_for_user INTEGER, unread_for_coach INTEGER) AS $$
+    SELECT
+        user_id,
+        (COUNT(*) FILTER (WHERE sender_role = 'coach'))::INTEGER,
+        (COUNT(*) FILTER (WHERE sender_role = 'user'))::INTEGER
+    FROM public.coach_chat
+    WHERE NOT is_read AND (p_user_ids IS NULL OR user_id = ANY(p_user_ids))
+    GROUP BY user_id;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public, pg_temp;
+
+REVOKE ALL ON FUNCTION public.coach_chat_unread_counts(UUID[]) FROM anon, authenticated;
+
+-- =====================================================
+-- 12. CHAT SEARCH
+-- =====================================================
+-- Spanish-stemmed search over a coach chat, ranked and paged by
+-- (rank, created_at, id) like search_chat_messages() in SUPABASE_SETUP_SQL.txt.
+ALTER TABLE public.coach_chat ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('spanish', COALESCE(message, ''))) STORED;
+
+-- user_id leads the index (btree_gin) so a search only touches that user's rows
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+DROP INDEX IF EXISTS public.idx_coach_chat_search;
+CREATE INDEX IF NOT EXISTS idx_coach_chat_user_search ON public.coach_chat USING GIN (user_id, search_tsv);
+
+CREATE OR REPLACE FUNCTION public.search_coach_chat(
+    p_user_id UUID,
+    p_query TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_before_rank NUMERIC DEFAULT NULL,
+    p_before_created TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_before_id UUID DEFAULT NULL
+)
+RETURNS TABLE(id UUID, sender_role TEXT, snippet TEXT, rank NUMERIC, created_at TIMESTAMP WITH TIME ZONE) AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('spanish', p_query) AS query
+    ),
+    hits AS (
+        SELECT c.id, c.sender_role::TEXT AS sender_role, c.message, c.created_at,
+               ROUND(ts_rank_cd(c.search_tsv, q.query)::NUMERIC, 6) AS rank
+        FROM public.coach_chat c, q
+        WHERE c.user_id = p_user_id AND c.search_tsv @@ q.query
+    ),
+    page AS (
+        SELECT * FROM hits h
+        WHERE p_before_rank IS NULL
+           OR (h.rank, h.created_at, h.id) < (p_before_rank, p_before_created, p_before_id)
+        ORDER BY h.rank DESC, h.created_at DESC, h.id DESC
+        LIMIT p_limit
+    )
+    SELECT page.id, page.sender_role,
+           ts_headline('spanish', page.message, q.query, 'StartSel=**, StopSel=**, MaxWords=24, MinWords=8, MaxFragments=2'),
+           page.rank, page.created_at
+    FROM page, q
+    ORDER BY page.rank DESC, page.created_at DESC, page.id DESC;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public, pg_temp;
+
+REVOKE ALL ON FUNCTION public.search_coach_chat(UUID, TEXT, INTEGER, NUMERIC, TIMESTAMP WITH TIME ZONE, UUID) FROM anon, authenticated;
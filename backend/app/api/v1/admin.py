@@ -5,26 +5,141 @@ Handles admin-only operations for user management and insights
 
 from fastapi import APIRouter, HTTPException
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import asyncio
 import json
 from app.services.supabase_service import supabase_service
+from app.services.rollup_service import rollup_service
+from app.services.matview_service import matview_service
+from app.core.responses import trusted_json
 
 router = APIRouter()
 
 
+# Longest evolution window the admin dashboard may request
+MAX_EVOLUTION_DAYS = 1100
+
+
+def _live_rollups(start: date, end: date) -> List[Dict]:
+    """Fallback when rollups are unavailable: count workouts per user/day straight from progress"""
+    result = supabase_service.select("progress.activity")\
+        .gte("workout_date", start.isoformat())\
+        .lte("workout_date", end.isoformat())\
+        .execute()
+    rollups = {}
+    for p in result.data or []:
+        key = (p.get("user_id"), str(p.get("workout_date") or "")[:10])
+        rollup = rollups.setdefault(key, {"user_id": key[0], "day": key[1], "workouts": 0, "sets": 0, "volume": 0})
+        rollup["workouts"] += 1
+    return list(rollups.values())
+
+
+def _load_user_rollups(start: date, end: date) -> Tuple[List[Dict], str]:
+    """Per-user daily rollups, falling back to a live progress scan"""
+    try:
+        return rollup_service.get_user_rollups(start, end), "rollups"
+    except Exception as e:
+        print(f"Activity rollups unavailable, scanning progress: {e}")
+        return _live_rollups(start, end), "live"
+
+
+def _load_global_rollups(start: date, end: date) -> Tuple[List[Dict], str]:
+    """Global daily totals, falling back to aggregating a live progress scan"""
+    try:
+        return rollup_service.get_global_rollups(start, end), "rollups"
+    except Exception as e:
+        print(f"Global activity rollups unavailable, scanning progress: {e}")
+        days = {}
+        for r in _live_rollups(start, end):
+            day = days.setdefault(r["day"], {"day": r["day"], "workouts": 0, "sets": 0, "volume": 0, "active_users": 0})
+            day["workouts"] += r["workouts"]
+            day["active_users"] += 1
+        return list(days.values()), "live"
+
+
+def _load_client_snapshot() -> Tuple[List[Dict], Dict, Dict, Dict, Optional[Dict], str]:
+    """
+    Load users plus their streak, body composition, profile and last workout
+
+    Reads the mv_client_summary materialized view while it is fresh (one query);
+    otherwise runs the live per-table queries. The last-workout map is None in the
+    live path, where it is looked up per user only when needed.
+
+    Returns:
+        (users, streaks_map, body_comp_map, profiles_map, last_workout_map, source)
+    """
+    if matview_service.is_fresh("mv_client_summary"):
+        try:
+            rows = supabase_service.select("mv_client_summary.full").execute().data or []
+            users = [
+                {k: r.get(k) for k in ("email", "full_name", "fitness_level", "goals", "created_at")} | {"id": r["user_id"]}
+                for r in rows
+            ]
+            streaks_map = {r["user_id"]: r for r in rows}
+            body_comp_map = {r["user_id"]: r for r in rows}
+            profiles_map = {
+                r["user_id"]: {"full_name": r.get("profile_name"), "goal": r.get("profile_goal"), "phone": r.get("phone")}
+                for r in rows
+            }
+            last_workout_map = {r["user_id"]: r.get("last_workout_date") for r in rows}
+            return users, streaks_map, body_comp_map, profiles_map, last_workout_map, "views"
+        except Exception as e:
+            print(f"Client summary view unavailable, using live queries: {e}")
+
+    # Get all users
+    users_result = supabase_service.select("users.admin_list").execute()
+    users = users_result.data if users_result.data else []
+
+    # Get all streaks
+    streaks_result = supabase_service.select("streaks.full").execute()
+    streaks_data = streaks_result.data if streaks_result.data else []
+    streaks_map = {s["user_id"]: s for s in streaks_data}
+
+    # Get all body composition data (latest per user)
+    body_comp_result = supabase_service.select("body_composition.latest")\
+        .order("date", desc=True)\
+        .execute()
+    body_comp_data = body_comp_result.data if body_comp_result.data else []
+
+    # Get latest body comp per user
+    body_comp_map = {}
+    for bc in body_comp_data:
+        user_id = bc.get("user_id")
+        if user_id and user_id not in body_comp_map:
+            body_comp_map[user_id] = bc
+
+    # Get user profiles for additional data
+    profiles_result = supabase_service.select("user_profiles.admin_list").execute()
+    profiles_data = profiles_result.data if profiles_result.data else []
+    profiles_map = {p["user_id"]: p for p in profiles_data}
+
+    return users, streaks_map, body_comp_map, profiles_map, None, "live"
+
+
 @router.get("/admin/users")
-async def get_all_users():
+async def get_all_users(days: int = 30, start: Optional[date] = None, end: Optional[date] = None):
     """
     Get all users with detailed metrics and insights
     Returns comprehensive data for admin dashboard
+
+    Args:
+        days: Evolution chart window ending today (default 30; e.g. 90 or 365)
+        start: Optional evolution range start (overrides days)
+        end: Optional evolution range end (default today)
     """
     try:
         if not supabase_service.is_connected():
             raise HTTPException(status_code=503, detail="Database not connected")
 
-        # Get all users
-        users_result = supabase_service.supabase.table("users").select("*").execute()
-        users = users_result.data if users_result.data else []
+        evolution_end = end or date.today()
+        evolution_start = start or evolution_end - timedelta(days=max(1, days) - 1)
+        if evolution_start > evolution_end:
+            raise HTTPException(status_code=400, detail="start must be on or before end")
+        if (evolution_end - evolution_start).days + 1 > MAX_EVOLUTION_DAYS:
+            raise HTTPException(status_code=400, detail=f"Evolution range is limited to {MAX_EVOLUTION_DAYS} days")
+
+        users, streaks_map, body_comp_map, profiles_map, last_workout_map, clients_source = \
+            _load_client_snapshot()
 
         # Get current week boundaries
         today = date.today()
@@ -34,48 +149,12 @@ async def get_all_users():
         last_week_start = week_start - timedelta(days=7)
         last_week_start_str = last_week_start.isoformat()
 
-        # Get all progress records for this week and last week
-        progress_result = supabase_service.supabase.table("progress")\
-            .select("*")\
-            .gte("workout_date", last_week_start_str)\
-            .lte("workout_date", today_str)\
-            .execute()
-        all_progress = progress_result.data if progress_result.data else []
-        week_progress = [p for p in all_progress if p.get("workout_date", "") >= week_start_str]
-        last_week_progress = [p for p in all_progress if last_week_start_str <= p.get("workout_date", "") < week_start_str]
-
-        # Get all streaks
-        streaks_result = supabase_service.supabase.table("streaks").select("*").execute()
-        streaks_data = streaks_result.data if streaks_result.data else []
-        streaks_map = {s["user_id"]: s for s in streaks_data}
-
-        # Get all body composition data (latest per user)
-        body_comp_result = supabase_service.supabase.table("body_composition")\
-            .select("*")\
-            .order("date", desc=True)\
-            .execute()
-        body_comp_data = body_comp_result.data if body_comp_result.data else []
-        
-        # Get latest body comp per user
-        body_comp_map = {}
-        for bc in body_comp_data:
-            user_id = bc.get("user_id")
-            if user_id and user_id not in body_comp_map:
-                body_comp_map[user_id] = bc
-
-        # Get user profiles for additional data
-        profiles_result = supabase_service.supabase.table("user_profiles").select("*").execute()
-        profiles_data = profiles_result.data if profiles_result.data else []
-        profiles_map = {p["user_id"]: p for p in profiles_data}
-
-        # Get all progress for evolution charts (last 30 days)
+        # Per-user daily rollups covering last week, this week and the last 30 days
         month_start = today - timedelta(days=30)
-        month_progress = supabase_service.supabase.table("progress")\
-            .select("*")\
-            .gte("workout_date", month_start.isoformat())\
-            .lte("workout_date", today_str)\
-            .execute()
-        month_progress_data = month_progress.data if month_progress.data else []
+        user_rollups, _ = _load_user_rollups(min(last_week_start, month_start), today)
+        week_progress = [r for r in user_rollups if r.get("day", "") >= week_start_str]
+        last_week_progress = [r for r in user_rollups if last_week_start_str <= r.get("day", "") < week_start_str]
+        month_progress_data = [r for r in user_rollups if r.get("day", "") >= month_start.isoformat()]
 
         # Process each user
         clients = []
@@ -101,10 +180,10 @@ async def get_all_users():
             user_month_progress = [p for p in month_progress_data if p.get("user_id") == user_id]
             
             # Calculate weekly metrics
-            workouts_week = len(user_progress)
-            volume_week = sum(float(p.get("total_volume", 0) or 0) for p in user_progress)
-            workouts_last_week = len(user_last_week)
-            volume_last_week = sum(float(p.get("total_volume", 0) or 0) for p in user_last_week)
+            workouts_week = sum(int(r.get("workouts", 0) or 0) for r in user_progress)
+            volume_week = sum(float(r.get("volume", 0) or 0) for r in user_progress)
+            workouts_last_week = sum(int(r.get("workouts", 0) or 0) for r in user_last_week)
+            volume_last_week = sum(float(r.get("volume", 0) or 0) for r in user_last_week)
             
             # Calculate trends
             workouts_trend = ((workouts_week - workouts_last_week) / workouts_last_week * 100) if workouts_last_week > 0 else (100 if workouts_week > 0 else 0)
@@ -114,8 +193,8 @@ async def get_all_users():
             last_workout = None
             last_workout_date = None
             if user_progress:
-                latest = max(user_progress, key=lambda x: x.get("workout_date", ""))
-                last_workout_date = latest.get("workout_date")
+                latest = max(user_progress, key=lambda x: x.get("day", ""))
+                last_workout_date = latest.get("day")
                 if last_workout_date:
                     try:
                         workout_date = datetime.fromisoformat(last_workout_date.replace('Z', '+00:00')).date()
@@ -130,26 +209,27 @@ async def get_all_users():
                         last_workout = "Reciente"
             else:
                 # Try to get any workout
-                any_progress = supabase_service.supabase.table("progress")\
-                    .select("workout_date")\
-                    .eq("user_id", user_id)\
-                    .order("workout_date", desc=True)\
-                    .limit(1)\
-                    .execute()
-                if any_progress.data:
-                    last_workout_date = any_progress.data[0].get("workout_date")
-                    if last_workout_date:
-                        try:
-                            workout_date = datetime.fromisoformat(last_workout_date.replace('Z', '+00:00')).date()
-                            days_ago = (today - workout_date).days
-                            if days_ago == 0:
-                                last_workout = "Hoy"
-                            elif days_ago == 1:
-                                last_workout = "Ayer"
-                            else:
-                                last_workout = f"Hace {days_ago} días"
-                        except:
-                            last_workout = "Reciente"
+                if last_workout_map is not None:
+                    last_workout_date = last_workout_map.get(user_id)
+                else:
+                    any_progress = supabase_service.select("progress.workout_dates")\
+                        .eq("user_id", user_id)\
+                        .order("workout_date", desc=True)\
+                        .limit(1)\
+                        .execute()
+                    last_workout_date = any_progress.data[0].get("workout_date") if any_progress.data else None
+                if last_workout_date:
+                    try:
+                        workout_date = datetime.fromisoformat(str(last_workout_date).replace('Z', '+00:00')).date()
+                        days_ago = (today - workout_date).days
+                        if days_ago == 0:
+                            last_workout = "Hoy"
+                        elif days_ago == 1:
+                            last_workout = "Ayer"
+                        else:
+                            last_workout = f"Hace {days_ago} días"
+                    except:
+                        last_workout = "Reciente"
                 else:
                     last_workout = "Sin entrenos"
 
@@ -176,8 +256,8 @@ async def get_all_users():
                 active_users += 1
 
             # Calculate monthly stats for evolution
-            monthly_workouts = len(user_month_progress)
-            monthly_volume = sum(float(p.get("total_volume", 0) or 0) for p in user_month_progress)
+            monthly_workouts = sum(int(r.get("workouts", 0) or 0) for r in user_month_progress)
+            monthly_volume = sum(float(r.get("volume", 0) or 0) for r in user_month_progress)
 
             clients.append({
                 "id": user_id,
@@ -230,47 +310,89 @@ async def get_all_users():
             "volumeLastWeek": round(total_volume_last_week, 1)
         }
 
-        # Get evolution data for charts (last 30 days grouped by day)
-        evolution_data = {}
-        for p in month_progress_data:
-            workout_date = p.get("workout_date", "")
-            if workout_date:
-                try:
-                    date_obj = datetime.fromisoformat(workout_date.replace('Z', '+00:00')).date()
-                    date_str = date_obj.isoformat()
-                    if date_str not in evolution_data:
-                        evolution_data[date_str] = {"workouts": 0, "volume": 0, "users": set()}
-                    evolution_data[date_str]["workouts"] += 1
-                    evolution_data[date_str]["volume"] += float(p.get("total_volume", 0) or 0)
-                    evolution_data[date_str]["users"].add(p.get("user_id"))
-                except:
-                    pass
-
-        # Format evolution data for chart
+        # Evolution chart straight from the global daily rollups, zero-filled
+        global_rollups, evolution_source = _load_global_rollups(evolution_start, evolution_end)
+        evolution_data = {str(r.get("day"))[:10]: r for r in global_rollups}
         evolution_chart = []
-        for i in range(30):
-            day = today - timedelta(days=29-i)
-            day_str = day.isoformat()
-            data = evolution_data.get(day_str, {"workouts": 0, "volume": 0, "users": set()})
+        for i in range((evolution_end - evolution_start).days + 1):
+            day_str = (evolution_start + timedelta(days=i)).isoformat()
+            data = evolution_data.get(day_str, {})
             evolution_chart.append({
                 "date": day_str,
-                "workouts": data["workouts"],
-                "volume": round(data["volume"], 1),
-                "activeUsers": len(data["users"])
+                "workouts": int(data.get("workouts", 0) or 0),
+                "volume": round(float(data.get("volume", 0) or 0), 1),
+                "activeUsers": int(data.get("active_users", 0) or 0)
             })
 
-        return {
+        # Built from DB rows and plain numbers: skip re-encoding/validation
+        return trusted_json({
             "success": True,
             "kpis": kpis,
             "clients": clients,
-            "evolution": evolution_chart
-        }
+            "evolution": evolution_chart,
+            "evolutionRange": {
+                "start": evolution_start.isoformat(),
+                "end": evolution_end.isoformat(),
+                "source": evolution_source
+            },
+            "clientsSource": clients_source
+        })
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_all_users: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching users: {str(e)}")
 
 
+@router.post("/admin/rollups/rebuild")
+async def rebuild_activity_rollups(days: int = 365, start: Optional[date] = None, end: Optional[date] = None):
+    """
+    Rebuild daily activity rollups from progress (backfill or repair)
+
+    Args:
+        days: Window ending today to rebuild (default 365)
+        start: Optional range start (overrides days)
+        end: Optional range end (default today)
+
+    Returns:
+        Number of progress rows scanned and rollups written
+    """
+    try:
+        if not supabase_service.is_connected():
+            raise HTTPException(status_code=503, detail="Database not connected")
+
+        range_end = end or date.today()
+        range_start = start or range_end - timedelta(days=max(1, days) - 1)
+        if range_start > range_end:
+            raise HTTPException(status_code=400, detail="start must be on or before end")
+
+        stats = await asyncio.to_thread(rollup_service.rebuild, range_start, range_end)
+        return {
+            "success": True,
+            "start": range_start.isoformat(),
+            "end": range_end.isoformat(),
+            **stats
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error rebuilding activity rollups: {e}")
+        raise HTTPException(status_code=500, detail=f"Error rebuilding activity rollups: {str(e)}")
+
+
+@router.get("/admin/views/status")
+async def get_materialized_view_status():
+    """
+    Refresh state of the dashboard materialized views
+
+    Returns:
+        Per view: age in seconds, whether readers use it, and whether a write marked it dirty
+    """
+    return {"success": True, "views": matview_service.status()}
+
+
 @router.get("/admin/user/{user_id}/details")
 async def get_user_details(user_id: str):
     """
@@ -282,8 +404,7 @@ async def get_user_details(user_id: str):
             raise HTTPException(status_code=503, detail="Database not connected")
 
         # Get user
-        user_result = supabase_service.supabase.table("users")\
-            .select("*")\
+        user_result = supabase_service.select("users.account")\
             .eq("id", user_id)\
             .single()\
             .execute()
@@ -295,8 +416,7 @@ async def get_user_details(user_id: str):
 
         # Get complete profile
         try:
-            profile_result = supabase_service.supabase.table("user_profiles")\
-                .select("*")\
+            profile_result = supabase_service.select("user_profiles.full")\
                 .eq("user_id", user_id)\
                 .single()\
                 .execute()
@@ -306,8 +426,7 @@ async def get_user_details(user_id: str):
             profile = {}
 
         # Get ALL progress records with full details
-        progress_result = supabase_service.supabase.table("progress")\
-            .select("*")\
+        progress_result = supabase_service.select("progress.detail")\
             .eq("user_id", user_id)\
             .order("workout_date", desc=True)\
             .execute()
@@ -315,8 +434,7 @@ async def get_user_details(user_id: str):
 
         # Get streak
         try:
-            streak_result = supabase_service.supabase.table("streaks")\
-                .select("*")\
+            streak_result = supabase_service.select("streaks.full")\
                 .eq("user_id", user_id)\
                 .single()\
                 .execute()
@@ -326,24 +444,21 @@ async def get_user_details(user_id: str):
             streak = {}
 
         # Get ALL body composition history
-        body_comp_result = supabase_service.supabase.table("body_composition")\
-            .select("*")\
+        body_comp_result = supabase_service.select("body_composition.history")\
             .eq("user_id", user_id)\
             .order("date", desc=True)\
             .execute()
         body_comp_history = body_comp_result.data if body_comp_result.data else []
 
         # Get progress photos
-        photos_result = supabase_service.supabase.table("progress_photos")\
-            .select("*")\
+        photos_result = supabase_service.select("progress_photos.full")\
             .eq("user_id", user_id)\
             .order("taken_at", desc=True)\
             .execute()
         photos = photos_result.data if photos_result.data else []
 
         # Get achievements
-        achievements_result = supabase_service.supabase.table("achievements")\
-            .select("*")\
+        achievements_result = supabase_service.select("achievements.full")\
             .eq("user_id", user_id)\
             .order("unlocked_at", desc=True)\
             .execute()
@@ -352,8 +467,7 @@ async def get_user_details(user_id: str):
         # Get daily health data (last 30 days)
         today = date.today()
         month_start = today - timedelta(days=30)
-        health_result = supabase_service.supabase.table("daily_health_data")\
-            .select("*")\
+        health_result = supabase_service.select("daily_health_data.full")\
             .eq("user_id", user_id)\
             .gte("date", month_start.isoformat())\
             .order("date", desc=True)\
@@ -361,8 +475,7 @@ async def get_user_details(user_id: str):
         health_data = health_result.data if health_result.data else []
 
         # Get workout days (calendar marks)
-        workout_days_result = supabase_service.supabase.table("workout_days")\
-            .select("*")\
+        workout_days_result = supabase_service.select("workout_days.full")\
             .eq("user_id", user_id)\
             .order("date", desc=True)\
             .limit(90)\
@@ -370,15 +483,13 @@ async def get_user_details(user_id: str):
         workout_days = workout_days_result.data if workout_days_result.data else []
 
         # Get habits
-        habits_result = supabase_service.supabase.table("habits")\
-            .select("*")\
+        habits_result = supabase_service.select("habits.full")\
             .eq("user_id", user_id)\
             .execute()
         habits = habits_result.data if habits_result.data else []
 
         # Get habit logs (last 30 days)
-        habit_logs_result = supabase_service.supabase.table("habit_logs")\
-            .select("*, habits(*)")\
+        habit_logs_result = supabase_service.select("habit_logs.with_habit")\
             .eq("user_id", user_id)\
             .gte("log_date", month_start.isoformat())\
             .order("log_date", desc=True)\
@@ -386,13 +497,13 @@ async def get_user_details(user_id: str):
         habit_logs = habit_logs_result.data if habit_logs_result.data else []
 
         # Get chat conversations count
-        conversations_result = supabase_service.supabase.table("chat_conversations")\
-            .select("id", count="exact")\
+        conversations_result = supabase_service.count_rows("chat_conversations")\
             .eq("user_id", user_id)\
             .execute()
         conversations_count = conversations_result.count if hasattr(conversations_result, 'count') else 0
 
-        return {
+        # Raw DB rows: skip re-encoding/validation
+        return trusted_json({
             "success": True,
             "user": user,
             "profile": profile,
@@ -406,7 +517,7 @@ async def get_user_details(user_id: str):
             "habits": habits,
             "habitLogs": habit_logs,
             "conversationsCount": conversations_count
-        }
+        })
 
     except HTTPException:
         raise
@@ -3,8 +3,10 @@ Chat API Endpoints
 Handles AI assistant chat interactions
 """
 
-from fastapi import APIRouter, HTTPException
+import uuid
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response
 from datetime import datetime
+from typing import Optional
 from app.models.schemas import (
     ChatRequest, ChatResponse,
     ConversationCreateRequest, ConversationUpdateRequest,
@@ -12,30 +14,58 @@ from app.models.schemas import (
 )
 from app.services.openai_service import openai_service
 from app.services.supabase_service import supabase_service
+from app.services.chat_search_service import chat_search_service
+from app.services.chat_context_service import chat_context_service
+from app.services.conversation_summary_service import conversation_summary_service
+from app.services.rate_limit_service import rate_limit_service
+from app.core.http_cache import versioned_etag, etag_matches, not_modified, with_etag
+from app.core.pagination import clamp_limit
 
 router = APIRouter()
 
 
+def _index_unsaved(request: ChatRequest, role: str, content: str) -> None:
+    """Keep a message that was not persisted (mock mode) searchable via /chat/search"""
+    chat_search_service.index_local(request.user_id, "ai", {
+        "id": str(uuid.uuid4()),
+        "conversation_id": (request.context or {}).get("session_id") if request.context else None,
+        "role": role,
+        "created_at": datetime.utcnow().isoformat()
+    }, content)
+
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
     """
     Chat with the AI fitness assistant
     
     Args:
         request: Chat request containing user_id and message
+        background_tasks: Runs the conversation title/summary update after the response
     
     Returns:
         ChatResponse with AI assistant's response
+    
+    Raises:
+        HTTPException 429: Rate or daily token limit hit and RATE_LIMIT_MODE is "reject"
     """
+    decision = rate_limit_service.check("chat", request.user_id)
+    if not decision["allowed"]:
+        if rate_limit_service.should_reject():
+            raise rate_limit_service.rejection(decision)
+        # Degraded turn: canned answer, not saved nor added to the conversation context
+        return ChatResponse(
+            message=openai_service.get_degraded_response([{"role": "user", "content": request.message}]),
+            user_id=request.user_id,
+            timestamp=datetime.utcnow(),
+            degraded=True
+        )
+    
     try:
-        # Get user's chat history
-        chat_history = supabase_service.get_chat_history(request.user_id, limit=5)
+        conversation_id = (request.context or {}).get("session_id") if request.context else None
         
-        # Convert chat history to OpenAI format
-        messages = [
-            {"role": msg.role, "content": msg.message}
-            for msg in chat_history
-        ]
+        # Recent turns of the active conversation (in-memory, warmed from the database once)
+        messages = chat_context_service.get(request.user_id, conversation_id)
         
         # Add current user message
         messages.append({
@@ -47,7 +77,7 @@ async def chat(request: ChatRequest):
         # Build user context with profile data (peso, grasa, músculo, objetivo...)
         profile_context = None
         try:
-            prof = supabase_service.get_profile(request.user_id)
+            prof = supabase_service.get_profile(request.user_id, cached=True)
             if prof:
                 profile_context = {
                     "weight_kg": prof.get("weight_kg"),
@@ -68,30 +98,42 @@ async def chat(request: ChatRequest):
         
         assistant_response = openai_service.get_chat_response(
             messages, 
-            user_context=user_context
+            user_context=user_context,
+            on_usage=lambda tokens: rate_limit_service.record_usage(request.user_id, tokens)
         )
         
+        chat_context_service.append(request.user_id, conversation_id, "user", request.message)
+        chat_context_service.append(request.user_id, conversation_id, "assistant", assistant_response)
+        
         # Save messages to database (non-blocking)
         try:
-            supabase_service.save_chat_message(
+            saved = supabase_service.save_chat_message(
                 user_id=request.user_id,
                 role="user",
                 content=request.message,
-                conversation_id=(request.context or {}).get("session_id") if request.context else None
+                conversation_id=conversation_id
             )
+            if saved is None:
+                _index_unsaved(request, "user", request.message)
         except Exception as e:
             print(f"Warning: Could not save user message: {e}")
         
         try:
-            supabase_service.save_chat_message(
+            saved = supabase_service.save_chat_message(
                 user_id=request.user_id,
                 role="assistant",
                 content=assistant_response,
-                conversation_id=(request.context or {}).get("session_id") if request.context else None
+                conversation_id=conversation_id
             )
+            if saved is None:
+                _index_unsaved(request, "assistant", assistant_response)
         except Exception as e:
             print(f"Warning: Could not save assistant message: {e}")
         
+        background_tasks.add_task(
+            conversation_summary_service.on_turn, request.user_id, conversation_id, assistant_response
+        )
+        
         return ChatResponse(
             message=assistant_response,
             user_id=request.user_id,
@@ -103,34 +145,65 @@ async def chat(request: ChatRequest):
 
 
 @router.get("/chat/history/{user_id}")
-async def get_chat_history(user_id: str, limit: int = 20):
+async def get_chat_history(user_id: str, limit: int = 20, before: Optional[str] = None):
     """
-    Get user's chat history
+    Get user's chat history, newest page first
     
     Args:
         user_id: User identifier
         limit: Maximum number of messages to return
+        before: Cursor from a previous page's next_cursor to fetch older messages
     
     Returns:
-        List of chat messages
+        Chronological list of chat messages and the cursor for the next older page
     """
     try:
-        history = supabase_service.get_chat_history(user_id, limit=limit)
+        page = supabase_service.get_chat_history_page(user_id, limit=clamp_limit(limit, 20), before=before)
         return {
             "user_id": user_id,
             "messages": [
                 {
-                    "role": msg.role,
-                    "content": msg.content,
-                    "timestamp": msg.timestamp.isoformat() if msg.timestamp else None
+                    "id": msg.get("id"),
+                    "role": msg.get("role", "user"),
+                    "content": msg.get("content", ""),
+                    "conversation_id": msg.get("conversation_id"),
+                    "timestamp": msg.get("created_at")
                 }
-                for msg in history
-            ]
+                for msg in page["messages"]
+            ],
+            "next_cursor": page["next_cursor"]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching chat history: {str(e)}")
 
 
+@router.get("/chat/search/{user_id}")
+async def search_messages(user_id: str, q: str, source: str = "ai", limit: int = 20,
+                          cursor: Optional[str] = None):
+    """
+    Full-text search over a user's messages, best matches first
+    
+    Args:
+        user_id: User (AI chat) or client whose coach chat is searched
+        q: Search text (Spanish stemming: "entrenamientos" also finds "entrenar")
+        source: "ai" for assistant chat, "coach" for coach chat
+        limit: Page size
+        cursor: next_cursor of the previous page
+    
+    Returns:
+        Ranked results with highlighted snippets and the cursor for the next page
+    """
+    try:
+        page = chat_search_service.search(user_id, q, source=source, limit=clamp_limit(limit, 20), cursor=cursor)
+        return {"user_id": user_id, "query": q, "source": source, **page}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching messages: {str(e)}")
+
+
 @router.post("/chat/conversations", response_model=ConversationResponse)
 async def create_conversation(request: ConversationCreateRequest):
     try:
@@ -149,18 +222,25 @@ async def create_conversation(request: ConversationCreateRequest):
 
 
 @router.get("/chat/conversations/{user_id}", response_model=ConversationsListResponse)
-async def list_conversations(user_id: str):
+async def list_conversations(user_id: str, request: Request, response: Response):
     try:
+        etag = versioned_etag(user_id, ["conversations"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
         rows = supabase_service.list_conversations(user_id)
         conversations = [
             ConversationResponse(
                 id=str(r.get("id")),
                 user_id=str(r.get("user_id")),
                 title=r.get("title", "Nuevo chat"),
+                summary=r.get("summary"),
+                preview=r.get("preview"),
+                turn_count=r.get("turn_count") or 0,
                 created_at=r.get("created_at"),
                 updated_at=r.get("updated_at"),
             ) for r in rows
         ]
+        with_etag(response, etag)
         return ConversationsListResponse(conversations=conversations)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing conversations: {str(e)}")
@@ -183,25 +263,30 @@ async def delete_conversation(conversation_id: str):
         ok = supabase_service.delete_conversation(conversation_id)
         if not ok:
             raise HTTPException(status_code=400, detail="Could not delete conversation")
+        chat_context_service.forget(conversation_id)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting conversation: {str(e)}")
 
 
 @router.get("/chat/conversations/{conversation_id}/messages")
-async def messages_by_conversation(conversation_id: str, limit: int = 200):
+async def messages_by_conversation(conversation_id: str, limit: int = 200, before: Optional[str] = None):
     try:
-        rows = supabase_service.list_messages_by_conversation(conversation_id, limit)
+        page = supabase_service.list_messages_page(conversation_id, clamp_limit(limit, 200), before)
         return {
             "conversation_id": conversation_id,
             "messages": [
                 {
+                    "id": r.get("id"),
                     "role": r.get("role", "assistant"),
                     "content": r.get("content", ""),
                     "timestamp": r.get("created_at")
-                } for r in rows
-            ]
+                } for r in page["messages"]
+            ],
+            "next_cursor": page["next_cursor"]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching conversation messages: {str(e)}")
 
@@ -0,0 +1,199 @@
+"""
+Dashboard API Endpoints
+Single-call home screen data (water, sleep, workouts, streak, progress)
+"""
+
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request
+from datetime import date, timedelta
+from typing import Optional, List, Dict, Any
+from app.api.v1.water import build_water_widget
+from app.api.v1.sleep import build_sleep_widget
+from app.core.http_cache import versioned_etag, etag_matches, not_modified, conditional_response
+from app.services.supabase_service import supabase_service
+
+router = APIRouter()
+
+# Resource scopes whose writes change the dashboard
+DASHBOARD_SCOPES = ["water", "sleep", "progress"]
+
+# Sessions shown in the progress widget
+RECENT_WORKOUTS = 5
+
+
+# =====================================================
+# SNAPSHOT LOADERS (run concurrently in worker threads)
+# =====================================================
+
+def _load_health_rows(user_id: str, days: int) -> List[Dict[str, Any]]:
+    """Load daily_health_data rows (water + sleep) for the last N days in one query"""
+    end_date = date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    result = supabase_service.select("daily_health_data.dashboard")\
+        .eq("user_id", user_id)\
+        .gte("date", start_date.isoformat())\
+        .lte("date", end_date.isoformat())\
+        .order("date", desc=True)\
+        .execute()
+    return result.data or []
+
+
+def _load_month_workouts(user_id: str, year: int, month: int) -> List[Dict[str, Any]]:
+    """Load workout dates for the calendar month"""
+    first_day = date(year, month, 1)
+    if month == 12:
+        last_day = date(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        last_day = date(year, month + 1, 1) - timedelta(days=1)
+    result = supabase_service.select("progress.workout_dates")\
+        .eq("user_id", user_id)\
+        .gte("workout_date", first_day.isoformat())\
+        .lte("workout_date", last_day.isoformat())\
+        .execute()
+    return result.data or []
+
+
+def _load_progress(user_id: str) -> Dict[str, Any]:
+    """
+    Load total workout count and the most recent sessions
+
+    Reuses the progress summary (trigger-maintained count plus latest rows from
+    one progress_summary() call, cached until the next progress write), so the
+    dashboard never counts the user's history.
+    """
+    summary = supabase_service.get_progress_summary(user_id)
+    return {"total": summary.get("total_workouts") or 0, "recent": summary.get("recent_workouts", [])[:RECENT_WORKOUTS]}
+
+
+def _load_streak(user_id: str) -> Dict[str, Any]:
+    """Load the user's streak row"""
+    result = supabase_service.select("streaks.full")\
+        .eq("user_id", user_id)\
+        .limit(1)\
+        .execute()
+    return result.data[0] if result.data else {}
+
+
+async def _load_snapshot(user_id: str, days: int, year: int, month: int) -> Dict[str, Any]:
+    """
+    Load every row the dashboard needs, concurrently
+
+    Returns an empty snapshot in mock mode or for non-UUID (mock) users.
+    """
+    empty = {"health": [], "month_workouts": [], "progress": {"total": 0, "recent": []}, "streak": {}}
+    if not supabase_service.is_connected() or not supabase_service._is_valid_uuid(user_id):
+        return empty
+
+    health, month_workouts, progress, streak = await asyncio.gather(
+        asyncio.to_thread(_load_health_rows, user_id, days),
+        asyncio.to_thread(_load_month_workouts, user_id, year, month),
+        asyncio.to_thread(_load_progress, user_id),
+        asyncio.to_thread(_load_streak, user_id),
+    )
+    return {"health": health, "month_workouts": month_workouts, "progress": progress, "streak": streak}
+
+
+# =====================================================
+# WIDGET BUILDERS (pure, from the shared snapshot)
+# =====================================================
+
+def _normalize_date(value: Any) -> str:
+    """Normalize a date/datetime value to YYYY-MM-DD"""
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    value = str(value or "")
+    return value.split('T')[0].split(' ')[0]
+
+
+def _build_workouts_widget(rows: List[Dict[str, Any]], year: int, month: int) -> Dict[str, Any]:
+    """Build the workout calendar widget"""
+    days = sorted({_normalize_date(r.get("workout_date")) for r in rows if r.get("workout_date")})
+    return {"workout_days": days, "month": month, "year": year}
+
+
+def _build_streak_widget(streak: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the streak widget"""
+    return {
+        "current_streak": streak.get("current_streak", 0) or 0,
+        "longest_streak": streak.get("longest_streak", 0) or 0,
+        "weekly_streak": streak.get("weekly_streak", 0) or 0,
+        "monthly_streak": streak.get("monthly_streak", 0) or 0,
+        "last_workout_date": streak.get("last_workout_date"),
+    }
+
+
+def _build_progress_widget(progress: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the progress summary widget"""
+    return {
+        "total_workouts": progress.get("total", 0),
+        "recent_workouts": [
+            {
+                "id": r.get("id"),
+                "date": _normalize_date(r.get("workout_date")),
+                "duration_minutes": r.get("duration_minutes"),
+            }
+            for r in progress.get("recent", [])
+        ],
+    }
+
+
+def build_dashboard(user_id: str, snapshot: Dict[str, Any], days: int, year: int, month: int) -> Dict[str, Any]:
+    """Build all dashboard widgets from a single in-memory snapshot"""
+    health = snapshot.get("health", [])
+    water_rows = [
+        {"date": _normalize_date(r.get("date")), "water_ml": int(r.get("water_ml") or 0)}
+        for r in health
+    ]
+    sleep_rows = [
+        {"date": _normalize_date(r.get("date")), "hours": float(r.get("sleep_hours") or 0)}
+        for r in health
+    ]
+    return {
+        "user_id": user_id,
+        "water": build_water_widget(user_id, water_rows, days),
+        "sleep": build_sleep_widget(user_id, sleep_rows, days),
+        "workouts": _build_workouts_widget(snapshot.get("month_workouts", []), year, month),
+        "streak": _build_streak_widget(snapshot.get("streak", {})),
+        "progress": _build_progress_widget(snapshot.get("progress", {})),
+        "date": date.today().isoformat(),
+        "success": True,
+    }
+
+
+@router.get("/dashboard/{user_id}")
+async def get_dashboard(
+    user_id: str,
+    request: Request,
+    days: int = 7,
+    year: Optional[int] = Query(None, ge=1970, le=2100),
+    month: Optional[int] = Query(None, ge=1, le=12)
+):
+    """
+    Get every home screen widget in one call
+
+    Args:
+        user_id: User identifier
+        days: Number of days of water/sleep history (default: 7)
+        year: Calendar year for workout days, 1970-2100 (default: current)
+        month: Calendar month for workout days, 1-12 (default: current; out of range gives 422)
+
+    Returns:
+        Dashboard payload with an ETag; 304 when If-None-Match matches
+    """
+    try:
+        today = date.today()
+        days = max(1, min(days, 90))
+        year = year or today.year
+        month = month or today.month
+
+        # Answer unchanged dashboards before touching the database
+        etag = versioned_etag(user_id, DASHBOARD_SCOPES, days, year, month, today.isoformat())
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        snapshot = await _load_snapshot(user_id, days, year, month)
+        payload = build_dashboard(user_id, snapshot, days, year, month)
+        return conditional_response(request, payload, etag)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching dashboard: {str(e)}")
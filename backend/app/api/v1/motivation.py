@@ -9,6 +9,8 @@ from pydantic import BaseModel
 from typing import Optional
 from app.services.openai_service import openai_service
 from app.services.supabase_service import supabase_service
+from app.services.cache_service import cache_service
+from app.services.rate_limit_service import rate_limit_service
 
 router = APIRouter()
 
@@ -22,6 +24,11 @@ class MotivationResponse(BaseModel):
     """Response with motivational message"""
     message: str
     timestamp: datetime
+    degraded: bool = False  # Cached or canned message served because the user hit an AI usage limit
+
+
+# The last AI message per user is kept this long to be served again when rate limited
+LAST_MESSAGE_TTL_SECONDS = 24 * 3600
 
 
 @router.post("/motivation/message", response_model=MotivationResponse)
@@ -34,7 +41,18 @@ async def get_motivational_message(request: MotivationRequest):
     
     Returns:
         MotivationResponse with AI-generated motivational message
+    
+    Raises:
+        HTTPException 429: Rate or daily token limit hit and RATE_LIMIT_MODE is "reject"
     """
+    decision = rate_limit_service.check("motivation", request.user_id)
+    if not decision["allowed"]:
+        if rate_limit_service.should_reject():
+            raise rate_limit_service.rejection(decision)
+        cached = cache_service.get("motivation", request.user_id)
+        if cached:
+            return MotivationResponse(message=cached, timestamp=datetime.utcnow(), degraded=True)
+    
     try:
         # Get user's progress data for context
         user = supabase_service.get_user(request.user_id)
@@ -43,8 +61,7 @@ async def get_motivational_message(request: MotivationRequest):
         # Get streak information
         streak_data = None
         try:
-            streak_result = supabase_service.supabase.table("streaks")\
-                .select("*")\
+            streak_result = supabase_service.select("streaks.full")\
                 .eq("user_id", request.user_id)\
                 .single()\
                 .execute()
@@ -53,12 +70,21 @@ async def get_motivational_message(request: MotivationRequest):
         except:
             pass
         
+        # Recent PRs come straight from the personal records index (numpy-backed, imported on use)
+        from app.services.records_service import records_service
+        try:
+            recent_prs = records_service.get_recent_prs(request.user_id)
+        except Exception as e:
+            print(f"Error loading personal records: {e}")
+            recent_prs = []
+        
         # Build context for AI
         context = {
             "user_name": user.get("full_name", "there") if user else "there",
             "total_workouts": progress_summary.get("total_workouts", 0),
             "current_streak": progress_summary.get("current_streak", 0),
-            "longest_streak": streak_data.get("longest_streak", 0) if streak_data else 0
+            "longest_streak": streak_data.get("longest_streak", 0) if streak_data else 0,
+            "recent_prs": ", ".join(f"{p['exercise']} ({p['best_e1rm']} kg 1RM est.)" for p in recent_prs[:3]) or "none"
         }
         
         # Generate motivational message with OpenAI
@@ -69,6 +95,7 @@ User context:
 - Total workouts completed: {context['total_workouts']}
 - Current streak: {context['current_streak']} days
 - Longest streak: {context['longest_streak']} days
+- Personal records in the last 2 weeks: {context['recent_prs']}
 
 Generate an encouraging, positive message (2-3 sentences max) that:
 - Acknowledges their progress
@@ -78,14 +105,20 @@ Generate an encouraging, positive message (2-3 sentences max) that:
 
 Message:"""
         
-        try:
-            ai_response = openai_service.get_chat_response(
-                [{"role": "user", "content": prompt}],
-                user_context={"user_id": request.user_id}
-            )
-            message = ai_response.strip()
-        except Exception as e:
-            print(f"Error getting AI response: {e}")
+        message = None
+        if decision["allowed"]:
+            try:
+                ai_response = openai_service.get_chat_response(
+                    [{"role": "user", "content": prompt}],
+                    user_context={"user_id": request.user_id},
+                    on_usage=lambda tokens: rate_limit_service.record_usage(request.user_id, tokens)
+                )
+                message = ai_response.strip()
+                cache_service.set("motivation", request.user_id, message, LAST_MESSAGE_TTL_SECONDS)
+            except Exception as e:
+                print(f"Error getting AI response: {e}")
+        
+        if not message:
             # Fallback messages
             fallback_messages = [
                 f"Keep going, {context['user_name']}! Every workout brings you closer to your goals! 💪",
@@ -98,7 +131,8 @@ Message:"""
         
         return MotivationResponse(
             message=message,
-            timestamp=datetime.utcnow()
+            timestamp=datetime.utcnow(),
+            degraded=not decision["allowed"]
         )
     
     except Exception as e:
@@ -125,8 +159,7 @@ async def check_achievements(request: MotivationRequest):
         current_streak = progress_summary.get("current_streak", 0)
         
         # Get existing achievements
-        existing_achievements = supabase_service.supabase.table("achievements")\
-            .select("type")\
+        existing_achievements = supabase_service.select("achievements.types")\
             .eq("user_id", user_id)\
             .execute()
         
@@ -169,6 +202,19 @@ async def check_achievements(request: MotivationRequest):
             if achievement.data:
                 newly_unlocked.append(achievement.data[0])
         
+        # Check for first personal record
+        from app.services.records_service import records_service
+        if "personal_record" not in existing_types and records_service.get_recent_prs(user_id, days=36500):
+            achievement = supabase_service.supabase.table("achievements").insert({
+                "user_id": user_id,
+                "type": "personal_record",
+                "title": "New Record",
+                "description": "Beat your best lift!",
+                "icon": "emoji_events"
+            }).execute()
+            if achievement.data:
+                newly_unlocked.append(achievement.data[0])
+        
         # Check for total workouts milestones
         if total_workouts >= 10 and "total_workouts_10" not in existing_types:
             achievement = supabase_service.supabase.table("achievements").insert({
@@ -3,11 +3,25 @@ Nutrition API Endpoints
 Handles nutrition plans, meals, and coach-client chat
 """
 
-from fastapi import APIRouter, HTTPException
-from datetime import datetime
+import asyncio
+import time
+from fastapi import APIRouter, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from datetime import datetime, date, timedelta
 from pydantic import BaseModel
 from typing import Optional, List
 from app.services.supabase_service import supabase_service
+from app.services.cache_service import cache_service
+from app.services.matview_service import matview_service
+from app.services.food_search_service import food_search_service
+from app.services.chat_hub import chat_hub
+from app.services.unread_counter_service import unread_counter_service
+from app.services.plan_totals_service import plan_totals_service
+from app.services.nutrition_plan_service import (
+    nutrition_plan_service, MealBatchError, MAX_BATCH_OPERATIONS, MAX_CLONE_USERS
+)
+from app.core.config import settings
+from app.core.http_cache import versioned_etag, bump_versions, etag_matches, not_modified, with_etag
+from app.core.pagination import clamp_limit, apply_before_cursor, apply_after_cursor, build_page, encode_cursor
 
 router = APIRouter()
 
@@ -53,6 +67,16 @@ class MealUpdate(BaseModel):
     foods: Optional[List[dict]] = None
 
 
+class MealOperation(BaseModel):
+    op: str  # create, update, delete
+    id: Optional[str] = None  # required for update/delete
+    meal: Optional[dict] = None  # MealCreate fields for create, MealUpdate fields for update
+
+
+class MealBatch(BaseModel):
+    operations: List[MealOperation]
+
+
 class PlanCreate(BaseModel):
     user_id: str
     coach_id: Optional[str] = None
@@ -63,6 +87,13 @@ class PlanCreate(BaseModel):
     carbs_grams: Optional[int] = None
     fat_grams: Optional[int] = None
     notes: Optional[str] = None
+    is_template: Optional[bool] = False  # coach template: owned by the coach (user_id), never active
+
+
+class PlanClone(BaseModel):
+    user_ids: List[str]
+    coach_id: Optional[str] = None
+    activate: Optional[bool] = True  # make each copy the user's active plan
 
 
 class PlanUpdate(BaseModel):
@@ -86,16 +117,60 @@ class ChatMessage(BaseModel):
     metadata: Optional[dict] = None
 
 
+# =====================================================
+# VERSIONING HELPERS
+# =====================================================
+
+def _plan_owner(plan_id: str) -> Optional[str]:
+    """Resolve the user_id that owns a plan (cached, plans never change owner)"""
+    owner = cache_service.get("plan_owner", plan_id)
+    if owner:
+        return owner
+    try:
+        result = supabase_service.select("nutrition_plans.owner")\
+            .eq("id", plan_id)\
+            .limit(1)\
+            .execute()
+        owner = result.data[0]["user_id"] if result.data else None
+    except Exception as e:
+        print(f"Warning: could not resolve plan owner: {e}")
+        owner = None
+    if owner:
+        cache_service.set("plan_owner", plan_id, owner)
+    return owner
+
+
+def _fill_meal_foods(meal_data: dict) -> dict:
+    """Fill missing food macros from the food database (when enabled and foods are given)"""
+    if settings.FOOD_AUTOFILL_ENABLED and meal_data.get("foods"):
+        meal_data["foods"] = food_search_service.fill_foods(meal_data["foods"])
+    return meal_data
+
+
+def _bump_plan(plan_id: Optional[str] = None, user_id: Optional[str] = None):
+    """Invalidate the nutrition plan version of the plan's owner and the plan's cached totals"""
+    user_id = user_id or (_plan_owner(plan_id) if plan_id else None)
+    bump_versions(user_id, "nutrition_plan")
+    plan_totals_service.invalidate(plan_id)
+    matview_service.mark_dirty("mv_active_nutrition_plan")
+
+
 # =====================================================
 # NUTRITION PLANS ENDPOINTS
 # =====================================================
 
 @router.get("/nutrition/plan/{user_id}")
-async def get_user_plan(user_id: str):
-    """Get active nutrition plan for a user"""
+async def get_user_plan(user_id: str, request: Request, response: Response):
+    """
+    Get active nutrition plan for a user with its meals and per-day/weekly totals
+    (304 when If-None-Match matches)
+    """
     try:
-        result = supabase_service.supabase.table("nutrition_plans")\
-            .select("*")\
+        etag = versioned_etag(user_id, ["nutrition_plan"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        result = supabase_service.select("nutrition_plans.full")\
             .eq("user_id", user_id)\
             .eq("is_active", True)\
             .order("created_at", desc=True)\
@@ -103,32 +178,46 @@ async def get_user_plan(user_id: str):
             .execute()
         
         if not result.data:
-            return {"plan": None, "meals": []}
+            with_etag(response, etag)
+            return {"plan": None, "meals": [], "totals": None}
         
         plan = result.data[0]
+        cache_service.set("plan_owner", plan["id"], user_id)
         
-        # Get meals for this plan
-        meals_result = supabase_service.supabase.table("nutrition_meals")\
-            .select("*")\
-            .eq("plan_id", plan["id"])\
-            .order("meal_order")\
-            .execute()
+        # Meals and totals for this plan (cached per plan)
+        view = plan_totals_service.get_plan_view(plan)
         
+        with_etag(response, etag)
         return {
             "plan": plan,
-            "meals": meals_result.data or []
+            "meals": view["meals"],
+            "totals": view["totals"]
         }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting nutrition plan: {str(e)}")
 
 
+@router.get("/nutrition/plan/{plan_id}/totals")
+async def get_plan_totals(plan_id: str):
+    """Get per-day and weekly calorie/macro totals of any plan, with deviation from its targets"""
+    try:
+        plan = plan_totals_service.get_plan(plan_id)
+        if not plan:
+            raise HTTPException(status_code=404, detail="Plan not found")
+        return {"plan_id": plan_id, "totals": plan_totals_service.get_plan_view(plan)["totals"]}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting plan totals: {str(e)}")
+
+
 @router.get("/nutrition/plans/{user_id}")
 async def get_all_user_plans(user_id: str):
     """Get all nutrition plans for a user (for coach view)"""
     try:
-        result = supabase_service.supabase.table("nutrition_plans")\
-            .select("*")\
+        result = supabase_service.select("nutrition_plans.full")\
             .eq("user_id", user_id)\
             .order("created_at", desc=True)\
             .execute()
@@ -141,17 +230,21 @@ async def get_all_user_plans(user_id: str):
 
 @router.post("/nutrition/plan")
 async def create_plan(plan: PlanCreate):
-    """Create a new nutrition plan"""
+    """Create a new nutrition plan (or a coach template when is_template is set)"""
     try:
-        # Deactivate existing active plans
-        supabase_service.supabase.table("nutrition_plans")\
-            .update({"is_active": False})\
-            .eq("user_id", plan.user_id)\
-            .eq("is_active", True)\
-            .execute()
+        plan_data = plan.dict(exclude={"is_template"})
+        if plan.is_template:
+            # Templates never replace the coach's own active plan
+            plan_data.update(is_template=True, is_active=False)
+        else:
+            # Deactivate existing active plans
+            supabase_service.supabase.table("nutrition_plans")\
+                .update({"is_active": False})\
+                .eq("user_id", plan.user_id)\
+                .eq("is_active", True)\
+                .execute()
         
         # Create new plan
-        plan_data = plan.dict()
         result = supabase_service.supabase.table("nutrition_plans")\
             .insert(plan_data)\
             .execute()
@@ -159,6 +252,7 @@ async def create_plan(plan: PlanCreate):
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to create plan")
         
+        _bump_plan(user_id=plan.user_id)
         return {"plan": result.data[0]}
     
     except HTTPException:
@@ -167,6 +261,48 @@ async def create_plan(plan: PlanCreate):
         raise HTTPException(status_code=500, detail=f"Error creating nutrition plan: {str(e)}")
 
 
+@router.get("/nutrition/templates/{coach_id}")
+async def get_plan_templates(coach_id: str):
+    """Get a coach's plan templates"""
+    try:
+        return {"templates": nutrition_plan_service.list_templates(coach_id)}
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting plan templates: {str(e)}")
+
+
+@router.post("/nutrition/plan/{plan_id}/clone")
+async def clone_plan(plan_id: str, clone: PlanClone):
+    """
+    Copy a plan or template with all its meals to one or many clients
+
+    One set-based insert for the plans and one for the meals, whatever the number of clients.
+    """
+    try:
+        if not clone.user_ids:
+            raise HTTPException(status_code=400, detail="No user_ids given")
+        if len(clone.user_ids) > MAX_CLONE_USERS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_CLONE_USERS} users per call")
+        invalid = [u for u in clone.user_ids if not supabase_service._is_valid_uuid(u)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid user ids: {', '.join(invalid[:10])}")
+        
+        plan = plan_totals_service.get_plan(plan_id)
+        if not plan:
+            raise HTTPException(status_code=404, detail="Plan not found")
+        
+        result = nutrition_plan_service.clone_plan(plan, clone.user_ids, clone.coach_id, bool(clone.activate))
+        for cloned in result["plans"]:
+            cache_service.set("plan_owner", str(cloned["plan_id"]), cloned["user_id"])
+            _bump_plan(user_id=cloned["user_id"])
+        return {"source_plan_id": plan_id, **result}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error cloning nutrition plan: {str(e)}")
+
+
 @router.patch("/nutrition/plan/{plan_id}")
 async def update_plan(plan_id: str, plan: PlanUpdate):
     """Update a nutrition plan"""
@@ -182,6 +318,7 @@ async def update_plan(plan_id: str, plan: PlanUpdate):
         if not result.data:
             raise HTTPException(status_code=404, detail="Plan not found")
         
+        _bump_plan(plan_id, result.data[0].get("user_id"))
         return {"plan": result.data[0]}
     
     except HTTPException:
@@ -199,6 +336,7 @@ async def delete_plan(plan_id: str):
             .eq("id", plan_id)\
             .execute()
         
+        _bump_plan(plan_id, result.data[0].get("user_id") if result.data else None)
         return {"success": True}
     
     except Exception as e:
@@ -213,7 +351,7 @@ async def delete_plan(plan_id: str):
 async def add_meal(plan_id: str, meal: MealCreate):
     """Add a meal to a plan"""
     try:
-        meal_data = meal.dict()
+        meal_data = _fill_meal_foods(meal.dict())
         meal_data["plan_id"] = plan_id
         
         result = supabase_service.supabase.table("nutrition_meals")\
@@ -223,6 +361,7 @@ async def add_meal(plan_id: str, meal: MealCreate):
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to add meal")
         
+        _bump_plan(plan_id)
         return {"meal": result.data[0]}
     
     except HTTPException:
@@ -235,7 +374,7 @@ async def add_meal(plan_id: str, meal: MealCreate):
 async def update_meal(meal_id: str, meal: MealUpdate):
     """Update a meal"""
     try:
-        update_data = {k: v for k, v in meal.dict().items() if v is not None}
+        update_data = _fill_meal_foods({k: v for k, v in meal.dict().items() if v is not None})
         update_data["updated_at"] = datetime.utcnow().isoformat()
         
         result = supabase_service.supabase.table("nutrition_meals")\
@@ -246,6 +385,7 @@ async def update_meal(meal_id: str, meal: MealUpdate):
         if not result.data:
             raise HTTPException(status_code=404, detail="Meal not found")
         
+        _bump_plan(result.data[0].get("plan_id"))
         return {"meal": result.data[0]}
     
     except HTTPException:
@@ -263,32 +403,117 @@ async def delete_meal(meal_id: str):
             .eq("id", meal_id)\
             .execute()
         
+        if result.data:
+            _bump_plan(result.data[0].get("plan_id"))
         return {"success": True}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting meal: {str(e)}")
 
 
+@router.post("/nutrition/plan/{plan_id}/meals/batch")
+async def apply_meal_batch(plan_id: str, batch: MealBatch):
+    """
+    Create, update and delete many meals of a plan in one call
+
+    Operations are validated together (an invalid one rejects the whole batch) and
+    applied in one transaction. Returns the resulting plan snapshot with totals.
+    """
+    try:
+        if not batch.operations:
+            raise HTTPException(status_code=400, detail="No operations given")
+        if len(batch.operations) > MAX_BATCH_OPERATIONS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+
+        operations, errors = [], []
+        for index, operation in enumerate(batch.operations):
+            try:
+                if operation.op == "create":
+                    meal = _fill_meal_foods(MealCreate(**(operation.meal or {})).dict())
+                elif operation.op == "update":
+                    meal = _fill_meal_foods(
+                        {k: v for k, v in MealUpdate(**(operation.meal or {})).dict().items() if v is not None}
+                    )
+                elif operation.op == "delete":
+                    meal = None
+                else:
+                    raise ValueError("op must be create, update or delete")
+            except ValueError as e:
+                errors.append({"index": index, "error": str(e)})
+                continue
+            operations.append({"op": operation.op, "id": operation.id, "meal": meal})
+        if errors:
+            raise HTTPException(status_code=400, detail={"errors": errors})
+
+        plan = plan_totals_service.get_plan(plan_id)
+        if not plan:
+            raise HTTPException(status_code=404, detail="Plan not found")
+
+        try:
+            applied = nutrition_plan_service.apply_meal_batch(plan_id, operations)
+        except MealBatchError as e:
+            raise HTTPException(status_code=400, detail={"errors": e.errors})
+
+        _bump_plan(plan_id, plan.get("user_id"))
+        view = plan_totals_service.get_plan_view(plan)
+        return {"applied": applied, "plan": plan, "meals": view["meals"], "totals": view["totals"]}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying meal batch: {str(e)}")
+
+
+# =====================================================
+# FOOD DATABASE
+# =====================================================
+
+@router.get("/nutrition/foods/search")
+async def search_foods(q: str, limit: int = 10):
+    """
+    Search the bundled food database (prefix and typo-tolerant, accent-insensitive)
+
+    Args:
+        q: Food name or part of it, e.g. "pech pollo"
+        limit: Maximum results (1-50)
+
+    Returns:
+        Matching foods with macros per 100 g and per common portion
+    """
+    started = time.perf_counter()
+    results = food_search_service.search(q, max(1, min(limit, 50)))
+    return {
+        "query": q,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+
 # =====================================================
 # COACH CHAT ENDPOINTS
 # =====================================================
 
 @router.get("/nutrition/chat/{user_id}")
-async def get_chat_messages(user_id: str, limit: int = 50):
-    """Get chat messages for a user"""
+async def get_chat_messages(user_id: str, limit: int = 50, before: Optional[str] = None):
+    """
+    Get chat messages for a user, newest page first
+    Pass the returned next_cursor as `before` to load older messages
+    """
     try:
-        result = supabase_service.supabase.table("coach_chat")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .order("created_at", desc=True)\
-            .limit(limit)\
+        limit = clamp_limit(limit, 50)
+        query = supabase_service.select("coach_chat.messages")\
+            .eq("user_id", user_id)
+        result = apply_before_cursor(query, before)\
+            .limit(limit + 1)\
             .execute()
         
-        # Reverse to get chronological order
-        messages = list(reversed(result.data or []))
+        # Chronological order, plus cursor for the next older page
+        messages, next_cursor = build_page(result.data or [], limit)
         
-        return {"messages": messages}
+        return {"messages": messages, "next_cursor": next_cursor}
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting chat messages: {str(e)}")
 
@@ -306,8 +531,12 @@ async def send_chat_message(msg: ChatMessage):
         
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to send message")
+        message = result.data[0]
+        matview_service.mark_dirty("mv_coach_unread")
+        unread_counter_service.on_message(msg.user_id, msg.sender_role)
+        chat_hub.publish(msg.user_id, {"type": "message", "message": message, "cursor": encode_cursor(message)})
         
-        return {"message": result.data[0]}
+        return {"message": message}
     
     except HTTPException:
         raise
@@ -328,6 +557,14 @@ async def mark_messages_read(user_id: str, reader_role: str):
             .eq("sender_role", other_role)\
             .eq("is_read", False)\
             .execute()
+        unread_counter_service.on_read(user_id, reader_role)
+        if result.data:
+            matview_service.mark_dirty("mv_coach_unread")
+            chat_hub.publish(user_id, {
+                "type": "read",
+                "reader_role": reader_role,
+                "message_ids": [row.get("id") for row in result.data]
+            })
         
         return {"success": True, "updated": len(result.data) if result.data else 0}
     
@@ -337,62 +574,240 @@ async def mark_messages_read(user_id: str, reader_role: str):
 
 @router.get("/nutrition/chat/unread/{user_id}")
 async def get_unread_count(user_id: str, reader_role: str):
-    """Get unread message count"""
+    """Get unread message count (maintained counter, seeded from the database on a miss)"""
     try:
-        other_role = "coach" if reader_role == "user" else "user"
-        
-        result = supabase_service.supabase.table("coach_chat")\
-            .select("id", count="exact")\
-            .eq("user_id", user_id)\
-            .eq("sender_role", other_role)\
-            .eq("is_read", False)\
-            .execute()
-        
-        return {"unread": result.count or 0}
+        return {"unread": unread_counter_service.get(user_id, reader_role)}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting unread count: {str(e)}")
 
 
+# Messages replayed at most on reconnect; older gaps are loaded through the history endpoint
+CHAT_RESUME_LIMIT = 200
+
+
+def _chat_messages_after(user_id: str, after: Optional[str] = None, last_id: Optional[str] = None) -> List[dict]:
+    """
+    Messages of a chat newer than a cursor or a message id, oldest first
+
+    Raises:
+        ValueError: If the cursor or last_id is malformed
+    """
+    if last_id and not after:
+        if not supabase_service._is_valid_uuid(last_id):
+            raise ValueError("Invalid last_id")
+        last = supabase_service.select("coach_chat.messages")\
+            .eq("user_id", user_id)\
+            .eq("id", last_id)\
+            .limit(1)\
+            .execute()
+        if not last.data:
+            return []
+        after = encode_cursor(last.data[0])
+    query = supabase_service.select("coach_chat.messages")\
+        .eq("user_id", user_id)
+    result = apply_after_cursor(query, after)\
+        .limit(CHAT_RESUME_LIMIT)\
+        .execute()
+    return result.data or []
+
+
+def _chat_latest_cursor(user_id: str) -> str:
+    """
+    Cursor of a chat's newest message, so a fresh socket can catch up from there
+
+    An empty chat gets a cursor before any possible message, so its first
+    message is still picked up by the ping catch-up.
+    """
+    result = supabase_service.select("coach_chat.messages")\
+        .eq("user_id", user_id)\
+        .order("created_at", desc=True)\
+        .order("id", desc=True)\
+        .limit(1)\
+        .execute()
+    if result.data:
+        return encode_cursor(result.data[0])
+    return encode_cursor({"created_at": "1970-01-01T00:00:00+00:00", "id": "00000000-0000-0000-0000-000000000000"})
+
+
+async def _wait_for_disconnect(websocket: WebSocket) -> None:
+    """Consume client frames until the socket closes (clients only listen)"""
+    while True:
+        frame = await websocket.receive()
+        if frame["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/nutrition/chat/ws/{user_id}")
+async def chat_socket(websocket: WebSocket, user_id: str, after: Optional[str] = None,
+                      last_id: Optional[str] = None):
+    """
+    Real-time coach chat for one client (used by both the client and the coach)
+
+    Pushes {"type": "message", "message", "cursor"} for new messages and
+    {"type": "read", "reader_role", "message_ids"} for read receipts, plus a
+    {"type": "ping"} keepalive. On reconnect pass the last received cursor as
+    `after` (or the last message id as `last_id`) to receive missed messages first.
+    A {"type": "resync"} event means the socket fell behind: reconnect with `after`.
+    """
+    await websocket.accept()
+    subscription = chat_hub.subscribe(user_id)
+    receiver = asyncio.ensure_future(_wait_for_disconnect(websocket))
+    delivered = set()
+    cursor = after
+
+    async def deliver(messages: List[dict]) -> None:
+        nonlocal cursor
+        for message in messages:
+            if message.get("id") in delivered:
+                continue
+            delivered.add(message.get("id"))
+            cursor = encode_cursor(message)
+            await websocket.send_json({"type": "message", "message": message, "cursor": cursor})
+
+    try:
+        if after or last_id:
+            try:
+                missed = await asyncio.to_thread(_chat_messages_after, user_id, after, last_id)
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                await websocket.close(code=1008)
+                return
+            await deliver(missed)
+            await websocket.send_json({"type": "resumed", "count": len(missed),
+                                       "has_more": len(missed) >= CHAT_RESUME_LIMIT})
+        elif settings.CHAT_WS_CATCHUP_ON_PING:
+            # Without a starting point, catch-up would never see messages sent through other workers
+            try:
+                cursor = await asyncio.to_thread(_chat_latest_cursor, user_id)
+            except Exception as e:
+                print(f"Warning: could not read chat cursor, ping catch-up disabled: {e}")
+        await websocket.send_json({"type": "ready", "cursor": cursor})
+
+        while True:
+            if subscription.overflowed:
+                await websocket.send_json({"type": "resync", "cursor": cursor})
+                await websocket.close()
+                return
+            getter = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({getter, receiver}, timeout=settings.CHAT_WS_PING_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                return
+            if getter not in done:
+                getter.cancel()
+                if settings.CHAT_WS_CATCHUP_ON_PING and cursor:
+                    await deliver(await asyncio.to_thread(_chat_messages_after, user_id, cursor))
+                await websocket.send_json({"type": "ping"})
+                continue
+            event = getter.result()
+            if event.get("type") == "message":
+                await deliver([event["message"]])
+            else:
+                await websocket.send_json(event)
+
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Error in coach chat socket: {e}")
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        chat_hub.unsubscribe(subscription)
+        receiver.cancel()
+
+
 # =====================================================
 # COACH ADMIN ENDPOINTS
 # =====================================================
 
+def _coach_clients_from_views(users: List[dict], unread: dict) -> Optional[List[dict]]:
+    """
+    Build the coach client list from the dashboard materialized views
+
+    Returns None when the active plan view is stale (or not installed), so the
+    caller falls back to live queries.
+    """
+    if not matview_service.is_fresh("mv_active_nutrition_plan"):
+        return None
+
+    plans = {r["user_id"]: r for r in (supabase_service.select("mv_active_nutrition_plan.full").execute().data or [])}
+
+    activity = {}
+    if matview_service.is_fresh("mv_weekly_activity"):
+        today = date.today()
+        week_start = (today - timedelta(days=today.weekday())).isoformat()
+        rows = supabase_service.select("mv_weekly_activity.window")\
+            .eq("week_start", week_start)\
+            .execute()
+        activity = {r["user_id"]: r for r in (rows.data or [])}
+
+    clients = []
+    for user in users:
+        plan = plans.get(user["id"])
+        week = activity.get(user["id"])
+        clients.append({
+            "user": user,
+            "plan": {
+                "id": plan["plan_id"],
+                "name": plan["name"],
+                "daily_calories": plan["daily_calories"],
+                "updated_at": plan["updated_at"]
+            } if plan else None,
+            "unread_messages": unread.get(str(user["id"]), 0),
+            "activity": {
+                "workouts_week": week["workouts"],
+                "volume_week": float(week["volume"] or 0),
+                "active_days": week["active_days"]
+            } if week else None
+        })
+    return clients
+
+
 @router.get("/nutrition/coach/clients")
 async def get_coach_clients_nutrition():
-    """Get all clients with their nutrition plans for coach view"""
+    """
+    Get all clients with their nutrition plans for coach view
+
+    Served from the dashboard materialized views while they are fresh; falls
+    back to per-client live queries when they are stale or not installed.
+    Unread badges come from the maintained unread counters.
+    """
     try:
         # Get all users
-        users_result = supabase_service.supabase.table("users")\
-            .select("id, full_name, email")\
+        users_result = supabase_service.select("users.directory")\
             .execute()
+        users = users_result.data or []
+        unread = unread_counter_service.get_many([user["id"] for user in users], "coach")
+        
+        try:
+            clients = _coach_clients_from_views(users, unread)
+        except Exception as e:
+            print(f"Coach dashboard views unavailable, using live queries: {e}")
+            clients = None
+        if clients is not None:
+            return {"clients": clients, "source": "views"}
         
         clients = []
-        for user in (users_result.data or []):
+        for user in users:
             # Get active plan
-            plan_result = supabase_service.supabase.table("nutrition_plans")\
-                .select("id, name, daily_calories, updated_at")\
+            plan_result = supabase_service.select("nutrition_plans.summary")\
                 .eq("user_id", user["id"])\
                 .eq("is_active", True)\
                 .limit(1)\
                 .execute()
             
-            # Get unread messages
-            unread_result = supabase_service.supabase.table("coach_chat")\
-                .select("id", count="exact")\
-                .eq("user_id", user["id"])\
-                .eq("sender_role", "user")\
-                .eq("is_read", False)\
-                .execute()
-            
             clients.append({
                 "user": user,
                 "plan": plan_result.data[0] if plan_result.data else None,
-                "unread_messages": unread_result.count or 0
+                "unread_messages": unread.get(str(user["id"]), 0),
+                "activity": None
             })
         
-        return {"clients": clients}
+        return {"clients": clients, "source": "live"}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting coach clients: {str(e)}")
-
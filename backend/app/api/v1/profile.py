@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from app.models.schemas import ProfileRequest, ProfileResponse
 from app.services.supabase_service import supabase_service
+from app.core.http_cache import bump_versions
 from datetime import datetime, date
 
 router = APIRouter()
@@ -16,8 +17,7 @@ async def get_profile(user_id: str):
 
     latest_body = None
     try:
-      result = supabase_service.supabase.table("body_composition")\
-        .select("date, muscle, fat, weight")\
+      result = supabase_service.select("body_composition.latest")\
         .eq("user_id", user_id)\
         .order("date", desc=True)\
         .limit(1)\
@@ -83,6 +83,7 @@ async def upsert_profile(req: ProfileRequest):
         supabase_service.supabase.table("body_composition")\
           .upsert(body_payload, on_conflict="user_id,date")\
           .execute()
+        bump_versions(req.user_id, "body_comp")
     except Exception as e:
       print(f"Warning: could not upsert body composition from profile update: {e}")
 
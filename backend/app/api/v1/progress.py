@@ -3,13 +3,23 @@ Progress Tracking API Endpoints
 Handles workout progress tracking and statistics
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from datetime import datetime, date, timedelta
+import asyncio
 import json
 from app.models.schemas import ProgressRequest, ProgressResponse, WorkoutLogRequest, ExerciseLog, ExerciseSet, UpdateProgressRequest, BodyCompRequest
 from app.services.supabase_service import supabase_service
+from app.services.last_sessions_service import last_sessions_service
+from app.services.rollup_service import rollup_service
+from app.services.cache_service import cache_service
+from app.services.background_service import background_service
+from app.core.http_cache import versioned_etag, bump_versions, etag_matches, not_modified, with_etag, conditional_response
 from typing import Optional
 
+# The analytics, records and body trend services load numpy, so they are imported
+# inside the endpoints that use them (and preloaded by warmup_service) to keep the
+# app import fast.
+
 router = APIRouter()
 
 
@@ -19,8 +29,7 @@ def _update_streaks(user_id: str, workout_date: date):
     """
     try:
         # Get current streak data
-        streak_result = supabase_service.supabase.table("streaks")\
-            .select("*")\
+        streak_result = supabase_service.select("streaks.full")\
             .eq("user_id", user_id)\
             .single()\
             .execute()
@@ -124,18 +133,22 @@ async def record_progress(request: ProgressRequest):
                 "date": request.date.isoformat()
             }
         
+        bump_versions(request.user_id, "progress")
+        rollup_service.refresh_day(request.user_id, request.date)
+        
         # Update streaks automatically
         try:
             _update_streaks(request.user_id, request.date)
         except Exception as e:
             print(f"Error updating streaks: {e}")
         
-        # Check for new achievements (async, non-blocking)
+        # Check for new achievements (async, non-blocking; drained on shutdown)
         try:
-            from app.api.v1.motivation import check_achievements
-            # This will be called asynchronously
-            import asyncio
-            asyncio.create_task(check_achievements(request.user_id))
+            from app.api.v1.motivation import check_achievements, MotivationRequest
+            background_service.spawn(
+                check_achievements(MotivationRequest(user_id=request.user_id)),
+                name="check_achievements"
+            )
         except Exception as e:
             print(f"Error checking achievements: {e}")
         
@@ -273,6 +286,70 @@ async def get_progress_stats(user_id: str):
         raise HTTPException(status_code=500, detail=f"Error fetching progress stats: {str(e)}")
 
 
+@router.get("/progress/{user_id}/analytics")
+async def get_training_analytics(
+    user_id: str,
+    request: Request,
+    formula: str = "epley",
+    exercise: Optional[str] = None
+):
+    """
+    Get per-exercise training analytics over the user's full history
+
+    Args:
+        user_id: User identifier
+        formula: 1RM formula, "epley" (default) or "brzycki"
+        exercise: Optional exercise name to restrict the analysis to
+
+    Returns:
+        Per-exercise volume and estimated 1RM series with PRs, weekly tonnage
+        and intensity distribution; 304 when If-None-Match matches
+    """
+    from app.services.analytics_service import analytics_service, FORMULAS
+
+    if formula not in FORMULAS:
+        raise HTTPException(status_code=400, detail=f"formula must be one of: {', '.join(FORMULAS)}")
+    try:
+        etag = versioned_etag(user_id, ["progress"], formula, (exercise or "").lower())
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        analytics = await asyncio.to_thread(analytics_service.get_analytics, user_id, formula, exercise)
+        return conditional_response(request, analytics, etag)
+
+    except Exception as e:
+        print(f"Error computing training analytics: {e}")
+        raise HTTPException(status_code=500, detail=f"Error computing training analytics: {str(e)}")
+
+
+@router.get("/progress/{user_id}/records")
+async def get_personal_records(user_id: str, exercise: Optional[str] = None):
+    """
+    Get the user's personal records per exercise
+
+    Args:
+        user_id: User identifier
+        exercise: Optional exercise name to return a single record for
+
+    Returns:
+        Best weight, reps at each weight, best estimated 1RM, best session volume
+        and the last session's sets per exercise
+    """
+    from app.services.records_service import records_service
+
+    try:
+        records = records_service.get_records(user_id)
+        if exercise:
+            record = records.get(exercise.strip().lower())
+            return {"user_id": user_id, "records": [record] if record else [], "count": 1 if record else 0}
+
+        ordered = sorted(records.values(), key=lambda r: r.get("exercise_name") or "")
+        return {"user_id": user_id, "records": ordered, "count": len(ordered)}
+    except Exception as e:
+        print(f"Error fetching personal records: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching personal records: {str(e)}")
+
+
 @router.post("/progress/log-workout")
 async def log_workout(request: WorkoutLogRequest):
     """
@@ -333,17 +410,17 @@ async def log_workout(request: WorkoutLogRequest):
         
         # Save detailed exercises and sets data
         # Store as JSON in notes for now (can be migrated to a separate table later)
+        exercises = [
+            {
+                "name": ex.name,
+                "sets": [{"reps": s.reps, "weight": s.weight} for s in ex.sets]
+            }
+            for ex in request.exercises
+        ]
         try:
-            import json
             workout_data = {
                 "workout_type": request.type,
-                "exercises": [
-                    {
-                        "name": ex.name,
-                        "sets": [{"reps": s.reps, "weight": s.weight} for s in ex.sets]
-                    }
-                    for ex in request.exercises
-                ],
+                "exercises": exercises,
                 "total_volume": total_volume,
                 "total_sets": total_sets
             }
@@ -360,12 +437,34 @@ async def log_workout(request: WorkoutLogRequest):
         except Exception as e:
             print(f"Note: Could not save detailed workout data: {e}")
         
+        bump_versions(request.user_id, "progress")
+        rollup_service.refresh_day(request.user_id, workout_date)
+        
         # Update streaks automatically
         try:
             _update_streaks(request.user_id, workout_date)
         except Exception as e:
             print(f"Error updating streaks: {e}")
         
+        # Fold the session into the personal records and last-session indexes
+        from app.services.records_service import records_service
+        new_prs = []
+        try:
+            new_prs = records_service.record_workout(request.user_id, workout_date.isoformat(), exercises,
+                                                     progress_id=progress_id)
+        except Exception as e:
+            print(f"Error updating personal records: {e}")
+        if progress_id:
+            try:
+                last_sessions_service.record_session(request.user_id, progress_id, workout_date.isoformat(), {
+                    "workout_type": request.type,
+                    "exercises": exercises,
+                    "total_volume": total_volume,
+                    "total_sets": total_sets
+                })
+            except Exception as e:
+                print(f"Error updating last sessions: {e}")
+        
         return {
             "message": "Workout logged successfully",
             "progress_id": progress_id,
@@ -375,6 +474,7 @@ async def log_workout(request: WorkoutLogRequest):
             "total_sets": total_sets,
             "total_volume": total_volume,
             "estimated_duration": estimated_duration,
+            "new_prs": new_prs,
             "timestamp": datetime.utcnow().isoformat()
         }
     
@@ -402,8 +502,7 @@ async def delete_progress(progress_id: str):
             }
         
         # Get the progress record first to verify it exists and get user_id
-        progress_result = supabase_service.supabase.table("progress")\
-            .select("user_id")\
+        progress_result = supabase_service.select("progress.owner")\
             .eq("id", progress_id)\
             .single()\
             .execute()
@@ -420,6 +519,17 @@ async def delete_progress(progress_id: str):
             .eq("user_id", user_id)\
             .execute()
         
+        bump_versions(user_id, "progress")
+        rollup_service.refresh_day(user_id, progress_result.data.get("workout_date"))
+        
+        # Records may have come from the deleted session; rebuild them from what is left
+        from app.services.records_service import records_service
+        try:
+            records_service.rebuild(user_id)
+            last_sessions_service.rebuild(user_id)
+        except Exception as e:
+            print(f"Error rebuilding workout indexes: {e}")
+        
         # Note: We might want to update streaks here, but for simplicity we'll leave it
         # The streaks will be recalculated on the next workout
         
@@ -449,8 +559,7 @@ async def update_progress(progress_id: str, request: UpdateProgressRequest):
             }
 
         # Ensure record exists and belongs to user
-        progress_result = supabase_service.supabase.table("progress")\
-            .select("*")\
+        progress_result = supabase_service.select("progress.ownership")\
             .eq("id", progress_id)\
             .single()\
             .execute()
@@ -488,6 +597,17 @@ async def update_progress(progress_id: str, request: UpdateProgressRequest):
             .update(update_data)\
             .eq("id", progress_id)\
             .execute()
+        bump_versions(request.user_id, "progress")
+        rollup_service.refresh_day(request.user_id, progress_result.data.get("workout_date"))
+        if update_data.get("workout_date") and update_data["workout_date"] != progress_result.data.get("workout_date"):
+            rollup_service.refresh_day(request.user_id, update_data["workout_date"])
+
+        from app.services.records_service import records_service
+        try:
+            records_service.rebuild(request.user_id)
+            last_sessions_service.rebuild(request.user_id)
+        except Exception as e:
+            print(f"Error rebuilding workout indexes: {e}")
 
         return {
             "message": "Progress record updated successfully",
@@ -503,25 +623,54 @@ async def update_progress(progress_id: str, request: UpdateProgressRequest):
 
 
 @router.get("/progress/{user_id}/body-comp")
-async def get_body_comp(user_id: str):
+async def get_body_comp(
+    user_id: str,
+    request: Request,
+    response: Response,
+    raw_limit: int = 365,
+    points: int = 200,
+    half_life_days: float = 7.0,
+    goal_weight: Optional[float] = None,
+    goal_fat: Optional[float] = None,
+    goal_muscle: Optional[float] = None
+):
     """
-    Get body composition history stored in body_composition table
+    Get body composition history stored in body_composition table, with trends
+    Answers If-None-Match with 304 while no measurement was written
+
+    Args:
+        user_id: User identifier
+        raw_limit: Most recent raw measurements returned in "history" (default 365)
+        points: Maximum points per downsampled trend series (default 200)
+        half_life_days: Smoothing half-life in days (default 7)
+        goal_weight / goal_fat / goal_muscle: Optional goals to project the trend to
+
+    Returns:
+        history (bounded raw window, oldest first), history_total and a trend block
+        per metric (smoothed downsampled series, weekly rate, projection)
     """
     try:
+        from app.services.body_trend_service import body_trend_service
+
+        raw_limit = max(1, min(raw_limit, 5000))
+        points = max(3, min(points, 2000))
+        goals = {"weight": goal_weight, "fat": goal_fat, "muscle": goal_muscle}
+        etag = versioned_etag(user_id, ["body_comp"], raw_limit, points, half_life_days, goal_weight, goal_fat, goal_muscle)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         if not supabase_service.is_connected():
             # Mock data
             return {
-                "history": []
+                "history": [],
+                "history_total": 0,
+                "trend": body_trend_service.build_trends([])
             }
 
-        result = supabase_service.supabase.table("body_composition")\
-            .select("date, muscle, fat, weight, notes")\
-            .eq("user_id", user_id)\
-            .order("date", desc=False)\
-            .execute()
+        rows = await asyncio.to_thread(body_trend_service.fetch_series, user_id)
 
         history = []
-        for row in result.data or []:
+        for row in rows[-raw_limit:]:
             history.append({
                 "date": row.get("date"),
                 "muscle": row.get("muscle"),
@@ -530,8 +679,11 @@ async def get_body_comp(user_id: str):
                 "notes": row.get("notes")
             })
 
+        with_etag(response, etag)
         return {
-            "history": history
+            "history": history,
+            "history_total": len(rows),
+            "trend": body_trend_service.build_trends(rows, half_life_days, points, goals)
         }
     except Exception as e:
         print(f"Error fetching body comp: {e}")
@@ -563,6 +715,7 @@ async def save_body_comp(request: BodyCompRequest):
         supabase_service.supabase.table("body_composition")\
             .upsert(payload, on_conflict="user_id,date", ignore_duplicates=False)\
             .execute()
+        bump_versions(request.user_id, "body_comp")
 
         # Keep user_profiles in sync with latest measurement
         try:
@@ -575,6 +728,7 @@ async def save_body_comp(request: BodyCompRequest):
                     "updated_at": datetime.utcnow().isoformat()
                 }, on_conflict="user_id")\
                 .execute()
+            cache_service.invalidate("profile", request.user_id)
         except Exception as e:
             print(f"Warning: could not sync user_profiles with body composition: {e}")
 
@@ -591,66 +745,16 @@ async def save_body_comp(request: BodyCompRequest):
 @router.get("/progress/{user_id}/last")
 async def get_last_workout(user_id: str, type: Optional[str] = None):
     """
-    Get last workout with detailed exercises (from notes JSON)
-    Optionally filter by workout type
+    Get last workout with detailed exercises
+    Optionally filter by workout type (exact match)
+
+    Served from the last_sessions index, so sessions of any age are found in one lookup
     """
     try:
         if not supabase_service.is_connected():
             return {"workout": None}
 
-        query = supabase_service.supabase.table("progress")\
-            .select("id, workout_date, notes")\
-            .eq("user_id", user_id)\
-            .order("workout_date", desc=True)\
-            .limit(50)
-        result = query.execute()
-
-        def parse_workout(row):
-            notes = row.get("notes") or ""
-            
-            # Intentar varios formatos de parseo
-            try:
-                # Formato 1: "--- Datos detallados ---" seguido de JSON
-                if "--- Datos detallados ---" in notes:
-                    json_part = notes.split("--- Datos detallados ---")[1].strip()
-                    data = json.loads(json_part)
-                    data["date"] = row.get("workout_date")
-                    data["id"] = row.get("id")
-                    return data
-                
-                # Formato 2: "WORKOUT_DATA:" seguido de JSON
-                if "WORKOUT_DATA:" in notes:
-                    idx = notes.find("WORKOUT_DATA:")
-                    json_str = notes[idx + len("WORKOUT_DATA:"):].strip()
-                    data = json.loads(json_str)
-                    data["date"] = row.get("workout_date")
-                    data["id"] = row.get("id")
-                    return data
-                
-                # Formato 3: JSON directo en cualquier parte
-                json_match = re.search(r'\{[\s\S]+\}', notes)
-                if json_match:
-                    data = json.loads(json_match.group())
-                    if data.get("exercises") or data.get("workout_type"):
-                        data["date"] = row.get("workout_date")
-                        data["id"] = row.get("id")
-                        return data
-                
-                return None
-            except Exception as e:
-                return None
-
-        for row in result.data or []:
-            parsed = parse_workout(row)
-            if not parsed:
-                continue
-            if type and parsed.get("workout_type") != type:
-                continue
-            return {"workout": parsed}
-
-        return {"workout": None}
+        return {"workout": last_sessions_service.get_last_session(user_id, type)}
     except Exception as e:
         print(f"Error fetching last workout: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching last workout: {str(e)}")
-
-
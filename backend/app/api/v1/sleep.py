@@ -7,10 +7,75 @@ from fastapi import APIRouter, HTTPException
 from datetime import datetime, date, timedelta
 from app.models.schemas import SleepRequest, SleepResponse, SleepRecord
 from app.services.supabase_service import supabase_service
+from app.core.http_cache import bump_versions
 
 router = APIRouter()
 
 
+def build_sleep_widget(user_id: str, sleep_data: list, days: int = 7) -> dict:
+    """
+    Build the sleep widget payload from formatted sleep rows
+    
+    Args:
+        user_id: User identifier
+        sleep_data: List of {"date", "hours"} records
+        days: Number of days to include in the history
+    
+    Returns:
+        Sleep widget dict (shared by /sleep and /dashboard)
+    """
+    today = date.today()
+    today_str = today.isoformat()
+    
+    # Build a map of date -> hours for quick lookup
+    sleep_map = {}
+    if sleep_data:
+        for s in sleep_data:
+            record_date = s.get("date", "")
+            # Normalize date strings
+            if isinstance(record_date, str):
+                record_date = record_date.split('T')[0] if 'T' in record_date else record_date
+                record_date = record_date.split(' ')[0] if ' ' in record_date else record_date
+            
+            hours = float(s.get("hours", 0))
+            sleep_map[str(record_date)] = hours
+    
+    # Get today's sleep
+    today_hours_value = sleep_map.get(today_str, 0)
+    today_hours = int(today_hours_value)
+    today_minutes = int(round((today_hours_value - today_hours) * 60))
+    
+    # Build history
+    last_7_days = []
+    for i in range(days):
+        day_date = today - timedelta(days=i)
+        day_str = day_date.isoformat()
+        day_hours_value = sleep_map.get(day_str, 0)
+        
+        last_7_days.append({
+            "date": day_str,
+            "hours": day_hours_value
+        })
+    
+    # Reverse to get chronological order (oldest to newest)
+    last_7_days.reverse()
+    
+    # Calculate average
+    total = sum(day["hours"] for day in last_7_days if day["hours"] > 0)
+    count = sum(1 for day in last_7_days if day["hours"] > 0)
+    average = total / count if count > 0 else 0
+    
+    return {
+        "user_id": user_id,
+        "hours": today_hours,
+        "minutes": today_minutes,
+        "total_hours": today_hours_value,
+        "last_7_days": last_7_days,
+        "average_sleep": average,
+        "success": True
+    }
+
+
 @router.post("/sleep", response_model=dict)
 async def record_sleep(request: SleepRequest):
     """
@@ -30,6 +95,7 @@ async def record_sleep(request: SleepRequest):
             hours=request.hours,
             minutes=request.minutes or 0
         )
+        bump_versions(request.user_id, "sleep")
         
         # Get updated sleep data for today
         sleep_data = supabase_service.get_sleep_data(request.user_id, days=1)
@@ -79,58 +145,9 @@ async def get_sleep_data(user_id: str, days: int = 7):
     """
     try:
         sleep_data = supabase_service.get_sleep_data(user_id, days=days)
-        
-        today = date.today()
-        today_str = today.isoformat()
-        
-        # Build a map of date -> hours for quick lookup
-        sleep_map = {}
-        if sleep_data:
-            for s in sleep_data:
-                record_date = s.get("date", "")
-                # Normalize date strings
-                if isinstance(record_date, str):
-                    record_date = record_date.split('T')[0] if 'T' in record_date else record_date
-                    record_date = record_date.split(' ')[0] if ' ' in record_date else record_date
-                
-                hours = float(s.get("hours", 0))
-                sleep_map[str(record_date)] = hours
-        
-        # Get today's sleep
-        today_hours_value = sleep_map.get(today_str, 0)
-        today_hours = int(today_hours_value)
-        today_minutes = int(round((today_hours_value - today_hours) * 60))
-        
-        # Build history
-        last_7_days = []
-        for i in range(days):
-            day_date = today - timedelta(days=i)
-            day_str = day_date.isoformat()
-            day_hours_value = sleep_map.get(day_str, 0)
-            
-            last_7_days.append({
-                "date": day_str,
-                "hours": day_hours_value
-            })
-        
-        # Reverse to get chronological order (oldest to newest)
-        last_7_days.reverse()
-        
-        # Calculate average
-        total = sum(day["hours"] for day in last_7_days if day["hours"] > 0)
-        count = sum(1 for day in last_7_days if day["hours"] > 0)
-        average = total / count if count > 0 else 0
-        
-        # Return simple JSON response
-        response = {
-            "user_id": user_id,
-            "hours": today_hours,
-            "minutes": today_minutes,
-            "total_hours": today_hours_value,
-            "last_7_days": last_7_days,
-            "average_sleep": average,
-            "success": True
-        }
+        response = build_sleep_widget(user_id, sleep_data, days)
+        today_hours = response["hours"]
+        today_minutes = response["minutes"]
         
         print(f"Sleep GET response: hours={today_hours}, minutes={today_minutes}")
         
@@ -3,14 +3,71 @@ Water Tracking API Endpoints
 Handles water intake tracking and history
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from datetime import datetime, date, timedelta
 from app.models.schemas import WaterRequest, WaterResponse, WaterRecord
 from app.services.supabase_service import supabase_service
+from app.core.http_cache import versioned_etag, bump_versions, etag_matches, not_modified, with_etag
 
 router = APIRouter()
 
 
+def build_water_widget(user_id: str, water_data: list, days: int = 7) -> dict:
+    """
+    Build the water widget payload from formatted water rows
+    
+    Args:
+        user_id: User identifier
+        water_data: List of {"date", "water_ml"} records
+        days: Number of days to include in the history
+    
+    Returns:
+        Water widget dict (shared by /water and /dashboard)
+    """
+    today = date.today()
+    today_str = today.isoformat()
+    
+    # Build a map of date -> water_ml for quick lookup
+    water_map = {}
+    if water_data:
+        for w in water_data:
+            record_date = w.get("date", "")
+            # Normalize date strings
+            if isinstance(record_date, str):
+                record_date = record_date.split('T')[0] if 'T' in record_date else record_date
+                record_date = record_date.split(' ')[0] if ' ' in record_date else record_date
+            
+            water_ml = int(w.get("water_ml", 0) or 0)
+            water_map[str(record_date)] = water_ml
+    
+    # Get today's water
+    total_today = water_map.get(today_str, 0)
+    
+    # Build history
+    last_7_days = []
+    for i in range(days):
+        day_date = today - timedelta(days=i)
+        day_str = day_date.isoformat()
+        day_water_ml = water_map.get(day_str, 0)
+        
+        last_7_days.append({
+            "date": day_str,
+            "water_ml": day_water_ml
+        })
+    
+    # Reverse to get chronological order (oldest to newest)
+    last_7_days.reverse()
+    
+    return {
+        "user_id": user_id,
+        "total_today": total_today,
+        "water_ml": total_today,  # Alias for compatibility
+        "last_7_days": last_7_days,
+        "goal": 2000,
+        "success": True
+    }
+
+
 @router.post("/water", response_model=dict)
 async def record_water(request: WaterRequest):
     """
@@ -29,6 +86,7 @@ async def record_water(request: WaterRequest):
             water_date=request.date,
             water_ml=request.water_ml
         )
+        bump_versions(request.user_id, "water")
         
         # Get updated water data for today
         water_data = supabase_service.get_water_data(request.user_id, days=1)
@@ -61,7 +119,7 @@ async def record_water(request: WaterRequest):
 
 
 @router.get("/water/{user_id}")
-async def get_water_data(user_id: str, days: int = 7):
+async def get_water_data(user_id: str, request: Request, response: Response, days: int = 7):
     """
     Get user's water intake data
     
@@ -70,58 +128,21 @@ async def get_water_data(user_id: str, days: int = 7):
         days: Number of days to retrieve (default: 7)
     
     Returns:
-        Simple JSON response with water data
+        Simple JSON response with water data (304 when If-None-Match matches)
     """
     try:
-        water_data = supabase_service.get_water_data(user_id, days=days)
+        etag = versioned_etag(user_id, ["water"], days, date.today().isoformat())
+        if etag_matches(request, etag):
+            return not_modified(etag)
         
-        today = date.today()
-        today_str = today.isoformat()
-        
-        # Build a map of date -> water_ml for quick lookup
-        water_map = {}
-        if water_data:
-            for w in water_data:
-                record_date = w.get("date", "")
-                # Normalize date strings
-                if isinstance(record_date, str):
-                    record_date = record_date.split('T')[0] if 'T' in record_date else record_date
-                    record_date = record_date.split(' ')[0] if ' ' in record_date else record_date
-                
-                water_ml = int(w.get("water_ml", 0) or 0)
-                water_map[str(record_date)] = water_ml
-        
-        # Get today's water
-        total_today = water_map.get(today_str, 0)
-        
-        # Build history
-        last_7_days = []
-        for i in range(days):
-            day_date = today - timedelta(days=i)
-            day_str = day_date.isoformat()
-            day_water_ml = water_map.get(day_str, 0)
-            
-            last_7_days.append({
-                "date": day_str,
-                "water_ml": day_water_ml
-            })
-        
-        # Reverse to get chronological order (oldest to newest)
-        last_7_days.reverse()
-        
-        # Return simple JSON response
-        response = {
-            "user_id": user_id,
-            "total_today": total_today,
-            "water_ml": total_today,  # Alias for compatibility
-            "last_7_days": last_7_days,
-            "goal": 2000,
-            "success": True
-        }
+        water_data = supabase_service.get_water_data(user_id, days=days)
+        payload = build_water_widget(user_id, water_data, days)
+        total_today = payload["total_today"]
         
         print(f"Water GET response: total_today={total_today}")
         
-        return response
+        with_etag(response, etag)
+        return payload
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching water data: {str(e)}")
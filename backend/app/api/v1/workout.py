@@ -7,6 +7,7 @@ from fastapi import APIRouter, HTTPException
 from datetime import datetime, date, timedelta
 from app.models.schemas import WorkoutRequest, WorkoutResponse
 from app.services.supabase_service import supabase_service
+from app.core.http_cache import bump_versions
 
 router = APIRouter()
 
@@ -28,6 +29,7 @@ async def mark_workout_day(request: WorkoutRequest):
             user_id=request.user_id,
             workout_date=request.date
         )
+        bump_versions(request.user_id, "progress")
         
         return {
             "success": True,
@@ -0,0 +1,208 @@
+"""
+Response Compression Middleware
+gzip, plus brotli and zstd when their packages are installed, negotiated via Accept-Encoding
+
+Only compressible content types are encoded, and only once the body reaches
+COMPRESSION_MIN_SIZE bytes (small payloads cost more to compress than they
+save). Server-sent event streams, responses that already carry a
+Content-Encoding, and WebSocket traffic pass through untouched. Streaming
+responses are compressed chunk by chunk once past the threshold.
+"""
+
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/javascript", "application/xml", "application/problem+json",
+    "text/", "image/svg+xml",
+)
+
+
+class _Encoder:
+    """Incremental compressor with a common compress()/finish() interface"""
+
+    def __init__(self, compress: Callable[[bytes], bytes], finish: Callable[[], bytes]):
+        self.compress = compress
+        self.finish = finish
+
+
+def _gzip_encoder(level: int) -> _Encoder:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return _Encoder(compressor.compress, compressor.flush)
+
+
+def _brotli_encoder(quality: int) -> _Encoder:
+    compressor = brotli.Compressor(quality=quality)
+    process = getattr(compressor, "process", None) or compressor.compress
+    return _Encoder(process, compressor.finish)
+
+
+def _zstd_encoder(level: int) -> _Encoder:
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return _Encoder(compressor.compress, compressor.flush)
+
+
+def available_encodings() -> List[str]:
+    """Encodings this process can produce"""
+    return [name for name, ok in (("br", brotli), ("zstd", zstandard), ("gzip", True)) if ok]
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Accept-Encoding header -> {coding: q} ("gzip, br;q=0.8" -> {"gzip": 1.0, "br": 0.8})"""
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing HTTP responses
+
+    Args:
+        app: Wrapped application
+        minimum_size: Bodies smaller than this many bytes are sent as-is
+        encodings: Server preference order among "br", "zstd", "gzip" (unavailable ones are skipped)
+        gzip_level / brotli_quality / zstd_level: Compression settings per encoding
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, encodings: Optional[List[str]] = None,
+                 gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        available = available_encodings()
+        self.encodings = [e for e in (encodings or ["br", "zstd", "gzip"]) if e in available]
+        self._factories: Dict[str, Callable[[], _Encoder]] = {
+            "gzip": lambda: _gzip_encoder(gzip_level),
+            "br": lambda: _brotli_encoder(brotli_quality),
+            "zstd": lambda: _zstd_encoder(zstd_level),
+        }
+
+    def _choose(self, scope: Scope) -> Optional[str]:
+        accepted = parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        wildcard = accepted.get("*", 0.0)
+        candidates = [e for e in self.encodings if accepted.get(e, wildcard) > 0]
+        if not candidates:
+            return None
+        # Highest client q wins; ties go to the server's preference order
+        return max(candidates, key=lambda e: (accepted.get(e, wildcard), -self.encodings.index(e)))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = self._choose(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(send, encoding, self._factories[encoding], self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Per-response state: holds the start message until the body size is known"""
+
+    def __init__(self, send: Send, encoding: str, factory: Callable[[], _Encoder], minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.factory = factory
+        self.minimum_size = minimum_size
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.encoder: Optional[_Encoder] = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+
+    def _skip(self, message: Message) -> bool:
+        headers = Headers(raw=message["headers"])
+        content_type = headers.get("content-type", "").lower()
+        return (
+            message["status"] < 200 or message["status"] in (204, 304)
+            or "content-encoding" in headers
+            or content_type.startswith("text/event-stream")
+            or not content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+
+    def _start_headers(self, length: Optional[int]) -> Message:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+        return self.start
+
+    async def _send_uncompressed(self) -> None:
+        """Whole body stayed under the threshold: send it as the app produced it"""
+        body = b"".join(self.buffer)
+        self.buffer, self.passthrough = [], True
+        MutableHeaders(raw=self.start["headers"]).add_vary_header("Accept-Encoding")
+        await self._send(self.start)
+        await self._send({"type": "http.response.body", "body": body, "more_body": False})
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = self._skip(message)
+            if self.passthrough:
+                await self._send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+
+        if self.encoder is not None:
+            chunk = self.encoder.compress(body) + (b"" if more_body else self.encoder.finish())
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        self.buffer.append(body)
+        self.buffered += len(body)
+        if self.buffered < self.minimum_size:
+            if not more_body:
+                await self._send_uncompressed()
+            return
+
+        self.encoder = self.factory()
+        data = b"".join(self.buffer)
+        self.buffer = []
+        if not more_body:
+            compressed = self.encoder.compress(data) + self.encoder.finish()
+            await self._send(self._start_headers(len(compressed)))
+            await self._send({"type": "http.response.body", "body": compressed, "more_body": False})
+            return
+        # Streaming: length unknown up front
+        await self._send(self._start_headers(None))
+        await self._send({"type": "http.response.body", "body": self.encoder.compress(data), "more_body": True})
@@ -42,6 +42,73 @@ class Settings(BaseSettings):
     
     # Database (if needed separately)
     DATABASE_URL: str = ""
+    
+    # HTTP caching - version-based ETags are rotated after this many seconds, a bound
+    # on staleness for writes that reach the database without bumping a write version
+    ETAG_VERSION_TTL_SECONDS: int = 60
+    
+    # Cached progress summaries miss after the user's next write (shared version); idle ones are dropped after this TTL
+    PROGRESS_SUMMARY_TTL_SECONDS: int = 300
+    
+    # Materialized views for coach/admin dashboards (see SUPABASE_SETUP_SQL.txt)
+    MATVIEW_REFRESH_ENABLED: bool = True
+    MATVIEW_REFRESH_INTERVAL_SECONDS: int = 300  # Regular refresh cadence per view
+    MATVIEW_MIN_REFRESH_SECONDS: int = 30  # Earliest re-refresh of a view marked dirty by a write
+    MATVIEW_MAX_STALENESS_SECONDS: int = 900  # Older (or dirty) views are skipped in favour of live queries
+    
+    # Fill missing macros of meal foods from the bundled food database when meals are saved
+    FOOD_AUTOFILL_ENABLED: bool = True
+    
+    # Coach chat WebSocket: keepalive interval, and whether each keepalive also checks the
+    # database for messages sent through another worker (enable with several workers)
+    CHAT_WS_PING_SECONDS: int = 25
+    CHAT_WS_CATCHUP_ON_PING: bool = False
+    
+    # Coach chat unread counters live in-process for this long after their last change
+    UNREAD_COUNT_TTL_SECONDS: int = 30
+    
+    # AI chat context: the latest messages of each conversation are kept in memory and
+    # re-read from the database after the TTL (picks up turns served by another worker)
+    CHAT_CONTEXT_MESSAGES: int = 5
+    CHAT_CONTEXT_TTL_SECONDS: int = 300
+    CHAT_CONTEXT_MAX_CONVERSATIONS: int = 2000
+    
+    # Generate conversation titles/summaries with a short OpenAI completion (local heuristic otherwise)
+    CHAT_SUMMARY_USE_MODEL: bool = True
+    
+    # Cold start: warn at startup when importing the app took longer than this (0 disables)
+    STARTUP_BUDGET_MS: int = 1500
+    
+    # Lifespan: warm clients/caches in the background after startup, and on shutdown wait
+    # this long for pending background tasks before cancelling them
+    WARMUP_ENABLED: bool = True
+    WARMUP_PROFILES: int = 100
+    SHUTDOWN_DRAIN_SECONDS: float = 10.0
+    
+    # Profiles cached for chat context are dropped on upsert, or after this TTL (API reads are never cached)
+    PROFILE_CACHE_TTL_SECONDS: int = 300
+    
+    # Response compression: encodings in server preference order ("br" and "zstd" need the
+    # brotli / zstandard packages and are skipped when missing); smaller bodies are sent as-is
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_ENCODINGS: List[str] = ["br", "zstd", "gzip"]
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    
+    # LLM endpoints (/chat, /motivation/message): token buckets per user and global per
+    # endpoint, and a daily completion-token budget per user (0 disables it). When limited,
+    # "degrade" answers with a cached/mock response and "reject" returns 429. Set
+    # RATE_LIMIT_REDIS_URL (needs the redis package) to share limits between workers
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_MODE: str = "degrade"
+    RATE_LIMIT_USER_PER_MINUTE: int = 10
+    RATE_LIMIT_USER_BURST: int = 5
+    RATE_LIMIT_GLOBAL_PER_MINUTE: int = 300
+    RATE_LIMIT_GLOBAL_BURST: int = 60
+    LLM_DAILY_TOKENS_PER_USER: int = 50000
+    RATE_LIMIT_REDIS_URL: str = ""
 
 
 # Global settings instance
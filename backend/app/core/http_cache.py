@@ -0,0 +1,112 @@
+"""
+HTTP Cache Helpers
+ETag generation and conditional GET (If-None-Match) handling
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Hashable, Iterable, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.services.cache_service import cache_service
+from app.services.supabase_service import supabase_service
+
+
+def compute_etag(payload: Any) -> str:
+    """
+    Build a weak ETag from a JSON-serialisable payload
+
+    Args:
+        payload: Response body (dict/list) to fingerprint
+
+    Returns:
+        Weak ETag string, e.g. W/"3f2a..."
+    """
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+def versioned_etag(key: Hashable, scopes: Iterable[str], *vary: Any) -> Optional[str]:
+    """
+    Build a weak ETag from write versions, without reading the payload
+
+    The tag combines the write versions of every scope for the key (bumped by the
+    write routes via bump_versions and shared by every worker), any extra request
+    parameters that change the payload, and a rotating epoch bounded by
+    ETAG_VERSION_TTL_SECONDS.
+
+    Args:
+        key: Version key, usually the user_id
+        scopes: Resource scopes the payload depends on (e.g. ["water", "sleep"])
+        vary: Extra values that change the payload (query params, today's date...)
+
+    Returns:
+        The ETag, or None when the versions cannot be read (no 304 can be trusted then)
+    """
+    scopes = list(scopes)
+    versions = supabase_service.get_write_versions(str(key), scopes)
+    if versions is None:
+        return None
+    ttl = max(1, settings.ETAG_VERSION_TTL_SECONDS)
+    epoch = int(time.time() // ttl)
+    # Mock-mode versions live in this process only, so they must not match another process's tags
+    origin = "db" if supabase_service.is_connected() else cache_service.boot_id
+    tags = ".".join(f"{scope}{versions[scope]}" for scope in scopes)
+    raw = f"{origin}|{epoch}|{key}|{tags}|" + "|".join(str(v) for v in vary)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+def bump_versions(key: Optional[Hashable], *scopes: str) -> None:
+    """Record a write for key in each scope, invalidating versioned ETags on every worker"""
+    if not key:
+        return
+    supabase_service.bump_write_versions(str(key), *scopes)
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Check whether the request's If-None-Match header matches the given ETag (never for None)"""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    # Compare ignoring the weak prefix, as recommended for If-None-Match
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """Build an empty 304 response carrying the ETag"""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def with_etag(response: Response, etag: Optional[str]) -> None:
+    """Attach an ETag to the outgoing response (keeps response_model handling intact)"""
+    if etag:
+        response.headers["ETag"] = etag
+
+
+def conditional_response(request: Request, payload: Any, etag: Optional[str] = None) -> Any:
+    """
+    Return a 304 if the client already has this payload, otherwise the payload with its ETag
+
+    Args:
+        request: Incoming request (for If-None-Match)
+        payload: Response body
+        etag: Precomputed ETag (computed from payload when omitted)
+    """
+    etag = etag or compute_etag(payload)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return FastJSONResponse(content=jsonable_encoder(payload), headers={"ETag": etag})
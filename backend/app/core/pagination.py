@@ -0,0 +1,107 @@
+"""
+Keyset Pagination Helpers
+Opaque (created_at, id) cursors for paging through time-ordered tables
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Hard cap on page size for any paginated endpoint
+MAX_PAGE_SIZE = 500
+
+
+def clamp_limit(limit: int, default: int = 50) -> int:
+    """Keep a requested page size within 1..MAX_PAGE_SIZE"""
+    if not limit or limit < 1:
+        return default
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Build an opaque cursor from a row's created_at and id"""
+    raw = json.dumps({"t": row.get("created_at"), "id": str(row.get("id"))}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def parse_cursor_key(created_at: Any, row_id: Any) -> Tuple[str, str]:
+    """
+    Validate a cursor's (created_at, id) before it is interpolated into a filter
+
+    Returns:
+        (ISO timestamp, canonical UUID), re-serialized so only safe characters remain
+
+    Raises:
+        ValueError: If created_at is not an ISO timestamp or id is not a UUID
+    """
+    try:
+        timestamp = datetime.fromisoformat(str(created_at)).isoformat()
+        canonical_id = str(uuid.UUID(str(row_id)))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    return timestamp, canonical_id
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Decode a cursor into (created_at, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        created_at, row_id = data["t"], data["id"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return parse_cursor_key(created_at, row_id)
+
+
+def apply_before_cursor(query, cursor: Optional[str]):
+    """
+    Restrict a query to rows strictly older than the cursor, ordered newest first
+
+    Uses (created_at, id) as the key so rows sharing a timestamp are never skipped.
+    """
+    decoded = decode_cursor(cursor)
+    if decoded:
+        created_at, row_id = decoded
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt.{row_id})'
+        )
+    return query.order("created_at", desc=True).order("id", desc=True)
+
+
+def apply_after_cursor(query, cursor: Optional[str]):
+    """
+    Restrict a query to rows strictly newer than the cursor, ordered oldest first
+
+    The counterpart of apply_before_cursor, used to catch up after a reconnect.
+    """
+    decoded = decode_cursor(cursor)
+    if decoded:
+        created_at, row_id = decoded
+        query = query.or_(
+            f'created_at.gt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.gt.{row_id})'
+        )
+    return query.order("created_at", desc=False).order("id", desc=False)
+
+
+def build_page(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Turn a newest-first result fetched with limit + 1 into a chronological page
+
+    Returns:
+        (rows oldest-to-newest, cursor for the next older page or None)
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]) if has_more and rows else None
+    return list(reversed(rows)), next_cursor
@@ -0,0 +1,68 @@
+"""
+JSON Response Helpers
+Fast JSON rendering (orjson when installed) and a shortcut for already-trusted payloads
+
+FastJSONResponse is the app's default response class: routes keep their
+response_model validation and jsonable_encoder pass, only the final dump is
+faster. trusted_json() skips both for payloads built from raw database rows
+(plain dicts/lists of JSON types, dates and numbers), which are then encoded in
+one orjson call. Without orjson both fall back to the standard json module.
+"""
+
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional dependency: fall back to the json module
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Encode the non-JSON types found in DB rows and service results"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    if hasattr(value, "tolist"):  # numpy arrays
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def trusted_json(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    """
+    Return a payload without response_model validation or jsonable_encoder
+
+    Only for payloads whose shape is already trusted (raw DB rows and plain
+    dicts built from them); anything else should go through the normal route.
+    """
+    return FastJSONResponse(content=content, status_code=status_code, headers=headers)
@@ -0,0 +1,15 @@
+"""
+Text Helpers
+Accent- and case-insensitive normalization shared by the in-memory search indexes
+"""
+
+import re
+import unicodedata
+from typing import Any
+
+
+def normalize(text: Any) -> str:
+    """Lowercase, strip accents and punctuation ("Plátano (maduro)" -> "platano maduro")"""
+    decomposed = unicodedata.normalize("NFKD", str(text or "").lower())
+    plain = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", plain).split())
@@ -3,19 +3,54 @@ FastAPI Main Application
 Application entry point for the Rubén Fitness Backend API
 """
 
+import time
+
+# Measured before the framework and routers are imported (see STARTUP_BUDGET_MS)
+_import_started = time.perf_counter()
+
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1 import chat, progress, auth, sleep, water, workout, profile, motivation, admin, nutrition
+from app.api.v1 import chat, progress, auth, sleep, water, workout, profile, motivation, admin, nutrition, dashboard
 from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.core.compression import CompressionMiddleware
 from app.services.supabase_service import supabase_service
+from app.services.matview_service import matview_service
+from app.services.background_service import background_service
+from app.services.warmup_service import warmup_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup: check the cold-start budget, start background workers and warm
+    clients/caches in the background. Shutdown: stop workers and drain pending
+    background tasks until SHUTDOWN_DRAIN_SECONDS.
+    """
+    if settings.STARTUP_BUDGET_MS and import_ms > settings.STARTUP_BUDGET_MS:
+        print(f"[startup] Warning: app import took {import_ms} ms (budget {settings.STARTUP_BUDGET_MS} ms); "
+              f"run backend/bench_startup.py to find the slow modules")
+    else:
+        print(f"[startup] App imported in {import_ms} ms")
+    background_service.register_worker("matview_refresh", matview_service.start, matview_service.stop)
+    background_service.start_workers()
+    if settings.WARMUP_ENABLED:
+        background_service.run_in_thread(warmup_service.run, name="warmup")
+    yield
+    result = await background_service.shutdown(settings.SHUTDOWN_DRAIN_SECONDS)
+    print(f"[shutdown] Background tasks drained: {result['drained']}, cancelled: {result['cancelled']}")
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Rubén Fitness API",
     description="AI-powered fitness training platform API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS to allow frontend requests
@@ -41,6 +76,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        encodings=settings.COMPRESSION_ENCODINGS,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+    )
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1", tags=["Auth"])
 app.include_router(chat.router, prefix="/api/v1", tags=["Chat"])
@@ -52,6 +97,10 @@ app.include_router(profile.router, prefix="/api/v1", tags=["Profile"])
 app.include_router(motivation.router, prefix="/api/v1", tags=["Motivation"])
 app.include_router(nutrition.router, prefix="/api/v1", tags=["Nutrition"])
 app.include_router(admin.router, prefix="/api/v1", tags=["Admin"])
+app.include_router(dashboard.router, prefix="/api/v1", tags=["Dashboard"])
+
+# External clients (Supabase, OpenAI) are built on first use, so this covers imports only
+import_ms = round((time.perf_counter() - _import_started) * 1000)
 
 
 @app.get("/")
@@ -79,6 +128,13 @@ async def test():
         "environment": os.getenv("ENVIRONMENT", "development"),
         "cors_origins": cors_origins if not is_production else ["*"],
         "supabase_connected": supabase_service.is_connected() if hasattr(supabase_service, 'is_connected') else False,
+        "import_ms": import_ms,
+        "warmup": warmup_service.results,
+        "background_tasks": {
+            "pending": background_service.pending(),
+            "completed": background_service.completed,
+            "failed": background_service.failed
+        },
         "timestamp": datetime.now().isoformat()
     }
 
@@ -51,6 +51,7 @@ class ChatResponse(BaseModel):
     message: str
     user_id: str
     timestamp: datetime
+    degraded: bool = False  # Canned answer served because the user hit an AI usage limit
 
 
 # Progress Models
@@ -207,6 +208,9 @@ class ConversationResponse(BaseModel):
     id: str
     user_id: str
     title: str
+    summary: Optional[str] = None
+    preview: Optional[str] = None
+    turn_count: int = 0
     created_at: datetime
     updated_at: datetime
 
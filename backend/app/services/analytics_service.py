@@ -0,0 +1,324 @@
+"""
+Training Analytics Service
+Per-exercise progression computed in batch over a user's full set history
+
+The history is flattened once into columnar NumPy arrays (one entry per set) and
+cached until the user's next progress write, so every metric below is a handful of
+vectorised group-bys instead of nested Python loops over parsed notes.
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.cache_service import cache_service
+from app.services.supabase_service import supabase_service
+from app.services.workout_data import parse_workout_notes
+
+# Rows fetched per request while loading the full history (PostgREST caps responses)
+HISTORY_PAGE_SIZE = 1000
+
+# Upper bound on how long an idle user's history stays in memory
+HISTORY_CACHE_TTL_SECONDS = 3600
+
+# 1RM formulas lose accuracy past ~12 reps; such sets count for volume only
+MAX_REPS_FOR_1RM = 12
+
+FORMULAS = ("epley", "brzycki")
+
+# Intensity zones as a fraction of the best estimated 1RM reached so far
+INTENSITY_EDGES = np.array([0.5, 0.6, 0.7, 0.8, 0.9])
+INTENSITY_LABELS = ["<50%", "50-60%", "60-70%", "70-80%", "80-90%", ">=90%"]
+
+
+class TrainingHistory:
+    """Columnar set history for one user (one array entry per set)"""
+
+    def __init__(self, session_dates: np.ndarray, exercise_names: List[str],
+                 session_idx: np.ndarray, exercise_idx: np.ndarray,
+                 reps: np.ndarray, weight: np.ndarray):
+        self.session_dates = session_dates      # datetime64[D], one per session, ascending
+        self.exercise_names = exercise_names    # display name per exercise code
+        self.session_idx = session_idx          # int32 per set
+        self.exercise_idx = exercise_idx        # int32 per set
+        self.reps = reps                        # float64 per set
+        self.weight = weight                    # float64 per set
+
+    @property
+    def total_sets(self) -> int:
+        return int(self.reps.size)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "TrainingHistory":
+        """
+        Build the columnar history from progress rows (id, workout_date, notes)
+
+        Args:
+            rows: Progress rows ordered by workout_date ascending
+        """
+        dates: List[str] = []
+        names: List[str] = []
+        codes: Dict[str, int] = {}
+        session_idx: List[int] = []
+        exercise_idx: List[int] = []
+        reps: List[float] = []
+        weight: List[float] = []
+
+        for row in rows:
+            payload = parse_workout_notes(row.get("notes"))
+            if not payload or not payload["exercises"] or not row.get("workout_date"):
+                continue
+            session = len(dates)
+            dates.append(str(row["workout_date"])[:10])
+            for ex in payload["exercises"]:
+                key = ex["name"].lower()
+                code = codes.get(key)
+                if code is None:
+                    code = codes[key] = len(names)
+                    names.append(ex["name"])
+                for s in ex["sets"]:
+                    session_idx.append(session)
+                    exercise_idx.append(code)
+                    reps.append(s["reps"])
+                    weight.append(s["weight"])
+
+        return cls(
+            session_dates=np.array(dates, dtype="datetime64[D]"),
+            exercise_names=names,
+            session_idx=np.array(session_idx, dtype=np.int32),
+            exercise_idx=np.array(exercise_idx, dtype=np.int32),
+            reps=np.array(reps, dtype=np.float64),
+            weight=np.array(weight, dtype=np.float64),
+        )
+
+
+def estimate_1rm(weight: np.ndarray, reps: np.ndarray, formula: str = "epley") -> np.ndarray:
+    """
+    Estimate one-rep max per set
+
+    Args:
+        weight: Load per set
+        reps: Repetitions per set
+        formula: "epley" (w * (1 + r/30)) or "brzycki" (w * 36 / (37 - r))
+
+    Returns:
+        Estimated 1RM per set; 0 for sets without load or above MAX_REPS_FOR_1RM reps
+    """
+    valid = (weight > 0) & (reps >= 1) & (reps <= MAX_REPS_FOR_1RM)
+    if formula == "brzycki":
+        estimate = weight * 36.0 / np.where(valid, 37.0 - reps, 1.0)
+    else:
+        estimate = weight * (1.0 + reps / 30.0)
+    # A single is the 1RM itself under either formula
+    estimate = np.where(reps == 1, weight, estimate)
+    return np.where(valid, estimate, 0.0)
+
+
+def _iso(day: np.datetime64) -> str:
+    return str(day.astype("datetime64[D]"))
+
+
+def _round(values: np.ndarray, digits: int = 1) -> List[float]:
+    return np.round(values, digits).tolist()
+
+
+def compute_analytics(history: TrainingHistory, formula: str = "epley",
+                      exercise: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Compute per-exercise progression, PRs, weekly tonnage and intensity distribution
+
+    Args:
+        history: Columnar set history
+        formula: 1RM formula ("epley" or "brzycki")
+        exercise: Optional exercise name filter (case-insensitive)
+
+    Returns:
+        Analytics payload
+    """
+    result: Dict[str, Any] = {
+        "formula": formula,
+        "totals": {"sessions": 0, "sets": 0, "volume": 0.0, "exercises": 0},
+        "exercises": [],
+        "weekly_tonnage": [],
+        "intensity_distribution": [{"range": label, "sets": 0} for label in INTENSITY_LABELS],
+        "recent_prs": [],
+    }
+
+    mask = np.ones(history.total_sets, dtype=bool)
+    if exercise:
+        wanted = [i for i, n in enumerate(history.exercise_names) if n.lower() == exercise.strip().lower()]
+        mask = np.isin(history.exercise_idx, wanted)
+    if not mask.any():
+        return result
+
+    sess = history.session_idx[mask]
+    ex = history.exercise_idx[mask]
+    reps = history.reps[mask]
+    weight = history.weight[mask]
+    volume = reps * weight
+    e1rm = estimate_1rm(weight, reps, formula)
+    n_sessions = history.session_dates.size
+    n_exercises = len(history.exercise_names)
+
+    # (exercise, session) groups; codes sort by exercise, then chronologically
+    group_key = ex.astype(np.int64) * n_sessions + sess
+    groups, inverse = np.unique(group_key, return_inverse=True)
+    g_ex = groups // n_sessions
+    g_sess = groups % n_sessions
+    g_volume = np.bincount(inverse, weights=volume)
+    g_sets = np.bincount(inverse)
+    g_best = np.zeros(groups.size)
+    np.maximum.at(g_best, inverse, e1rm)
+
+    # PRs: a session beats the running best of all earlier sessions of the exercise.
+    # Offsetting each exercise by more than any value lets one cumulative max run per group.
+    offset = float(g_best.max()) + 1.0
+    running = np.maximum.accumulate(g_best + g_ex * offset) - g_ex * offset
+    first = np.r_[True, g_ex[1:] != g_ex[:-1]]
+    previous_best = np.r_[0.0, running[:-1]]
+    # Compare at 0.1 kg so rounding noise between set combinations never counts as a PR
+    g_pr = ~first & (np.round(g_best, 1) > np.round(previous_best, 1)) & (g_best > 0)
+
+    # Per-exercise aggregates
+    ex_volume = np.bincount(ex, weights=volume, minlength=n_exercises)
+    ex_sets = np.bincount(ex, minlength=n_exercises)
+    ex_best = np.zeros(n_exercises)
+    np.maximum.at(ex_best, ex, e1rm)
+    ex_prs = np.bincount(g_ex[g_pr], minlength=n_exercises)
+    bounds = np.searchsorted(g_ex, np.arange(n_exercises + 1))
+
+    dates = history.session_dates
+    for code in np.flatnonzero(ex_sets):
+        lo, hi = bounds[code], bounds[code + 1]
+        best_at = lo + int(np.argmax(g_best[lo:hi]))
+        result["exercises"].append({
+            "name": history.exercise_names[code],
+            "sessions": int(hi - lo),
+            "total_sets": int(ex_sets[code]),
+            "total_volume": round(float(ex_volume[code]), 1),
+            "best_e1rm": round(float(ex_best[code]), 1),
+            "best_e1rm_date": _iso(dates[g_sess[best_at]]) if ex_best[code] > 0 else None,
+            "pr_count": int(ex_prs[code]),
+            "series": [
+                {"date": d, "volume": v, "sets": s, "best_e1rm": b, "is_pr": p}
+                for d, v, s, b, p in zip(
+                    np.datetime_as_string(dates[g_sess[lo:hi]], unit="D").tolist(),
+                    _round(g_volume[lo:hi]),
+                    g_sets[lo:hi].tolist(),
+                    _round(g_best[lo:hi]),
+                    g_pr[lo:hi].tolist(),
+                )
+            ],
+        })
+    result["exercises"].sort(key=lambda e: e["total_volume"], reverse=True)
+
+    pr_idx = np.flatnonzero(g_pr)
+    pr_idx = pr_idx[np.argsort(g_sess[pr_idx], kind="stable")][::-1][:10]
+    result["recent_prs"] = [
+        {
+            "exercise": history.exercise_names[g_ex[i]],
+            "date": _iso(dates[g_sess[i]]),
+            "e1rm": round(float(g_best[i]), 1),
+            "previous_e1rm": round(float(previous_best[i]), 1),
+        }
+        for i in pr_idx
+    ]
+
+    # Weekly tonnage on Monday-aligned weeks, densely filled between first and last week
+    days = dates.astype(np.int64)[sess]
+    mondays = days - (days + 3) % 7  # 1970-01-01 was a Thursday
+    first_monday = int(mondays.min())
+    week = (mondays - first_monday) // 7
+    n_weeks = int(week.max()) + 1
+    week_volume = np.bincount(week, weights=volume, minlength=n_weeks)
+    week_sets = np.bincount(week, minlength=n_weeks)
+    week_sessions = np.bincount(np.unique(week * n_sessions + sess) // n_sessions, minlength=n_weeks)
+    week_starts = np.datetime_as_string(
+        np.arange(n_weeks, dtype=np.int64).astype("timedelta64[W]") + np.datetime64(first_monday, "D"),
+        unit="D",
+    ).tolist()
+    result["weekly_tonnage"] = [
+        {"week_start": w, "tonnage": t, "sets": s, "sessions": n}
+        for w, t, s, n in zip(week_starts, _round(week_volume), week_sets.tolist(), week_sessions.tolist())
+    ]
+
+    # Intensity distribution relative to the best estimated 1RM reached by that session
+    best_for_set = running[inverse]
+    loaded = (weight > 0) & (best_for_set > 0)
+    zones = np.digitize(weight[loaded] / best_for_set[loaded], INTENSITY_EDGES)
+    counts = np.bincount(zones, minlength=len(INTENSITY_LABELS))
+    result["intensity_distribution"] = [
+        {"range": label, "sets": int(c)} for label, c in zip(INTENSITY_LABELS, counts)
+    ]
+
+    result["totals"] = {
+        "sessions": int(np.unique(sess).size),
+        "sets": int(sess.size),
+        "volume": round(float(volume.sum()), 1),
+        "exercises": len(result["exercises"]),
+        "first_date": _iso(dates[sess.min()]),
+        "last_date": _iso(dates[sess.max()]),
+    }
+    return result
+
+
+class AnalyticsService:
+    """Loads and caches columnar training histories"""
+
+    def fetch_workout_rows(self, user_id: str) -> List[Dict[str, Any]]:
+        """Fetch every progress row carrying a workout payload, oldest first"""
+        rows: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            result = supabase_service.select("progress.workout_payload")\
+                .eq("user_id", user_id)\
+                .order("workout_date", desc=False)\
+                .order("id", desc=False)\
+                .range(start, start + HISTORY_PAGE_SIZE - 1)\
+                .execute()
+            batch = result.data or []
+            rows.extend(batch)
+            if len(batch) < HISTORY_PAGE_SIZE:
+                return rows
+            start += HISTORY_PAGE_SIZE
+
+    def get_history(self, user_id: str) -> TrainingHistory:
+        """
+        Get the user's columnar set history
+
+        Cached until the next progress write (tracked by the "progress" write version).
+        """
+        version = (supabase_service.get_write_versions(str(user_id), ["progress"]) or {}).get("progress")
+        cached = cache_service.get("training_history", str(user_id))
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        if not supabase_service.is_connected() or not supabase_service._is_valid_uuid(user_id):
+            history = TrainingHistory.from_rows([])
+        else:
+            history = TrainingHistory.from_rows(self.fetch_workout_rows(user_id))
+        cache_service.set("training_history", str(user_id), (version, history), ttl=HISTORY_CACHE_TTL_SECONDS)
+        return history
+
+    def get_analytics(self, user_id: str, formula: str = "epley",
+                      exercise: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get training analytics for a user
+
+        Args:
+            user_id: User identifier
+            formula: 1RM formula ("epley" or "brzycki")
+            exercise: Optional exercise name filter
+
+        Returns:
+            Analytics payload (see compute_analytics)
+        """
+        analytics = compute_analytics(self.get_history(user_id), formula, exercise)
+        analytics["user_id"] = user_id
+        analytics["generated_at"] = date.today().isoformat()
+        return analytics
+
+
+# Global instance
+analytics_service = AnalyticsService()
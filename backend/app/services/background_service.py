@@ -0,0 +1,132 @@
+"""
+Background Service
+Registry of fire-and-forget tasks and long-running workers, drained on shutdown
+
+Side effects that run after a response (achievement checks, warm-up, ...) are
+spawned here instead of with a bare asyncio.create_task, so they are referenced
+until done, their errors are logged, and shutdown waits for them up to a
+deadline instead of dropping them. Workers (e.g. the materialized view
+scheduler) register start/stop callables and are started and stopped with the
+application lifespan.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Set
+
+
+class BackgroundService:
+    """Tracks background tasks and workers of this process"""
+
+    def __init__(self):
+        """Initialize empty registry"""
+        self._tasks: Set[asyncio.Task] = set()
+        self._workers: List[Dict[str, Any]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.completed = 0
+        self.failed = 0
+
+    # Tasks
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.failed += 1
+            print(f"Background task {task.get_name()} failed: {error}")
+        else:
+            self.completed += 1
+
+    def _track(self, coro: Coroutine, name: str) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def spawn(self, coro: Coroutine, name: str = "task") -> None:
+        """
+        Run a coroutine in the background
+
+        Safe to call from the event loop and from worker threads (once the app
+        has started).
+
+        Args:
+            coro: Coroutine to run
+            name: Label used in logs
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            if self._loop is None or self._loop.is_closed():
+                coro.close()
+                print(f"Warning: no event loop for background task {name}; skipped")
+                return
+            self._loop.call_soon_threadsafe(self._track, coro, name)
+            return
+        self._track(coro, name)
+
+    def run_in_thread(self, fn: Callable[..., Any], *args: Any, name: str = "task") -> None:
+        """Run a blocking function in a worker thread as a tracked background task"""
+        self.spawn(asyncio.to_thread(fn, *args), name=name)
+
+    def pending(self) -> int:
+        """Background tasks not finished yet"""
+        return len(self._tasks)
+
+    # Workers
+    def register_worker(self, name: str, start: Callable[[], None],
+                        stop: Callable[[], Awaitable[None]]) -> None:
+        """Register a long-running worker started and stopped with the app (replaces one with the same name)"""
+        self._workers = [w for w in self._workers if w["name"] != name]
+        self._workers.append({"name": name, "start": start, "stop": stop})
+
+    def start_workers(self) -> None:
+        """Start every registered worker (call from the lifespan, inside the event loop)"""
+        self._loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            try:
+                worker["start"]()
+            except Exception as e:
+                print(f"Warning: could not start worker {worker['name']}: {e}")
+
+    async def shutdown(self, deadline_seconds: float) -> Dict[str, int]:
+        """
+        Stop workers, then wait for pending tasks until the deadline and cancel the rest
+
+        Args:
+            deadline_seconds: Longest time to wait for pending tasks
+
+        Returns:
+            {"drained", "cancelled"}
+        """
+        for worker in reversed(self._workers):
+            try:
+                await worker["stop"]()
+            except Exception as e:
+                print(f"Warning: could not stop worker {worker['name']}: {e}")
+
+        started = time.monotonic()
+        drained = 0
+        # Tasks may spawn follow-up tasks while draining, so wait until none are left
+        while self._tasks:
+            remaining = deadline_seconds - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            batch = set(self._tasks)
+            done, _ = await asyncio.wait(batch, timeout=remaining)
+            drained += len(done)
+
+        leftover = list(self._tasks)
+        for task in leftover:
+            task.cancel()
+        if leftover:
+            await asyncio.gather(*leftover, return_exceptions=True)
+            print(f"Shutdown deadline reached: cancelled {len(leftover)} background task(s): "
+                  f"{', '.join(task.get_name() for task in leftover)}")
+        self._loop = None
+        return {"drained": drained, "cancelled": len(leftover)}
+
+
+# Global instance
+background_service = BackgroundService()
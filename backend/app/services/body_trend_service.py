@@ -0,0 +1,200 @@
+"""
+Body Composition Trend Service
+Smoothed series, weekly rate of change, goal projections and downsampling
+for body_composition history (weight, fat, muscle)
+"""
+
+import math
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.supabase_service import supabase_service
+
+METRICS = ("weight", "fat", "muscle")
+
+# Rows fetched per request while loading the full history (PostgREST caps responses)
+SERIES_PAGE_SIZE = 1000
+
+# Days of smoothed data the weekly rate and projections are fitted on
+RATE_WINDOW_DAYS = 28
+
+
+def smooth(days: np.ndarray, values: np.ndarray, half_life_days: float) -> np.ndarray:
+    """
+    Exponentially smooth an irregularly spaced series
+
+    The weight of the previous average decays with the gap since the previous
+    measurement, so a missed week counts for more than a missed day.
+
+    Args:
+        days: Day numbers (ascending)
+        values: Measurements
+        half_life_days: Days after which a measurement's influence halves
+
+    Returns:
+        Smoothed values, same length as values
+    """
+    if values.size == 0:
+        return values.astype(np.float64)
+    gaps = np.diff(days, prepend=days[0]).astype(np.float64)
+    alphas = (1.0 - np.exp(-gaps * math.log(2) / max(half_life_days, 0.1))).tolist()
+    out = np.empty(values.size)
+    current = float(values[0])
+    for i, (value, alpha) in enumerate(zip(values.tolist(), alphas)):
+        current += alpha * (value - current)
+        out[i] = current
+    return out
+
+
+def fit_trend(days: np.ndarray, values: np.ndarray, window_days: int = RATE_WINDOW_DAYS) -> Optional[Dict[str, float]]:
+    """
+    Least-squares line over the last window_days of a series
+
+    Returns:
+        {"slope_per_day", "intercept", "r2", "points"} or None with fewer than 2 points
+    """
+    recent = days >= days[-1] - window_days if days.size else days.astype(bool)
+    x, y = days[recent].astype(np.float64), values[recent]
+    if x.size < 2 or np.ptp(x) == 0:
+        return None
+    slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (slope * x + intercept)
+    total = float(((y - y.mean()) ** 2).sum())
+    r2 = 1.0 - float((residual ** 2).sum()) / total if total > 0 else 1.0
+    return {"slope_per_day": float(slope), "intercept": float(intercept), "r2": r2, "points": int(x.size)}
+
+
+def project_to_goal(last_day: int, fit: Optional[Dict[str, float]], goal: Optional[float]) -> Optional[Dict[str, Any]]:
+    """
+    Project when the fitted trend reaches a goal value
+
+    Returns:
+        Projection dict, with eta_date None when the trend moves away from (or is flat
+        relative to) the goal; None when there is no goal or no trend
+    """
+    if goal is None or fit is None:
+        return None
+    current = fit["slope_per_day"] * last_day + fit["intercept"]
+    slope = fit["slope_per_day"]
+    remaining = goal - current
+    days_to_goal = remaining / slope if slope else math.inf
+    reachable = 0 <= days_to_goal < 3650
+    return {
+        "goal": goal,
+        "current_trend": round(current, 2),
+        "remaining": round(remaining, 2),
+        "days_to_goal": int(math.ceil(days_to_goal)) if reachable else None,
+        "eta_date": (date.fromordinal(last_day) + timedelta(days=math.ceil(days_to_goal))).isoformat() if reachable else None,
+        "on_track": reachable,
+    }
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points and, from each bucket in between, the point
+    forming the largest triangle with the previous kept point and the next bucket's
+    average, which preserves peaks and troughs far better than plain averaging.
+
+    Returns:
+        Indices of the kept points (ascending)
+    """
+    n = x.size
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    for b in range(threshold - 2):
+        lo = int(b * every) + 1
+        hi = int((b + 1) * every) + 1
+        nhi = min(int((b + 2) * every) + 1, n)
+        avg_x, avg_y = x[hi:nhi].mean(), y[hi:nhi].mean()
+        ax, ay = x[kept[-1]], y[kept[-1]]
+        area = np.abs((ax - avg_x) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y - ay))
+        kept.append(lo + int(np.argmax(area)))
+    kept.append(n - 1)
+    return np.array(kept)
+
+
+def build_metric_trend(dates: List[str], values: List[Optional[float]], half_life_days: float,
+                       points: int, goal: Optional[float]) -> Optional[Dict[str, Any]]:
+    """
+    Build the trend block for one metric
+
+    Args:
+        dates: ISO dates, ascending
+        values: Measurements (None where not recorded)
+        half_life_days: Smoothing half-life
+        points: Maximum points in the returned series
+        goal: Optional goal value to project to
+
+    Returns:
+        {"latest", "weekly_rate", "trend_fit", "projection", "series"} or None without data
+    """
+    pairs = [(d, v) for d, v in zip(dates, values) if v is not None]
+    if not pairs:
+        return None
+    days = np.array([date.fromisoformat(d[:10]).toordinal() for d, _ in pairs], dtype=np.int64)
+    raw = np.array([float(v) for _, v in pairs])
+    smoothed = smooth(days, raw, half_life_days)
+    fit = fit_trend(days, smoothed)
+    keep = lttb(days.astype(np.float64), smoothed, points)
+
+    return {
+        "latest": {"date": pairs[-1][0], "value": float(raw[-1]), "smoothed": round(float(smoothed[-1]), 2)},
+        "weekly_rate": round(fit["slope_per_day"] * 7, 3) if fit else None,
+        "trend_fit": {"r2": round(fit["r2"], 3), "points": fit["points"], "window_days": RATE_WINDOW_DAYS} if fit else None,
+        "projection": project_to_goal(int(days[-1]), fit, goal),
+        "series": [
+            {"date": pairs[i][0], "value": float(raw[i]), "smoothed": round(float(smoothed[i]), 2)}
+            for i in keep.tolist()
+        ],
+    }
+
+
+class BodyTrendService:
+    """Loads body composition history and computes its trends"""
+
+    def fetch_series(self, user_id: str) -> List[Dict[str, Any]]:
+        """Fetch every body_composition row for the user, oldest first"""
+        rows: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            result = supabase_service.select("body_composition.series")\
+                .eq("user_id", user_id)\
+                .order("date", desc=False)\
+                .range(start, start + SERIES_PAGE_SIZE - 1)\
+                .execute()
+            batch = result.data or []
+            rows.extend(batch)
+            if len(batch) < SERIES_PAGE_SIZE:
+                return rows
+            start += SERIES_PAGE_SIZE
+
+    def build_trends(self, rows: List[Dict[str, Any]], half_life_days: float = 7.0, points: int = 200,
+                     goals: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, Any]:
+        """
+        Compute trend blocks for weight, fat and muscle
+
+        Args:
+            rows: body_composition rows ordered by date ascending
+            half_life_days: Smoothing half-life in days
+            points: Maximum points per downsampled series
+            goals: Optional goal per metric, e.g. {"weight": 75}
+
+        Returns:
+            metric -> trend block (None for metrics without data)
+        """
+        goals = goals or {}
+        dates = [str(r.get("date"))[:10] for r in rows]
+        return {
+            metric: build_metric_trend(dates, [r.get(metric) for r in rows], half_life_days, points, goals.get(metric))
+            for metric in METRICS
+        }
+
+
+# Global instance
+body_trend_service = BodyTrendService()
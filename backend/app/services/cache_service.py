@@ -0,0 +1,92 @@
+"""
+Cache Service
+In-process TTL cache and per-key write versions used for ETags and memoised reads
+"""
+
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class CacheService:
+    """Thread-safe in-process cache with TTL entries and write-version counters"""
+
+    def __init__(self):
+        """Initialize empty cache"""
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, Hashable], Tuple[float, Any]] = {}
+        self._versions: Dict[Tuple[str, Hashable], int] = {}
+        # Distinguishes this process so versions from another worker/restart never collide
+        self.boot_id = uuid.uuid4().hex[:8]
+
+    # Write versions
+    def version(self, scope: str, key: Hashable) -> int:
+        """Get the current write version for (scope, key)"""
+        with self._lock:
+            return self._versions.get((scope, key), 0)
+
+    def bump(self, scope: str, key: Hashable) -> int:
+        """
+        Record a write for (scope, key)
+
+        Increments its version and drops any cached entry stored under the same scope/key.
+        """
+        with self._lock:
+            version = self._versions.get((scope, key), 0) + 1
+            self._versions[(scope, key)] = version
+            self._entries.pop((scope, key), None)
+            return version
+
+    # TTL entries
+    def get(self, namespace: str, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[(namespace, key)]
+                return default
+            return value
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Cache a value; ttl in seconds (None keeps it until invalidated)"""
+        expires_at = time.monotonic() + ttl if ttl else 0.0
+        with self._lock:
+            self._entries[(namespace, key)] = (expires_at, value)
+
+    def update(self, namespace: str, key: Hashable, fn: Callable[[Any], Any]) -> Any:
+        """
+        Replace a cached value with fn(value), keeping its original expiry
+
+        Returns:
+            The new value, or None when the entry is missing or expired (nothing is stored)
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[(namespace, key)]
+                return None
+            value = fn(value)
+            self._entries[(namespace, key)] = (expires_at, value)
+            return value
+
+    def invalidate(self, namespace: str, key: Hashable) -> None:
+        """Drop a cached value"""
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def clear(self) -> None:
+        """Drop every cached value and version"""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+# Global instance
+cache_service = CacheService()
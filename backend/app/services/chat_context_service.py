@@ -0,0 +1,96 @@
+"""
+Chat Context Service
+Per-conversation ring buffers of recent AI chat turns used as model context
+
+The first turn of a conversation seen by this process warms its buffer from the
+database (the conversation's latest CHAT_CONTEXT_MESSAGES messages); every turn
+then appends the user message and the reply, so later turns assemble context
+without querying chat history. Buffers are re-warmed after
+CHAT_CONTEXT_TTL_SECONDS and the least recently used are evicted beyond
+CHAT_CONTEXT_MAX_CONVERSATIONS.
+
+Chats sent without a conversation (no context.session_id) share one buffer per
+user, warmed from the user's latest messages as before. Buffers are keyed by
+user and conversation, and a conversation is only warmed after checking that it
+belongs to the user, so one user can never read another's turns.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.supabase_service import supabase_service
+
+
+class ChatContextService:
+    """LRU of conversation -> (warmed_at, deque of {"role", "content"})"""
+
+    def __init__(self):
+        """Initialize empty buffers"""
+        self._lock = threading.Lock()
+        self._buffers: "OrderedDict[str, Tuple[float, Deque[Dict[str, str]]]]" = OrderedDict()
+
+    def _key(self, user_id: str, conversation_id: Optional[str]) -> str:
+        return f"user:{user_id}:conversation:{conversation_id}" if conversation_id else f"user:{user_id}"
+
+    def _load(self, user_id: str, conversation_id: Optional[str]) -> Optional[List[Dict[str, str]]]:
+        """Latest messages from the database, oldest first (None when the conversation is not the user's)"""
+        limit = settings.CHAT_CONTEXT_MESSAGES
+        if conversation_id:
+            if not supabase_service.is_connected() or not supabase_service._is_valid_uuid(user_id):
+                return []  # Mock mode: nothing persisted to load
+            if not supabase_service.is_conversation_owner(conversation_id, user_id):
+                return None
+            rows = supabase_service.list_messages_by_conversation(conversation_id, limit=limit)
+            return [{"role": r.get("role", "user"), "content": r.get("content", "")} for r in rows]
+        return [{"role": m.role, "content": m.message} for m in supabase_service.get_chat_history(user_id, limit=limit)]
+
+    def get(self, user_id: str, conversation_id: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Recent messages of a conversation in OpenAI format, oldest first
+
+        Args:
+            user_id: Chat owner
+            conversation_id: Active conversation (context.session_id), if any
+
+        Returns:
+            Up to CHAT_CONTEXT_MESSAGES {"role", "content"} dicts; empty (and not
+            buffered, so append() ignores it) for another user's conversation
+        """
+        key = self._key(user_id, conversation_id)
+        with self._lock:
+            entry = self._buffers.get(key)
+            if entry is not None and time.monotonic() - entry[0] < settings.CHAT_CONTEXT_TTL_SECONDS:
+                self._buffers.move_to_end(key)
+                return list(entry[1])
+
+        messages = self._load(user_id, conversation_id)
+        if messages is None:
+            return []
+        buffer = deque(messages, maxlen=settings.CHAT_CONTEXT_MESSAGES)
+        with self._lock:
+            self._buffers[key] = (time.monotonic(), buffer)
+            self._buffers.move_to_end(key)
+            while len(self._buffers) > settings.CHAT_CONTEXT_MAX_CONVERSATIONS:
+                self._buffers.popitem(last=False)
+        return list(buffer)
+
+    def append(self, user_id: str, conversation_id: Optional[str], role: str, content: str) -> None:
+        """Record a turn in the conversation's buffer (no-op when it is not buffered)"""
+        with self._lock:
+            entry = self._buffers.get(self._key(user_id, conversation_id))
+            if entry is not None:
+                entry[1].append({"role": role, "content": content})
+
+    def forget(self, conversation_id: str) -> None:
+        """Drop a conversation's buffer (e.g. after it is deleted)"""
+        suffix = f":conversation:{conversation_id}"
+        with self._lock:
+            for key in [k for k in self._buffers if k.endswith(suffix)]:
+                del self._buffers[key]
+
+
+# Global instance
+chat_context_service = ChatContextService()
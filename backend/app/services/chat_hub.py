@@ -0,0 +1,99 @@
+"""
+Chat Hub
+In-process publish/subscribe for real-time coach chat delivery
+
+Each coach chat (topic = the client's user_id) fans out events to every open
+socket of that chat: new messages from send_chat_message and read receipts from
+mark_messages_read. Subscribers that fall too far behind are flagged for a resync
+instead of blocking publishers; clients then reconnect and catch up from their
+last cursor. The hub only reaches sockets served by this process.
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Set
+
+# Events buffered per socket before it is considered too slow and asked to resync
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription:
+    """One socket's queue of pending events"""
+
+    def __init__(self, topic: str, loop: asyncio.AbstractEventLoop):
+        self.topic = topic
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        """Queue an event (must run on the subscriber's loop)"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+
+class ChatHub:
+    """Topic -> subscriptions registry with non-blocking fan-out"""
+
+    def __init__(self):
+        """Initialize empty registry"""
+        self._lock = threading.Lock()
+        self._topics: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, topic: str) -> Subscription:
+        """Register a subscription for a topic (call from the socket's event loop)"""
+        subscription = Subscription(str(topic), asyncio.get_running_loop())
+        with self._lock:
+            self._topics.setdefault(subscription.topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription"""
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[subscription.topic]
+
+    def publish(self, topic: str, event: Dict[str, Any]) -> int:
+        """
+        Deliver an event to every subscription of a topic
+
+        Safe to call from request handlers and from worker threads.
+
+        Returns:
+            Number of subscriptions the event was queued for
+        """
+        with self._lock:
+            subscribers = list(self._topics.get(str(topic), ()))
+        try:
+            current_loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        for subscription in subscribers:
+            if subscription.loop is current_loop:
+                subscription.offer(event)
+            else:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.offer, event)
+                except RuntimeError:
+                    # The socket's loop has shut down; it will unsubscribe on its own
+                    pass
+        return len(subscribers)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        """Open subscriptions for one topic, or for all topics"""
+        with self._lock:
+            if topic is not None:
+                return len(self._topics.get(str(topic), ()))
+            return sum(len(subscribers) for subscribers in self._topics.values())
+
+
+# Global instance
+chat_hub = ChatHub()
@@ -0,0 +1,242 @@
+"""
+Chat Search Service
+Full-text search over AI chat (chat_messages) and coach chat (coach_chat) messages
+
+With a database, searches run in Postgres through the search_chat_messages() and
+search_coach_chat() RPCs: Spanish stemming, a GIN index on (user_id, stored tsvector),
+ts_rank_cd ranking and ts_headline snippets. In mock mode (no database, or a
+non-UUID user) messages are never persisted, so the chat endpoint indexes them
+here instead and searches are answered by a small in-process inverted index.
+
+Results are ordered by (rank, created_at, id), newest first among equal ranks,
+and paged with an opaque cursor over that same key.
+"""
+
+import base64
+import json
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.pagination import parse_cursor_key
+from app.core.text import normalize
+from app.services.supabase_service import supabase_service
+
+SOURCES = ("ai", "coach")
+
+# Messages kept per (user, source) by the mock-mode index; the oldest are dropped first
+MAX_LOCAL_MESSAGES = 5000
+
+# Words around the first match in mock-mode snippets
+SNIPPET_WORDS = 24
+
+_STOPWORDS = frozenset(
+    "a al algo ante con contra de del desde el en entre era es esta este esto ha hay la las le les lo los "
+    "me mi mis muy no nos o os para pero por que se si sin sobre su sus te ti tu un una uno unos unas y ya yo".split()
+)
+
+# Longest first, so "aciones" wins over "es"
+_SUFFIXES = (
+    "amientos", "imientos", "amiento", "imiento", "aciones", "uciones", "mente", "acion", "ucion",
+    "idades", "idad", "ables", "ibles", "able", "ible", "ando", "iendo", "ados", "idos", "adas", "idas",
+    "ado", "ido", "ada", "ida", "ar", "er", "ir", "es", "os", "as", "s", "a", "o", "e",
+)
+
+_WORD_RE = re.compile(r"\S+")
+
+
+def stem(word: str) -> str:
+    """Light Spanish stemmer for normalized words ("entrenamientos" and "entrenar" -> "entren")"""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def terms(text: Any) -> List[str]:
+    """Stemmed search terms of a text, without stopwords"""
+    return [stem(word) for word in normalize(text).split() if word not in _STOPWORDS]
+
+
+def encode_search_cursor(row: Dict[str, Any]) -> str:
+    """Build an opaque cursor from a result's rank, created_at and id"""
+    raw = json.dumps({"r": row.get("rank"), "t": row.get("created_at"), "id": str(row.get("id"))},
+                     separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor: Optional[str]) -> Optional[Tuple[float, str, str]]:
+    """
+    Decode a search cursor into (rank, created_at, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        rank, created_at, row_id = float(data["r"]), data["t"], data["id"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not math.isfinite(rank):
+        raise ValueError("Invalid cursor")
+    created_at, row_id = parse_cursor_key(created_at, row_id)
+    return rank, created_at, row_id
+
+
+def _sort_key(row: Dict[str, Any]) -> Tuple[float, str, str]:
+    return row["rank"], str(row.get("created_at") or ""), str(row["id"])
+
+
+def _page(rows: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    """Trim a limit + 1 fetch to one page and derive the next cursor"""
+    page = rows[:limit]
+    next_cursor = encode_search_cursor(page[-1]) if len(rows) > limit and page else None
+    return {"results": page, "next_cursor": next_cursor}
+
+
+def _snippet(content: str, query_terms: set) -> str:
+    """Words around the first matching word, with matches wrapped in ** like ts_headline"""
+    words = _WORD_RE.findall(content or "")
+    hits = [i for i, word in enumerate(words) if set(terms(word)) & query_terms]
+    start = max(0, (hits[0] if hits else 0) - SNIPPET_WORDS // 3)
+    window = words[start:start + SNIPPET_WORDS]
+    marked = [f"**{word}**" if start + i in hits else word for i, word in enumerate(window)]
+    return " ".join(marked)
+
+
+class LocalSearchIndex:
+    """Inverted index (stemmed term -> message ids) per user and source"""
+
+    def __init__(self):
+        """Initialize empty index"""
+        self._lock = threading.Lock()
+        # (user_id, source) -> message id -> {"row", "text", "terms": Counter, "length"}
+        self._docs: Dict[Tuple[str, str], "OrderedDict[str, Dict[str, Any]]"] = {}
+        self._postings: Dict[Tuple[str, str], Dict[str, set]] = {}
+
+    def add(self, user_id: str, source: str, row: Dict[str, Any], text: str) -> None:
+        """Index one message (row must carry id and created_at)"""
+        key = (str(user_id), source)
+        doc_terms = Counter(terms(text))
+        if not doc_terms:
+            return
+        with self._lock:
+            docs = self._docs.setdefault(key, OrderedDict())
+            postings = self._postings.setdefault(key, {})
+            doc_id = str(row["id"])
+            docs[doc_id] = {"row": row, "text": text, "terms": doc_terms, "length": sum(doc_terms.values())}
+            for term in doc_terms:
+                postings.setdefault(term, set()).add(doc_id)
+            while len(docs) > MAX_LOCAL_MESSAGES:
+                old_id, old = docs.popitem(last=False)
+                for term in old["terms"]:
+                    ids = postings.get(term)
+                    if ids is not None:
+                        ids.discard(old_id)
+                        if not ids:
+                            del postings[term]
+
+    def search(self, user_id: str, source: str, query: str, limit: int,
+               before: Optional[Tuple[float, str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Messages containing every query term, ranked by tf-idf
+
+        Returns:
+            Up to limit rows (the row fields plus "snippet" and "rank"), best first
+        """
+        query_terms = set(terms(query))
+        key = (str(user_id), source)
+        if not query_terms:
+            return []
+        with self._lock:
+            docs = self._docs.get(key, {})
+            postings = self._postings.get(key, {})
+            matching = [postings.get(term, set()) for term in query_terms]
+            candidates = set.intersection(*matching) if all(matching) else set()
+            total = len(docs)
+            scored = []
+            for doc_id in candidates:
+                doc = docs[doc_id]
+                score = sum(
+                    doc["terms"][term] * math.log(1 + total / len(postings[term]))
+                    for term in query_terms
+                ) / math.sqrt(doc["length"])
+                scored.append((doc, round(score, 6)))
+
+        rows = [{**doc["row"], "rank": rank, "_text": doc["text"]} for doc, rank in scored]
+        if before is not None:
+            rows = [row for row in rows if _sort_key(row) < before]
+        rows.sort(key=_sort_key, reverse=True)
+        results = []
+        for row in rows[:limit]:
+            text = row.pop("_text")
+            results.append({**row, "snippet": _snippet(text, query_terms)})
+        return results
+
+
+class ChatSearchService:
+    """Ranked, paginated message search backed by Postgres or the mock-mode index"""
+
+    def __init__(self):
+        """Initialize the mock-mode index"""
+        self.local = LocalSearchIndex()
+
+    def _is_mock(self, user_id: str) -> bool:
+        return not supabase_service.is_connected() or not supabase_service._is_valid_uuid(user_id)
+
+    def index_local(self, user_id: str, source: str, message: Dict[str, Any], text: str) -> None:
+        """
+        Index a message for mock-mode search (ignored for users searched in Postgres)
+
+        Args:
+            user_id: Chat owner (the client for coach chat)
+            source: "ai" or "coach"
+            message: Result row fields (id, created_at, role/conversation_id or sender_role)
+            text: Message text
+        """
+        if self._is_mock(user_id):
+            self.local.add(user_id, source, message, text)
+
+    def search(self, user_id: str, query: str, source: str = "ai", limit: int = 20,
+               cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Search a user's messages
+
+        Args:
+            user_id: User (AI chat) or client of the coach chat
+            query: Free text; supports "quoted phrases", OR and -exclusions in Postgres
+            source: "ai" (chat_messages) or "coach" (coach_chat)
+            limit: Page size
+            cursor: next_cursor of the previous page
+
+        Returns:
+            {"results": [{"id", "snippet", "rank", "created_at", ...}], "next_cursor", "engine"}
+
+        Raises:
+            ValueError: Unknown source or malformed cursor
+        """
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source: {source}")
+        before = decode_search_cursor(cursor)
+        if not query.strip():
+            return {"results": [], "next_cursor": None, "engine": "none"}
+
+        if self._is_mock(user_id):
+            rows = self.local.search(user_id, source, query, limit + 1, before)
+            return {**_page(rows, limit), "engine": "local"}
+
+        params = {"p_user_id": user_id, "p_query": query, "p_limit": limit + 1}
+        if before is not None:
+            params.update({"p_before_rank": before[0], "p_before_created": before[1], "p_before_id": before[2]})
+        function = "search_chat_messages" if source == "ai" else "search_coach_chat"
+        result = supabase_service.supabase.rpc(function, params).execute()
+        return {**_page(result.data or [], limit), "engine": "postgres"}
+
+
+# Global instance
+chat_search_service = ChatSearchService()
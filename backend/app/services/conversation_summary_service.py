@@ -0,0 +1,157 @@
+"""
+Conversation Summary Service
+Titles, summaries and previews of AI chat conversations, maintained after each turn
+
+Runs as a background task once the reply has been sent. Every turn stores a short
+preview of the latest reply; on the turns in SUMMARY_TURNS the conversation also
+gets a summary and, while it still has the default title, a generated title.
+Titles/summaries come from a short OpenAI completion when available
+(CHAT_SUMMARY_USE_MODEL), else from a local heuristic. The conversation list then
+reads everything from chat_conversations alone.
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.chat_context_service import chat_context_service
+from app.services.openai_service import openai_service
+from app.services.rate_limit_service import rate_limit_service
+from app.services.supabase_service import supabase_service
+
+DEFAULT_TITLE = "Nuevo chat"
+
+# Turns after which the summary (and a still-default title) is regenerated
+SUMMARY_TURNS = (1, 3)
+
+PREVIEW_CHARS = 140
+TITLE_WORDS = 6
+SUMMARY_CHARS = 160
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?¿¡])\s+|\n+")
+
+
+def _shorten(text: str, limit: int) -> str:
+    """Collapse whitespace and cut at a word boundary with an ellipsis"""
+    text = " ".join(str(text or "").split())
+    if len(text) <= limit:
+        return text
+    return text[:limit - 1].rsplit(" ", 1)[0].rstrip(",.;:") + "…"
+
+
+def heuristic_title(first_message: str) -> str:
+    """First words of the user's opening message ("¿Cómo gano masa muscular rápido?" -> "Cómo gano masa muscular rápido")"""
+    sentence = _SENTENCE_END_RE.split(str(first_message or "").strip())[0]
+    words = re.sub(r"[¿?¡!.,;:\"']", " ", sentence).split()[:TITLE_WORDS]
+    if not words:
+        return DEFAULT_TITLE
+    title = " ".join(words)
+    return title[0].upper() + title[1:]
+
+
+def heuristic_summary(messages: List[Dict[str, str]]) -> str:
+    """The user's opening question followed by the start of the latest reply"""
+    question = next((m["content"] for m in messages if m.get("role") == "user"), "")
+    answer = next((m["content"] for m in reversed(messages) if m.get("role") == "assistant"), "")
+    return _shorten(f"{_shorten(question, 70)} — {answer}" if answer else question, SUMMARY_CHARS)
+
+
+class ConversationSummaryService:
+    """Keeps chat_conversations' preview, turn count, title and summary up to date"""
+
+    def describe(self, messages: List[Dict[str, str]], user_id: Optional[str] = None) -> Dict[str, str]:
+        """
+        Title and summary for a conversation
+
+        Args:
+            messages: Turns with "role" and "content", oldest first
+            user_id: Owner whose daily token budget pays for a model summary
+
+        Returns:
+            {"title", "summary"}
+        """
+        if settings.CHAT_SUMMARY_USE_MODEL:
+            on_usage = (lambda tokens: rate_limit_service.record_usage(user_id, tokens)) if user_id else None
+            described = openai_service.summarize_conversation(messages, on_usage=on_usage)
+            if described:
+                return {
+                    "title": _shorten(described["title"], 60),
+                    "summary": _shorten(described["summary"], SUMMARY_CHARS),
+                }
+        first = next((m["content"] for m in messages if m.get("role") == "user"), "")
+        return {"title": heuristic_title(first), "summary": heuristic_summary(messages)}
+
+    def _record_turn(self, user_id: str, conversation_id: str, preview: str) -> Optional[Tuple[int, Optional[str]]]:
+        """
+        Count a turn and store the preview
+
+        Returns:
+            (turn_count, title), or None when the conversation is not the user's
+        """
+        try:
+            rows = supabase_service.supabase.rpc("record_conversation_turn", {
+                "p_conversation_id": conversation_id, "p_user_id": user_id, "p_preview": preview
+            }).execute().data or []
+            return (rows[0]["turn_count"], rows[0].get("title")) if rows else None
+        except Exception as e:
+            print(f"record_conversation_turn RPC unavailable, counting turns from messages: {e}")
+
+        result = supabase_service.select("chat_conversations.summary")\
+            .eq("id", conversation_id)\
+            .eq("user_id", user_id)\
+            .limit(1)\
+            .execute()
+        if not result.data:
+            return None
+        # Computed from the stored messages rather than incremented, so concurrent turns agree
+        turns = supabase_service.count_rows("chat_messages")\
+            .eq("conversation_id", conversation_id)\
+            .eq("role", "user")\
+            .execute().count or 0
+        supabase_service.supabase.table("chat_conversations")\
+            .update({"preview": preview, "turn_count": turns, "updated_at": datetime.utcnow().isoformat()})\
+            .eq("id", conversation_id)\
+            .eq("user_id", user_id)\
+            .execute()
+        return turns, result.data[0].get("title")
+
+    def on_turn(self, user_id: str, conversation_id: Optional[str], reply: str) -> None:
+        """
+        Update a conversation after a chat turn (call as a background task)
+
+        Args:
+            user_id: Conversation owner
+            conversation_id: context.session_id of the turn (ignored unless a stored conversation)
+            reply: Assistant reply of the turn
+        """
+        if not conversation_id or not supabase_service.is_connected():
+            return
+        if not supabase_service._is_valid_uuid(conversation_id) or not supabase_service._is_valid_uuid(user_id):
+            return
+        try:
+            preview = _shorten(reply, PREVIEW_CHARS)
+            counted = self._record_turn(user_id, conversation_id, preview)
+            if counted is None:
+                return
+            turns, title = counted
+            if turns in SUMMARY_TURNS:
+                # Whole conversation so far (at most 2 x the last summary turn messages)
+                rows = supabase_service.list_messages_by_conversation(conversation_id, limit=2 * SUMMARY_TURNS[-1])
+                messages = [{"role": r.get("role", "user"), "content": r.get("content", "")} for r in rows]
+                described = self.describe(messages or chat_context_service.get(user_id, conversation_id), user_id)
+                update = {"summary": described["summary"]}
+                if title in (None, "", DEFAULT_TITLE):
+                    update["title"] = described["title"]
+                supabase_service.supabase.table("chat_conversations")\
+                    .update(update)\
+                    .eq("id", conversation_id)\
+                    .eq("user_id", user_id)\
+                    .execute()
+            supabase_service.bump_write_versions(str(user_id), "conversations")
+        except Exception as e:
+            print(f"Warning: could not update conversation summary: {e}")
+
+
+# Global instance
+conversation_summary_service = ConversationSummaryService()
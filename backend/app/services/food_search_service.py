@@ -0,0 +1,235 @@
+"""
+Food Search Service
+In-memory food composition index with prefix and fuzzy search, and macro auto-fill for meal foods
+
+The bundled dataset (app/data/foods_es.json, values per 100 g) is loaded once into
+a prefix trie over every word of each food's name and aliases plus a trigram index
+for typo-tolerant matching. Matching is accent- and case-insensitive, so
+"platano", "Plátano" and "platno" all find the same food.
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.text import normalize
+
+FOODS_PATH = Path(__file__).resolve().parent.parent / "data" / "foods_es.json"
+
+MACRO_KEYS = ("calories", "protein", "carbs", "fat")
+
+# Minimum trigram similarity for a fuzzy hit, and for auto-filling a meal food by name
+FUZZY_MIN_SCORE = 0.3
+AUTOFILL_MIN_SCORE = 0.6
+
+_WEIGHT_UNITS = {"g": 1, "gr": 1, "grs": 1, "gramo": 1, "gramos": 1, "kg": 1000, "ml": 1, "cl": 10, "l": 1000}
+_PORTION_RE = re.compile(r"^\s*(\d+(?:[.,]\d+)?)?\s*(.*?)\s*$")
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of a normalized string, padded so word starts and ends count"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _macros(food: Dict[str, Any], grams: float) -> Dict[str, float]:
+    factor = grams / 100.0
+    return {
+        "calories": round(food["kcal"] * factor),
+        "protein": round(food["protein"] * factor, 1),
+        "carbs": round(food["carbs"] * factor, 1),
+        "fat": round(food["fat"] * factor, 1),
+    }
+
+
+class FoodIndex:
+    """Prefix trie plus trigram index over a list of foods"""
+
+    def __init__(self, foods: List[Dict[str, Any]]):
+        self.foods = foods
+        # Trie node: (children, ids of foods having a word that passes through the node)
+        self._trie: Tuple[Dict[str, Any], Set[int]] = ({}, set())
+        self._trigrams: Dict[str, Set[int]] = {}
+        self._trigram_counts: List[int] = []
+        self._exact: Dict[str, int] = {}
+
+        for food_id, food in enumerate(foods):
+            labels = [normalize(label) for label in [food["name"], *food.get("aliases", [])]]
+            grams: Set[str] = set()
+            for label in labels:
+                self._exact.setdefault(label, food_id)
+                grams |= trigrams(label)
+                for word in label.split():
+                    self._insert(word, food_id)
+            for gram in grams:
+                self._trigrams.setdefault(gram, set()).add(food_id)
+            self._trigram_counts.append(len(grams))
+
+    def _insert(self, word: str, food_id: int) -> None:
+        children, ids = self._trie
+        ids.add(food_id)
+        for char in word:
+            children, ids = children.setdefault(char, ({}, set()))
+            ids.add(food_id)
+
+    def _prefix_ids(self, prefix: str) -> Set[int]:
+        children, ids = self._trie
+        for char in prefix:
+            node = children.get(char)
+            if node is None:
+                return set()
+            children, ids = node
+        return ids
+
+    def _fuzzy(self, query: str) -> Dict[int, float]:
+        """Dice similarity between the query's trigrams and each candidate food's"""
+        query_grams = trigrams(query)
+        shared = Counter(food_id for gram in query_grams for food_id in self._trigrams.get(gram, ()))
+        return {
+            food_id: 2 * count / (len(query_grams) + self._trigram_counts[food_id])
+            for food_id, count in shared.items()
+        }
+
+    def match(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        Rank foods for a query
+
+        Exact name/alias matches first, then foods where every query word prefixes
+        one of their words, then fuzzy (trigram) matches above FUZZY_MIN_SCORE.
+
+        Returns:
+            [(food index, score)] best first; scores are 1.0 for exact matches,
+            0.5-0.99 for prefix matches and below 0.5 for fuzzy-only matches
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        fuzzy = self._fuzzy(query)
+        scores: Dict[int, float] = {}
+
+        exact = self._exact.get(query)
+        if exact is not None:
+            scores[exact] = 1.0
+
+        words = query.split()
+        candidates = self._prefix_ids(words[0])
+        for word in words[1:]:
+            candidates = candidates & self._prefix_ids(word)
+        for food_id in candidates:
+            scores.setdefault(food_id, 0.5 + 0.49 * fuzzy.get(food_id, 0.0))
+
+        for food_id, score in fuzzy.items():
+            if score >= FUZZY_MIN_SCORE:
+                scores.setdefault(food_id, round(0.49 * score, 3))
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self.foods[item[0]]["name"])))
+        return ranked[:limit]
+
+
+def parse_portion(portion: Any, food: Dict[str, Any]) -> Optional[float]:
+    """
+    Grams described by a portion text, using the food's named portions when needed
+
+    "150 g" -> 150, "0,2 kg" -> 200, "2 unidades"/"2" -> 2 x the food's first named
+    portion (e.g. "1 unidad"), "1 filete" -> that portion. None when not resolvable.
+    """
+    text = str(portion or "").strip().lower().replace(",", ".")
+    match = _PORTION_RE.match(text)
+    if not match or not text:
+        return None
+    amount = float(match.group(1)) if match.group(1) else 1.0
+    unit = normalize(match.group(2))
+
+    if unit in _WEIGHT_UNITS:
+        return amount * _WEIGHT_UNITS[unit]
+
+    named = {normalize(name.split(" ", 1)[1]): grams for name, grams in food.get("portions", {}).items()
+             if " " in name and name.split(" ", 1)[0] == "1"}
+    if unit in named:
+        return amount * named[unit]
+    # Plurals ("2 filetes", "3 unidades") and bare counts ("2")
+    for name, grams in named.items():
+        if unit and unit.startswith(name):
+            return amount * grams
+    if not unit and match.group(1) and named:
+        return amount * next(iter(named.values()))
+    return None
+
+
+class FoodSearchService:
+    """Loads the bundled food dataset lazily and answers searches from memory"""
+
+    def __init__(self, path: Path = FOODS_PATH):
+        self._path = path
+        self._index: Optional[FoodIndex] = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> FoodIndex:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    with open(self._path, encoding="utf-8") as f:
+                        self._index = FoodIndex(json.load(f)["foods"])
+        return self._index
+
+    def _describe(self, food: Dict[str, Any], score: float) -> Dict[str, Any]:
+        return {
+            "name": food["name"],
+            "score": round(score, 3),
+            "per_100g": _macros(food, 100),
+            "portions": [
+                {"portion": name, "grams": grams, **_macros(food, grams)}
+                for name, grams in food.get("portions", {}).items()
+            ],
+        }
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search foods by prefix or approximate name
+
+        Args:
+            query: Free text, e.g. "pech pollo" or "platno"
+            limit: Maximum results
+
+        Returns:
+            [{"name", "score", "per_100g", "portions": [{"portion", "grams", calories, protein, carbs, fat}]}]
+        """
+        index = self.index
+        return [self._describe(index.foods[food_id], score) for food_id, score in index.match(query, limit)]
+
+    def fill_food(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fill missing macros of one meal food from the dataset
+
+        Only when the name matches confidently and the portion resolves to grams;
+        values already entered are never overwritten.
+
+        Returns:
+            The item, with filled values and "macros_source": "food_db" when anything was filled
+        """
+        if not isinstance(item, dict) or all(item.get(key) is not None for key in MACRO_KEYS):
+            return item
+        matches = self.index.match(item.get("name", ""), limit=1)
+        if not matches or matches[0][1] < AUTOFILL_MIN_SCORE:
+            return item
+        food = self.index.foods[matches[0][0]]
+        grams = parse_portion(item.get("portion"), food)
+        if not grams:
+            return item
+        macros = _macros(food, grams)
+        filled = {key: macros[key] for key in MACRO_KEYS if item.get(key) is None}
+        return {**item, **filled, "macros_source": "food_db", "matched_food": food["name"]}
+
+    def fill_foods(self, foods: Optional[List[Any]]) -> Optional[List[Any]]:
+        """Fill missing macros for every food of a meal (None stays None)"""
+        if not foods:
+            return foods
+        return [self.fill_food(item) for item in foods]
+
+
+# Global instance
+food_search_service = FoodSearchService()
@@ -0,0 +1,162 @@
+"""
+Last Sessions Service
+Index from (user, workout_type) to the latest session with its parsed exercises
+
+Backs the workout logger's "prefill from last time": one row per user and workout
+type in last_sessions (plus an ANY_TYPE row for the latest session overall), kept
+current by log_workout and rebuilt when a workout is deleted or edited. Both
+writes are single RPCs (merge_last_sessions, replace_last_sessions): the merge
+compares dates in SQL, and the rebuild replaces the user's rows in one
+transaction. Reads are cached per worker until the shared "progress" write
+version moves.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from app.services.cache_service import cache_service
+from app.services.supabase_service import supabase_service
+from app.services.workout_data import parse_workout_notes
+
+# workout_type key for the latest session regardless of type
+ANY_TYPE = "*"
+
+# Idle entries are dropped after this long (freshness comes from the write version)
+LAST_SESSIONS_CACHE_TTL_SECONDS = 3600
+
+
+def _is_newer(session: Dict[str, Any], current: Optional[Dict[str, Any]]) -> bool:
+    """Whether session is at least as recent as current (ties go to the newer write)"""
+    if not current:
+        return True
+    return str(session.get("date") or "") >= str(current.get("date") or "")
+
+
+class LastSessionsService:
+    """Reads and maintains the last_sessions index"""
+
+    def _rows(self, sessions: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "workout_type": workout_type,
+                "progress_id": session.get("id"),
+                "workout_date": session.get("date"),
+                "payload": session
+            }
+            for workout_type, session in sessions.items()
+        ]
+
+    def _scan(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Build the index by parsing the user's full progress history"""
+        # Imported here: analytics_service loads numpy, which the app import avoids
+        from app.services.analytics_service import analytics_service
+
+        sessions: Dict[str, Dict[str, Any]] = {}
+        for row in analytics_service.fetch_workout_rows(user_id):
+            payload = parse_workout_notes(row.get("notes"))
+            if not payload:
+                continue
+            session = {**payload, "date": row.get("workout_date"), "id": row.get("id")}
+            # Rows arrive oldest first, so later rows overwrite earlier ones
+            sessions[ANY_TYPE] = session
+            if payload.get("workout_type"):
+                sessions[str(payload["workout_type"])] = session
+        return sessions
+
+    def _load(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Get workout_type -> latest session for the user (cached until the next progress write)"""
+        version = (supabase_service.get_write_versions(str(user_id), ["progress"]) or {}).get("progress")
+        cached = cache_service.get("last_sessions", str(user_id))
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+        if not supabase_service.is_connected() or not supabase_service._is_valid_uuid(user_id):
+            return {}
+
+        try:
+            result = supabase_service.select("last_sessions.full")\
+                .eq("user_id", user_id)\
+                .execute()
+            sessions = {row["workout_type"]: row.get("payload") or {} for row in result.data or []}
+            if not sessions:
+                # Users with history logged before the index existed get it built once
+                sessions = self.rebuild(user_id)
+        except Exception as e:
+            print(f"Error loading last sessions, scanning history: {e}")
+            sessions = self._scan(user_id)
+
+        if version is not None:
+            cache_service.set("last_sessions", str(user_id), (version, sessions), ttl=LAST_SESSIONS_CACHE_TTL_SECONDS)
+        return sessions
+
+    def get_last_session(self, user_id: str, workout_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the latest session, optionally of one workout type
+
+        Args:
+            user_id: User identifier
+            workout_type: Exact workout type, or None for the latest session overall
+
+        Returns:
+            Session payload (workout_type, exercises, ..., date, id) or None
+        """
+        return self._load(user_id).get(workout_type or ANY_TYPE)
+
+    def record_session(self, user_id: str, progress_id: Any, workout_date: str,
+                       payload: Dict[str, Any]) -> None:
+        """
+        Index a newly logged session if it is the latest of its type
+
+        Args:
+            user_id: User identifier
+            progress_id: Progress row holding the session
+            workout_date: Session date (YYYY-MM-DD)
+            payload: Workout payload as stored in the notes (workout_type, exercises, ...)
+        """
+        session = {**payload, "date": workout_date, "id": progress_id}
+        keys: List[str] = [ANY_TYPE]
+        if payload.get("workout_type"):
+            keys.append(str(payload["workout_type"]))
+
+        if not supabase_service.is_connected() or not supabase_service._is_valid_uuid(user_id):
+            # Mock mode: nothing is persisted, so this worker's copy is the index
+            cached = cache_service.get("last_sessions", str(user_id))
+            sessions = dict(cached[1]) if cached is not None else {}
+            for key in keys:
+                if _is_newer(session, sessions.get(key)):
+                    sessions[key] = session
+            version = (supabase_service.get_write_versions(str(user_id), ["progress"]) or {}).get("progress")
+            cache_service.set("last_sessions", str(user_id), (version, sessions), ttl=LAST_SESSIONS_CACHE_TTL_SECONDS)
+            return
+
+        if not self._load(user_id):
+            # First indexed session: the index is built from history, which already holds it
+            return
+        try:
+            # Compared against the stored rows in SQL, so a concurrent or older write never wins
+            supabase_service.supabase.rpc("merge_last_sessions", {
+                "p_user_id": user_id,
+                "p_rows": self._rows({key: session for key in keys})
+            }).execute()
+        except Exception as e:
+            print(f"Error saving last sessions: {e}")
+        cache_service.invalidate("last_sessions", str(user_id))
+
+    def rebuild(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Recompute the user's index from history (after a workout is deleted or edited)
+
+        Must run after the write has bumped the "progress" version so readers reload.
+        """
+        sessions = self._scan(user_id)
+        try:
+            supabase_service.supabase.rpc("replace_last_sessions", {
+                "p_user_id": user_id,
+                "p_rows": self._rows(sessions)
+            }).execute()
+        except Exception as e:
+            print(f"Error rebuilding last sessions: {e}")
+        cache_service.invalidate("last_sessions", str(user_id))
+        return sessions
+
+
+# Global instance
+last_sessions_service = LastSessionsService()
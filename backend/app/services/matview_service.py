@@ -0,0 +1,182 @@
+"""
+Materialized View Service
+Scheduled refresh and staleness tracking for the coach/admin dashboard views
+
+Views are refreshed through the refresh_materialized_view() RPC, which also stamps
+materialized_view_refreshes so every worker shares the same notion of freshness
+(and takes an advisory lock, so the schedulers of several workers never refresh
+the same view twice at once). Writes mark the affected views dirty in that table.
+Readers ask is_fresh() and fall back to live queries when a view is dirty, older
+than MATVIEW_MAX_STALENESS_SECONDS, or was never refreshed (e.g. not installed yet).
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.services.supabase_service import supabase_service
+
+VIEWS = ("mv_client_summary", "mv_weekly_activity", "mv_coach_unread", "mv_active_nutrition_plan")
+
+
+def _parse_timestamp(value: str) -> float:
+    """Parse a Postgres timestamptz string into epoch seconds"""
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).astimezone(timezone.utc).timestamp()
+
+
+class MaterializedViewService:
+    """Refreshes dashboard materialized views and tracks how stale they are"""
+
+    def __init__(self):
+        """Initialize empty refresh state"""
+        self._lock = threading.Lock()
+        self._refreshed_at: Dict[str, float] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._dirty: Dict[str, float] = {}  # view -> when this worker marked it, until refreshed
+        self._shared_dirty: Set[str] = set()  # Dirty in the shared refresh log at the last sync
+        self._task: Optional[asyncio.Task] = None
+
+    # Staleness
+    def age(self, view: str) -> Optional[float]:
+        """Seconds since the view was last refreshed, or None if unknown"""
+        with self._lock:
+            refreshed_at = self._refreshed_at.get(view)
+        return time.time() - refreshed_at if refreshed_at else None
+
+    def is_dirty(self, view: str) -> bool:
+        """Whether a write not reflected in the view yet has been recorded"""
+        with self._lock:
+            return view in self._dirty or view in self._shared_dirty
+
+    def is_fresh(self, view: str, max_age: Optional[float] = None) -> bool:
+        """
+        Whether readers may use the view instead of live queries
+
+        Reads the shared refresh log first, so a write handled by another worker
+        is seen immediately; if the log cannot be read the view is not used.
+        """
+        if supabase_service.is_connected():
+            try:
+                self._sync()
+            except Exception as e:
+                print(f"Warning: could not read materialized view refresh log: {e}")
+                return False
+        age = self.age(view)
+        limit = settings.MATVIEW_MAX_STALENESS_SECONDS if max_age is None else max_age
+        return age is not None and age <= limit and not self.is_dirty(view)
+
+    def mark_dirty(self, *views: str) -> None:
+        """Note a write affecting views: readers skip them until refreshed, which the scheduler does early"""
+        now = time.time()
+        with self._lock:
+            for view in views:
+                self._dirty.setdefault(view, now)
+        if not supabase_service.is_connected():
+            return
+        try:
+            supabase_service.supabase.rpc("mark_materialized_views_dirty", {"p_views": list(views)}).execute()
+        except Exception as e:
+            print(f"Warning: could not mark materialized views dirty {views}: {e}")
+
+    def status(self) -> List[Dict]:
+        """Refresh state per view (for diagnostics)"""
+        return [
+            {
+                "view": view,
+                "fresh": self.is_fresh(view),
+                "age_seconds": round(self.age(view), 1) if self.age(view) is not None else None,
+                "dirty": self.is_dirty(view),
+            }
+            for view in VIEWS
+        ]
+
+    # Refresh
+    def _sync(self) -> None:
+        """Pick up refreshes and dirty marks recorded by other workers"""
+        result = supabase_service.select("materialized_view_refreshes.full").execute()
+        with self._lock:
+            self._shared_dirty = set()
+            for row in result.data or []:
+                refreshed_at = _parse_timestamp(row["refreshed_at"])
+                if refreshed_at > self._refreshed_at.get(row["view_name"], 0):
+                    self._refreshed_at[row["view_name"]] = refreshed_at
+                if row.get("dirty_since"):
+                    self._shared_dirty.add(row["view_name"])
+                elif self._dirty.get(row["view_name"], refreshed_at) < refreshed_at:
+                    # Another worker refreshed the view after this worker's write
+                    del self._dirty[row["view_name"]]
+
+    def refresh(self, view: str) -> None:
+        """Refresh one view now (skipped while another worker is refreshing it)"""
+        result = supabase_service.supabase.rpc("refresh_materialized_view", {"p_view": view}).execute()
+        if result.data is None:
+            return
+        refreshed_at = _parse_timestamp(result.data) if isinstance(result.data, str) else time.time()
+        with self._lock:
+            self._refreshed_at[view] = refreshed_at
+            self._dirty.pop(view, None)
+            self._failed_at.pop(view, None)
+
+    def refresh_due(self) -> None:
+        """Refresh every view that is past its interval, or dirty and past the minimum interval"""
+        if not supabase_service.is_connected():
+            return
+        try:
+            self._sync()
+        except Exception as e:
+            print(f"Warning: could not read materialized view refresh log: {e}")
+
+        now = time.time()
+        for view in VIEWS:
+            age = self.age(view)
+            with self._lock:
+                dirty = view in self._dirty or view in self._shared_dirty
+                failed_at = self._failed_at.get(view)
+            # Back off after a failure (e.g. the view is not installed) for a full interval
+            if failed_at and now - failed_at < settings.MATVIEW_REFRESH_INTERVAL_SECONDS:
+                continue
+            due = age is None or age >= settings.MATVIEW_REFRESH_INTERVAL_SECONDS \
+                or (dirty and age >= settings.MATVIEW_MIN_REFRESH_SECONDS)
+            if not due:
+                continue
+            try:
+                self.refresh(view)
+            except Exception as e:
+                print(f"Warning: could not refresh {view}: {e}")
+                with self._lock:
+                    self._failed_at[view] = now
+
+    # Scheduler
+    async def _run(self) -> None:
+        tick = max(5, settings.MATVIEW_MIN_REFRESH_SECONDS)
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh_due)
+            except Exception as e:
+                print(f"Error in materialized view scheduler: {e}")
+            await asyncio.sleep(tick)
+
+    def start(self) -> None:
+        """Start the background refresh loop (idempotent)"""
+        if not settings.MATVIEW_REFRESH_ENABLED or not supabase_service.is_connected():
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            print("Materialized view scheduler started")
+
+    async def stop(self) -> None:
+        """Stop the background refresh loop"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+# Global instance
+matview_service = MaterializedViewService()
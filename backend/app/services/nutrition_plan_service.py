@@ -0,0 +1,224 @@
+"""
+Nutrition Plan Service
+Set-based writes on nutrition plans: bulk meal edits and cloning plans/templates
+
+Bulk edits are validated together against the plan's current meals and applied
+in one transaction by the apply_meal_batch() RPC; cloning copies a plan and all
+its meals to many users with the clone_nutrition_plan() RPC. Databases without
+the RPCs get the same multi-row statements issued from here (not transactional).
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.supabase_service import supabase_service
+
+MEAL_FIELDS = (
+    "meal_type", "meal_order", "name", "description", "day_of_week", "calories",
+    "protein_grams", "carbs_grams", "fat_grams", "time_suggestion", "foods",
+)
+
+# Largest number of operations accepted in one batch
+MAX_BATCH_OPERATIONS = 500
+
+# Largest number of users a plan can be cloned to in one call
+MAX_CLONE_USERS = 500
+
+PLAN_FIELDS = (
+    "name", "description", "daily_calories", "protein_grams", "carbs_grams", "fat_grams", "notes",
+)
+
+
+class MealBatchError(ValueError):
+    """A batch failed validation; errors lists {"index", "error"} per offending operation"""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(f"{len(errors)} invalid meal operation(s)")
+        self.errors = errors
+
+
+def _is_missing_function(error: Exception) -> bool:
+    """Whether PostgREST rejected an RPC because the function is not installed"""
+    message = str(error)
+    return "PGRST202" in message or "Could not find the function" in message
+
+
+def plan_meal_batch(existing: Dict[str, Dict[str, Any]], operations: List[Dict[str, Any]]
+                    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[str]]:
+    """
+    Validate a batch against the plan's meals and resolve it into full rows
+
+    Updates are merged over the current row, so the upsert never nulls columns
+    the operation did not mention.
+
+    Args:
+        existing: meal id -> current nutrition_meals row of the plan
+        operations: [{"op": "create"|"update"|"delete", "id", "meal": {...}}]
+
+    Returns:
+        (new meal rows, updated meal rows with id, meal ids to delete)
+
+    Raises:
+        MealBatchError: Unknown ids, ids used twice, or ids on create
+    """
+    creates: List[Dict[str, Any]] = []
+    updates: List[Dict[str, Any]] = []
+    deletes: List[str] = []
+    errors: List[Dict[str, Any]] = []
+    seen = set()
+
+    for index, operation in enumerate(operations):
+        op, meal_id, meal = operation["op"], operation.get("id"), operation.get("meal") or {}
+        if op == "create":
+            if meal_id:
+                errors.append({"index": index, "error": "create must not carry an id"})
+                continue
+            creates.append({field: meal.get(field) for field in MEAL_FIELDS})
+            continue
+
+        meal_id = str(meal_id or "")
+        if meal_id not in existing:
+            errors.append({"index": index, "error": f"meal {meal_id or '(missing id)'} is not in this plan"})
+        elif meal_id in seen:
+            errors.append({"index": index, "error": f"meal {meal_id} appears in more than one operation"})
+        elif op == "update":
+            current = existing[meal_id]
+            updates.append({"id": meal_id, **{f: meal.get(f, current.get(f)) for f in MEAL_FIELDS}})
+        else:
+            deletes.append(meal_id)
+        seen.add(meal_id)
+
+    if errors:
+        raise MealBatchError(errors)
+    return creates, updates, deletes
+
+
+class NutritionPlanService:
+    """Bulk operations on nutrition plans and their meals"""
+
+    def get_meals(self, plan_id: str) -> List[Dict[str, Any]]:
+        """Current meals of a plan"""
+        result = supabase_service.select("nutrition_meals.full")\
+            .eq("plan_id", plan_id)\
+            .order("meal_order")\
+            .execute()
+        return result.data or []
+
+    def apply_meal_batch(self, plan_id: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply create/update/delete meal operations to a plan in one round
+
+        Args:
+            plan_id: Plan the meals belong to
+            operations: Shape-validated operations ({"op", "id", "meal"})
+
+        Returns:
+            {"created", "updated", "deleted", "transactional"}
+
+        Raises:
+            MealBatchError: The batch does not match the plan's meals
+        """
+        existing = {str(m["id"]): m for m in self.get_meals(plan_id)}
+        creates, updates, deletes = plan_meal_batch(existing, operations)
+        summary = {"created": len(creates), "updated": len(updates), "deleted": len(deletes)}
+
+        try:
+            supabase_service.supabase.rpc("apply_meal_batch", {
+                "p_plan_id": plan_id,
+                "p_upserts": updates + creates,
+                "p_delete_ids": deletes
+            }).execute()
+            return {**summary, "transactional": True}
+        except Exception as e:
+            if not _is_missing_function(e):
+                raise
+            print("apply_meal_batch RPC not installed, applying meal batch without a transaction")
+
+        if deletes:
+            supabase_service.supabase.table("nutrition_meals")\
+                .delete()\
+                .eq("plan_id", plan_id)\
+                .in_("id", deletes)\
+                .execute()
+        if updates:
+            supabase_service.supabase.table("nutrition_meals")\
+                .upsert([{**row, "plan_id": plan_id} for row in updates], on_conflict="id")\
+                .execute()
+        if creates:
+            supabase_service.supabase.table("nutrition_meals")\
+                .insert([{**row, "plan_id": plan_id} for row in creates])\
+                .execute()
+        return {**summary, "transactional": False}
+
+    def list_templates(self, coach_id: str) -> List[Dict[str, Any]]:
+        """A coach's plan templates, most recently edited first"""
+        result = supabase_service.select("nutrition_plans.template")\
+            .eq("user_id", coach_id)\
+            .eq("is_template", True)\
+            .order("updated_at", desc=True)\
+            .execute()
+        return result.data or []
+
+    def clone_plan(self, plan: Dict[str, Any], user_ids: List[str], coach_id: Optional[str] = None,
+                   activate: bool = True) -> Dict[str, Any]:
+        """
+        Copy a plan (or template) and all its meals to many users
+
+        Args:
+            plan: Source nutrition_plans row
+            user_ids: Users receiving a copy (duplicates ignored)
+            coach_id: Coach recorded on the copies (defaults to the source's coach)
+            activate: Make each copy the user's active plan, deactivating the current one
+
+        Returns:
+            {"plans": [{"user_id", "plan_id"}], "transactional"}
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        try:
+            result = supabase_service.supabase.rpc("clone_nutrition_plan", {
+                "p_plan_id": plan["id"],
+                "p_user_ids": user_ids,
+                "p_coach_id": coach_id,
+                "p_activate": activate
+            }).execute()
+            plans = [{"user_id": r["cloned_user_id"], "plan_id": r["cloned_plan_id"]} for r in result.data or []]
+            return {"plans": plans, "transactional": True}
+        except Exception as e:
+            if not _is_missing_function(e):
+                raise
+            print("clone_nutrition_plan RPC not installed, cloning without a transaction")
+
+        if activate:
+            supabase_service.supabase.table("nutrition_plans")\
+                .update({"is_active": False})\
+                .in_("user_id", user_ids)\
+                .eq("is_active", True)\
+                .eq("is_template", False)\
+                .execute()
+        new_plans = supabase_service.supabase.table("nutrition_plans")\
+            .insert([
+                {
+                    **{field: plan.get(field) for field in PLAN_FIELDS},
+                    "user_id": user_id,
+                    "coach_id": coach_id or plan.get("coach_id"),
+                    "is_active": activate,
+                    "is_template": False,
+                    "template_id": plan["id"]
+                }
+                for user_id in user_ids
+            ])\
+            .execute().data or []
+        meals = self.get_meals(plan["id"])
+        if meals and new_plans:
+            supabase_service.supabase.table("nutrition_meals")\
+                .insert([
+                    {**{field: meal.get(field) for field in MEAL_FIELDS}, "plan_id": new_plan["id"]}
+                    for new_plan in new_plans
+                    for meal in meals
+                ])\
+                .execute()
+        plans = [{"user_id": p["user_id"], "plan_id": p["id"]} for p in new_plans]
+        return {"plans": plans, "transactional": False}
+
+
+# Global instance
+nutrition_plan_service = NutritionPlanService()
@@ -3,22 +3,41 @@ OpenAI Service
 Wrapper for OpenAI API interactions (chat completions, streaming)
 """
 
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import json
+import threading
+from typing import TYPE_CHECKING, Callable, List, Dict, Any, Optional
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 
 class OpenAIService:
     """Service for managing OpenAI API interactions"""
     
     def __init__(self):
-        """Initialize OpenAI client"""
-        self.client: Optional[OpenAI] = None
-        if settings.OPENAI_API_KEY:
-            try:
-                self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-            except Exception as e:
-                print(f"Warning: Could not initialize OpenAI client: {e}")
+        """Prepare lazy client construction (the client is built on first use)"""
+        self._client: Optional["OpenAI"] = None
+        self._client_failed = False
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self) -> Optional["OpenAI"]:
+        """OpenAI client, created (and the openai package imported) on first access; thread-safe"""
+        if self._client is None and not self._client_failed and settings.OPENAI_API_KEY:
+            with self._client_lock:
+                if self._client is None and not self._client_failed:
+                    try:
+                        from openai import OpenAI
+                        self._client = OpenAI(api_key=settings.OPENAI_API_KEY)
+                    except Exception as e:
+                        self._client_failed = True
+                        print(f"Warning: Could not initialize OpenAI client: {e}")
+        return self._client
+    
+    @client.setter
+    def client(self, client: Optional["OpenAI"]) -> None:
+        self._client = client
     
     def is_connected(self) -> bool:
         """Check if OpenAI is connected"""
@@ -27,7 +46,8 @@ class OpenAIService:
     def get_chat_response(
         self, 
         messages: List[Dict[str, str]], 
-        user_context: Optional[Dict[str, Any]] = None
+        user_context: Optional[Dict[str, Any]] = None,
+        on_usage: Optional[Callable[[int], None]] = None
     ) -> str:
         """
         Get chat completion from OpenAI
@@ -35,6 +55,7 @@ class OpenAIService:
         Args:
             messages: List of message dictionaries with 'role' and 'content'
             user_context: Optional user context information
+            on_usage: Called with the completion's total tokens (not called for mock responses)
         
         Returns:
             Assistant's response as a string
@@ -57,6 +78,8 @@ class OpenAIService:
                 max_tokens=800  # Increased for more detailed responses
             )
             
+            if on_usage is not None and getattr(response, "usage", None) is not None:
+                on_usage(response.usage.total_tokens)
             return response.choices[0].message.content
         except Exception as e:
             print(f"Error calling OpenAI API: {e}")
@@ -122,6 +145,10 @@ SIEMPRE:
         
         return {"role": "system", "content": base_prompt.strip()}
     
+    def get_degraded_response(self, messages: List[Dict[str, str]], user_context: Optional[Dict[str, Any]] = None) -> str:
+        """Canned answer served without calling OpenAI (rate limited or over budget)"""
+        return self._get_mock_response(messages, user_context)
+    
     def _get_mock_response(self, messages: List[Dict[str, str]], user_context: Optional[Dict[str, Any]] = None) -> str:
         """Return mock response for desarrollo (es) con tono pro y motivacional"""
         user_message = messages[-1].get("content", "") if messages else ""
@@ -161,7 +188,7 @@ SIEMPRE:
                 "- 2-3 sesiones LISS de 25-40 min post-entreno o días separados.\n"
                 "- HIIT 1x/semana si recuperas bien (6-10 sprints de 20-30s, 1-2 min pausa).\n"
                 "- Mantén 1-2 días completos de descanso/recuperación activa.\n"
-                f"{context_str}"
+                f"{profile_str}"
             )
 
         if any(k in lower for k in ["caloría", "caloria", "déficit", "superávit", "superavit", "macros", "prote", "grasa", "carbo"]):
@@ -172,7 +199,7 @@ SIEMPRE:
                 "- Carbs: resto de calorías; sube en días de pierna/fuerza.\n"
                 "- Timing: pre-entreno 20-40 g prote + 30-60 g carbs; post-entreno similar.\n"
                 "- Si buscas déficit: -10% a -20% calorías; superávit controlado +5-10% para masa.\n"
-                f"{context_str}"
+                f"{profile_str}"
             )
 
         if any(k in lower for k in ["recuperación", "recuperacion", "sueño", "fatiga", "lesión", "lesion"]):
@@ -182,7 +209,7 @@ SIEMPRE:
                 "- Controla volumen: si hay fatiga, baja un 20-30% series una semana (deload).\n"
                 "- Movilidad ligera y caminatas 20-30 min en días libres.\n"
                 "- Prote 1.8-2 g/kg y 30-40 g en la comida post-entreno.\n"
-                f"{context_str}"
+                f"{profile_str}"
             )
 
         if any(k in lower for k in ["principiante", "empezar", "start", "novato"]):
@@ -192,7 +219,7 @@ SIEMPRE:
                 "- 3x8-12 reps, RIR 2-3, descanso 90s.\n"
                 "- Sube peso o reps cada semana si mantienes técnica.\n"
                 "- 6-8k pasos/día y 2L agua.\n"
-                f"{context_str}"
+                f"{profile_str}"
             )
 
         # Default mock
@@ -245,6 +272,52 @@ SIEMPRE:
             for word in response.split():
                 yield word + " "
 
+    
+    def summarize_conversation(
+        self,
+        messages: List[Dict[str, str]],
+        on_usage: Optional[Callable[[int], None]] = None
+    ) -> Optional[Dict[str, str]]:
+        """
+        Title and one-sentence summary of a conversation (cheap, short completion)
+        
+        Args:
+            messages: Conversation turns with 'role' and 'content', oldest first
+            on_usage: Called with the completion's total tokens
+        
+        Returns:
+            {"title", "summary"}, or None when OpenAI is unavailable or the reply is unusable
+        """
+        if not self.is_connected():
+            return None
+        transcript = "\n".join(f"{m['role']}: {m['content'][:600]}" for m in messages)
+        try:
+            response = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "Resume conversaciones entre un usuario y su coach de fitness. Responde solo JSON "
+                            '{"title": "...", "summary": "..."}: título de máximo 6 palabras sin comillas ni punto '
+                            "final y resumen de una frase (máximo 160 caracteres), en español."
+                        )
+                    },
+                    {"role": "user", "content": transcript}
+                ],
+                temperature=0.3,
+                max_tokens=120,
+                response_format={"type": "json_object"}
+            )
+            if on_usage is not None and getattr(response, "usage", None) is not None:
+                on_usage(response.usage.total_tokens)
+            data = json.loads(response.choices[0].message.content or "{}")
+            title, summary = str(data.get("title") or "").strip(), str(data.get("summary") or "").strip()
+            return {"title": title, "summary": summary} if title and summary else None
+        except Exception as e:
+            print(f"Error summarizing conversation: {e}")
+            return None
+
 
 # Global instance
 openai_service = OpenAIService()
@@ -0,0 +1,168 @@
+"""
+Plan Totals Service
+Per-day and weekly calorie/macro totals for nutrition plans, with deviation from targets
+
+A plan's meals and computed totals are cached per plan together with the owner's
+shared "nutrition_plan" write version, which every plan or meal write bumps (see
+nutrition._bump_plan). A write handled by any worker therefore makes every
+worker's copy miss, so coaches reloading a plan while editing it never see old
+meals, and unchanged plans are never re-fetched or re-summed.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from app.services.cache_service import cache_service
+from app.services.supabase_service import supabase_service
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# (total key, food key, meal column, plan target column)
+MACROS = (
+    ("calories", "calories", "calories", "daily_calories"),
+    ("protein", "protein", "protein_grams", "protein_grams"),
+    ("carbs", "carbs", "carbs_grams", "carbs_grams"),
+    ("fat", "fat", "fat_grams", "fat_grams"),
+)
+
+# Idle entries are dropped after this long (freshness comes from the write version)
+PLAN_VIEW_CACHE_TTL_SECONDS = 600
+
+
+def _number(value: Any) -> Optional[float]:
+    """Parse a numeric macro value, None when missing or not a number"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def meal_macros(meal: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Calories and macros of one meal
+
+    Each value is the sum over the meal's foods when any food provides it,
+    otherwise the meal's own column (0 when neither is set).
+    """
+    foods = [f for f in (meal.get("foods") or []) if isinstance(f, dict)]
+    totals = {}
+    for key, food_key, meal_column, _ in MACROS:
+        values = [v for v in (_number(f.get(food_key)) for f in foods) if v is not None]
+        totals[key] = sum(values) if values else (_number(meal.get(meal_column)) or 0.0)
+    return totals
+
+
+def _rounded(totals: Dict[str, float]) -> Dict[str, float]:
+    return {key: round(value) if key == "calories" else round(value, 1) for key, value in totals.items()}
+
+
+def _deviation(actual: Dict[str, float], plan: Dict[str, Any], days: int = 1) -> Dict[str, Dict[str, Any]]:
+    """Actual vs target (scaled by days) for every macro the plan sets a target for"""
+    deviation = {}
+    for key, _, _, target_column in MACROS:
+        target = _number(plan.get(target_column))
+        if not target:
+            continue
+        target *= days
+        diff = actual[key] - target
+        deviation[key] = {
+            "target": round(target, 1),
+            "actual": round(actual[key], 1),
+            "diff": round(diff, 1),
+            "pct": round(diff / target * 100, 1),
+        }
+    return deviation
+
+
+def compute_plan_totals(plan: Dict[str, Any], meals: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compute per-day and weekly totals for a plan
+
+    Meals without a recognised day_of_week apply to every day of the week.
+
+    Args:
+        plan: nutrition_plans row (targets: daily_calories, protein_grams, carbs_grams, fat_grams)
+        meals: The plan's nutrition_meals rows
+
+    Returns:
+        {"days": [{"day", "meals", "totals", "deviation"}], "weekly": {"totals", "daily_average", "deviation"}}
+    """
+    per_day = {day: {key: 0.0 for key, *_ in MACROS} for day in DAYS}
+    meal_counts = {day: 0 for day in DAYS}
+    for meal in meals:
+        macros = meal_macros(meal)
+        day = str(meal.get("day_of_week") or "").strip().lower()
+        for target_day in ([day] if day in per_day else DAYS):
+            meal_counts[target_day] += 1
+            for key, value in macros.items():
+                per_day[target_day][key] += value
+
+    weekly = {key: sum(per_day[day][key] for day in DAYS) for key, *_ in MACROS}
+    return {
+        "days": [
+            {
+                "day": day,
+                "meals": meal_counts[day],
+                "totals": _rounded(per_day[day]),
+                "deviation": _deviation(per_day[day], plan),
+            }
+            for day in DAYS
+        ],
+        "weekly": {
+            "totals": _rounded(weekly),
+            "daily_average": _rounded({key: value / len(DAYS) for key, value in weekly.items()}),
+            "deviation": _deviation(weekly, plan, days=len(DAYS)),
+        },
+    }
+
+
+class PlanTotalsService:
+    """Caches each plan's meals and computed totals, keyed on the owner's write version"""
+
+    def get_plan_view(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get a plan's meals (ordered by meal_order) and totals
+
+        Cached until the next write to the owner's plans (shared "nutrition_plan" write version).
+
+        Args:
+            plan: nutrition_plans row
+
+        Returns:
+            {"meals", "totals"}
+        """
+        plan_id = str(plan["id"])
+        # Read before the meals, so a write racing this load leaves the entry behind the next version
+        version = (supabase_service.get_write_versions(str(plan.get("user_id")), ["nutrition_plan"]) or {})\
+            .get("nutrition_plan")
+        cached = cache_service.get("plan_view", plan_id)
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        meals_result = supabase_service.select("nutrition_meals.full")\
+            .eq("plan_id", plan_id)\
+            .order("meal_order")\
+            .execute()
+        meals = meals_result.data or []
+        view = {"meals": meals, "totals": compute_plan_totals(plan, meals)}
+        if version is not None:
+            cache_service.set("plan_view", plan_id, (version, view), ttl=PLAN_VIEW_CACHE_TTL_SECONDS)
+        return view
+
+    def get_plan(self, plan_id: str) -> Optional[Dict[str, Any]]:
+        """Load a plan row by id"""
+        result = supabase_service.select("nutrition_plans.full")\
+            .eq("id", plan_id)\
+            .limit(1)\
+            .execute()
+        return result.data[0] if result.data else None
+
+    def invalidate(self, plan_id: Optional[str]) -> None:
+        """Drop a plan's cached meals and totals after a plan or meal write"""
+        if plan_id:
+            cache_service.invalidate("plan_view", str(plan_id))
+
+
+# Global instance
+plan_totals_service = PlanTotalsService()
@@ -0,0 +1,270 @@
+"""
+Column Projections
+Declared per-endpoint column lists for every Supabase read
+
+Queries go through SupabaseService.select(name), which looks the projection up here.
+Selecting "*" on a table with wide columns (JSON blobs, free-text notes, message
+bodies) is rejected, and the hot projections (read on every dashboard or list
+request) may not select wide columns at all: the registry is validated on import,
+so a bad declaration fails at startup instead of silently shipping huge payloads.
+find_unprojected_selects() scans the source for reads that bypass the registry
+(run check_projections.py from backend/).
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+
+class ProjectionError(ValueError):
+    """Raised when a query would select unprojected wide columns"""
+
+
+# Columns that make rows large; they must be listed explicitly, never pulled via "*"
+WIDE_COLUMNS: Dict[str, Set[str]] = {
+    "users": {"availability"},
+    "user_profiles": {"notes", "habits", "injuries", "medication", "allergies"},
+    "progress": {"notes"},
+    "body_composition": {"notes"},
+    "progress_photos": {"notes", "measurements"},
+    "chat_messages": {"content", "metadata"},
+    "coach_chat": {"message", "metadata"},
+    "nutrition_plans": {"description", "notes"},
+    "nutrition_meals": {"description", "foods"},
+    "habit_logs": {"notes"},
+    "personal_records": {"reps_at_weight", "last_sets"},
+    "last_sessions": {"payload"},
+}
+
+_PROFILE_COLUMNS = (
+    "user_id, full_name, gender, birth_date, height_cm, weight_kg, body_fat_percent, "
+    "muscle_mass_kg, goal, training_frequency, activity_level, diet, sleep_hours_target, "
+    "water_goal_ml, injuries, allergies, medication, training_experience, equipment, "
+    "availability_days, availability_hours, stress_level, nutrition_preference, smoking, "
+    "alcohol, notes, habits, photo_url, phone, created_at, updated_at"
+)
+_STREAK_COLUMNS = "user_id, current_streak, longest_streak, last_workout_date, weekly_streak, monthly_streak, updated_at"
+_PLAN_COLUMNS = (
+    "id, user_id, coach_id, name, description, daily_calories, protein_grams, carbs_grams, "
+    "fat_grams, notes, is_active, is_template, template_id, created_at, updated_at"
+)
+_MEAL_COLUMNS = (
+    "id, plan_id, meal_type, meal_order, name, description, day_of_week, calories, "
+    "protein_grams, carbs_grams, fat_grams, time_suggestion, foods, created_at, updated_at"
+)
+
+# name -> (table, columns)
+PROJECTIONS: Dict[str, Tuple[str, str]] = {
+    # Users / profiles
+    "users.account": (
+        "users", "id, email, full_name, age, fitness_level, role, goals, availability, created_at, updated_at"
+    ),
+    "users.admin_list": ("users", "id, email, full_name, fitness_level, goals, created_at"),
+    "users.directory": ("users", "id, full_name, email"),
+    "user_profiles.full": ("user_profiles", _PROFILE_COLUMNS),
+    "user_profiles.admin_list": (
+        "user_profiles",
+        "user_id, full_name, goal, weight_kg, body_fat_percent, muscle_mass_kg, phone"
+    ),
+
+    # AI chat
+    "chat_messages.context": ("chat_messages", "role, content, created_at"),
+    "chat_messages.history": ("chat_messages", "id, role, content, conversation_id, created_at"),
+    "chat_messages.conversation": ("chat_messages", "id, role, content, created_at"),
+    "chat_conversations.list": (
+        "chat_conversations", "id, user_id, title, summary, preview, turn_count, created_at, updated_at"
+    ),
+    "chat_conversations.summary": ("chat_conversations", "id, user_id, title, turn_count"),
+    "chat_conversations.owner": ("chat_conversations", "id"),
+
+    # Coach chat
+    "coach_chat.unread": ("coach_chat", "user_id, sender_role"),
+    "coach_chat.messages": (
+        "coach_chat",
+        "id, user_id, coach_id, sender_id, sender_role, message, message_type, metadata, is_read, created_at"
+    ),
+
+    # Progress / workouts
+    "progress.recent": ("progress", "id, workout_id, workout_date, duration_minutes, completed"),
+    "progress.history": ("progress", "id, workout_id, workout_date, duration_minutes, completed, notes"),
+    "progress.detail": (
+        "progress",
+        "id, user_id, workout_id, workout_date, duration_minutes, completed, notes, satisfaction_rating, created_at"
+    ),
+    "progress.ownership": ("progress", "user_id, workout_date, notes"),
+    "progress.owner": ("progress", "user_id, workout_date"),
+    "progress.rollup": ("progress", "user_id, workout_date, notes"),
+    "progress.activity": ("progress", "user_id, workout_date"),
+    "progress.workout_dates": ("progress", "workout_date"),
+    "progress.workout_payload": ("progress", "id, workout_date, notes"),
+    "progress.sleep_fallback": ("progress", "workout_date, duration_minutes"),
+    "daily_activity_rollups.window": ("daily_activity_rollups", "user_id, day, workouts, sets, volume"),
+    "daily_activity_global.window": ("daily_activity_global", "day, workouts, sets, volume, active_users"),
+    "streaks.full": ("streaks", _STREAK_COLUMNS),
+    "body_composition.latest": ("body_composition", "user_id, date, weight, fat, muscle"),
+    "body_composition.series": ("body_composition", "date, muscle, fat, weight, notes"),
+    "body_composition.history": ("body_composition", "id, user_id, date, muscle, fat, weight, notes, created_at"),
+    "personal_records.full": (
+        "personal_records",
+        "user_id, exercise_key, exercise_name, first_date, max_weight, max_weight_reps, max_weight_date, "
+        "reps_at_weight, best_e1rm, best_e1rm_date, max_session_volume, max_session_volume_date, "
+        "last_date, last_sets, updated_at"
+    ),
+    "last_sessions.full": ("last_sessions", "workout_type, progress_id, workout_date, payload"),
+    "achievements.types": ("achievements", "type"),
+    "achievements.full": (
+        "achievements",
+        "id, user_id, type, title, description, icon, unlocked_at, progress, target, created_at"
+    ),
+    "progress_photos.full": (
+        "progress_photos",
+        "id, user_id, photo_type, photo_url, thumbnail_url, taken_at, notes, measurements, created_at"
+    ),
+
+    # Daily health
+    "daily_health_data.sleep": ("daily_health_data", "date, sleep_hours"),
+    "daily_health_data.water": ("daily_health_data", "date, water_ml"),
+    "daily_health_data.water_total": ("daily_health_data", "water_ml"),
+    "daily_health_data.dashboard": ("daily_health_data", "date, water_ml, sleep_hours"),
+    "daily_health_data.full": ("daily_health_data", "id, user_id, date, sleep_hours, water_ml, created_at, updated_at"),
+    "workout_days.full": ("workout_days", "id, user_id, date, created_at, updated_at"),
+    "habits.full": ("habits", "id, user_id, name, description, target_frequency, created_at, updated_at"),
+    "habit_logs.with_habit": (
+        "habit_logs",
+        "id, habit_id, user_id, log_date, completed, notes, created_at, "
+        "habits(id, name, description, target_frequency)"
+    ),
+
+    # Dashboard materialized views
+    "mv_client_summary.full": (
+        "mv_client_summary",
+        "user_id, email, full_name, fitness_level, goals, created_at, profile_name, profile_goal, phone, "
+        "weight, fat, muscle, current_streak, longest_streak, last_workout_date, total_workouts"
+    ),
+    "mv_weekly_activity.window": ("mv_weekly_activity", "user_id, week_start, workouts, sets, volume, active_days"),
+    "mv_coach_unread.full": ("mv_coach_unread", "user_id, unread_from_user, unread_from_coach, last_message_at"),
+    "mv_active_nutrition_plan.full": ("mv_active_nutrition_plan", "user_id, plan_id, name, daily_calories, updated_at"),
+    "materialized_view_refreshes.full": (
+        "materialized_view_refreshes", "view_name, refreshed_at, duration_ms, dirty_since"
+    ),
+
+    # HTTP caching
+    "write_versions.by_key": ("write_versions", "scope, version"),
+
+    # Nutrition
+    "nutrition_plans.full": ("nutrition_plans", _PLAN_COLUMNS),
+    "nutrition_plans.owner": ("nutrition_plans", "user_id"),
+    "nutrition_plans.summary": ("nutrition_plans", "id, name, daily_calories, updated_at"),
+    "nutrition_plans.template": (
+        "nutrition_plans",
+        "id, user_id, coach_id, name, daily_calories, protein_grams, carbs_grams, fat_grams, updated_at"
+    ),
+    "nutrition_meals.full": ("nutrition_meals", _MEAL_COLUMNS),
+}
+
+# Read on every dashboard, list or chat request: these may not select any wide column
+HOT_PROJECTIONS: Set[str] = {
+    "users.admin_list",
+    "user_profiles.admin_list",
+    "chat_conversations.list",
+    "chat_conversations.summary",
+    "coach_chat.unread",
+    "progress.recent",
+    "progress.activity",
+    "progress.owner",
+    "progress.workout_dates",
+    "progress.sleep_fallback",
+    "body_composition.latest",
+    "daily_health_data.dashboard",
+    "nutrition_plans.summary",
+    "nutrition_plans.template",
+    "write_versions.by_key",
+}
+
+# select() chained on table() with a literal name, possibly across continuation lines
+_DIRECT_SELECT = re.compile(r"\.table\(\s*(['\"])[^'\"]*\1\s*\)[\s\\]*\.select\(")
+
+
+def _top_level_columns(columns: str) -> Set[str]:
+    """Split a PostgREST select string into top-level column names (embedded resources ignored)"""
+    names, depth, current = set(), 0, ""
+    for ch in columns:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            names.add(current.strip())
+            current = ""
+            continue
+        if depth == 0 and ch != ")":
+            current += ch
+    if current.strip():
+        names.add(current.strip())
+    # Drop "alias:" prefixes and "::cast" suffixes
+    return {n.split("::")[0].split(":")[-1].strip() for n in names if n}
+
+
+def check_projection(table: str, columns: str) -> None:
+    """
+    Validate a column list for a table
+
+    Raises:
+        ProjectionError: If the projection selects "*" on a table with wide columns
+    """
+    if table in WIDE_COLUMNS:
+        selected = _top_level_columns(columns)
+        if "*" in selected or not selected:
+            raise ProjectionError(
+                f"Unprojected select on '{table}' would pull wide columns "
+                f"{sorted(WIDE_COLUMNS[table])}; declare a projection instead"
+            )
+    elif "*" in _top_level_columns(columns):
+        raise ProjectionError(f"Select '*' on '{table}'; declare a projection instead")
+
+
+def get_projection(name: str) -> Tuple[str, str]:
+    """
+    Look up a declared projection
+
+    Returns:
+        (table, columns)
+    """
+    if name not in PROJECTIONS:
+        raise ProjectionError(f"Unknown projection '{name}'")
+    return PROJECTIONS[name]
+
+
+def check_hot_projection(name: str) -> None:
+    """
+    Validate that a hot projection selects no wide column
+
+    Raises:
+        ProjectionError: If it does
+    """
+    table, columns = get_projection(name)
+    wide = _top_level_columns(columns) & WIDE_COLUMNS.get(table, set())
+    if wide:
+        raise ProjectionError(f"Hot projection '{name}' selects wide columns {sorted(wide)}")
+
+
+def find_unprojected_selects(root: Path) -> List[str]:
+    """
+    Find selects that bypass the registry (select() chained on a literal table()) under root
+
+    Returns:
+        "path:line" of every occurrence
+    """
+    found = []
+    for path in sorted(root.rglob("*.py")):
+        source = path.read_text(encoding="utf-8")
+        for match in _DIRECT_SELECT.finditer(source):
+            found.append(f"{path}:{source.count(chr(10), 0, match.start()) + 1}")
+    return found
+
+
+# Validate the registry on import so bad declarations fail at startup
+for _name, (_table, _columns) in PROJECTIONS.items():
+    check_projection(_table, _columns)
+for _name in HOT_PROJECTIONS:
+    check_hot_projection(_name)
@@ -0,0 +1,238 @@
+"""
+Rate Limit Service
+Token-bucket limits and daily token budgets for the endpoints that call OpenAI
+
+Every LLM endpoint has two buckets: one per user and one global, both keyed by
+the endpoint name, so a runaway client loop exhausts its own bucket long before
+it can starve everyone else. Completion usage is added to a per-user daily token
+counter, and users over LLM_DAILY_TOKENS_PER_USER are limited until the next UTC
+day. Callers decide what to do with a denial (RATE_LIMIT_MODE): answer with a
+cached or mock response ("degrade") or reject with 429 ("reject").
+
+Bucket state lives in a RateLimitStore: in-process by default, or Redis
+(RATE_LIMIT_REDIS_URL, needs the redis package) so limits hold across workers.
+"""
+
+import math
+import threading
+from abc import ABC, abstractmethod
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+try:
+    import redis
+except ImportError:  # Optional dependency, only for the shared store
+    redis = None
+
+# Buckets idle long enough to be full again are pruned every this many takes
+PRUNE_EVERY = 1000
+
+USAGE_TTL_SECONDS = 2 * 86400
+
+
+class RateLimitStore(ABC):
+    """Storage for bucket and counter state; implement these to plug in a shared backend"""
+
+    @abstractmethod
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        """
+        Take cost tokens from a bucket (negative cost gives tokens back)
+
+        Returns:
+            0 when allowed, otherwise seconds until enough tokens are available
+        """
+
+    @abstractmethod
+    def incr(self, key: str, amount: int, ttl_seconds: int) -> int:
+        """Add to a counter that expires ttl_seconds after creation; returns the new value"""
+
+    @abstractmethod
+    def get(self, key: str) -> int:
+        """Current value of a counter (0 when missing)"""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-process store (limits apply per worker)"""
+
+    def __init__(self):
+        """Initialize empty state"""
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}  # key -> (tokens, updated_at, full_after)
+        self._counters: Dict[str, Tuple[int, float]] = {}  # key -> (value, expires_at)
+        self._takes = 0
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+            wait = 0.0
+            if cost > 0 and tokens < cost:
+                wait = (cost - tokens) / refill_per_second if refill_per_second > 0 else math.inf
+            else:
+                tokens = min(capacity, tokens - cost)
+            full_after = now + (capacity - tokens) / refill_per_second if refill_per_second > 0 else math.inf
+            self._buckets[key] = (tokens, now, full_after)
+            self._takes += 1
+            if self._takes % PRUNE_EVERY == 0:
+                self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+                self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+            return wait
+
+    def incr(self, key: str, amount: int, ttl_seconds: int) -> int:
+        now = time.monotonic()
+        with self._lock:
+            value, expires_at = self._counters.get(key, (0, now + ttl_seconds))
+            if expires_at <= now:
+                value, expires_at = 0, now + ttl_seconds
+            value += amount
+            self._counters[key] = (value, expires_at)
+            return value
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            value, expires_at = self._counters.get(key, (0, 0.0))
+            return value if expires_at > time.monotonic() else 0
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Store shared by every worker through Redis (atomic Lua token bucket)"""
+
+    _TAKE = """
+    local capacity, rate, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local wait = 0
+    if cost > 0 and tokens < cost then
+      wait = (cost - tokens) / rate
+    else
+      tokens = math.min(capacity, tokens - cost)
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._take_script = self._client.register_script(self._TAKE)
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        wait = self._take_script(keys=[self._prefix + key], args=[capacity, refill_per_second, cost, time.time()])
+        return float(wait)
+
+    def incr(self, key: str, amount: int, ttl_seconds: int) -> int:
+        pipe = self._client.pipeline()
+        pipe.incrby(self._prefix + key, amount)
+        pipe.expire(self._prefix + key, ttl_seconds, nx=True)
+        return int(pipe.execute()[0])
+
+    def get(self, key: str) -> int:
+        return int(self._client.get(self._prefix + key) or 0)
+
+
+def _build_store() -> RateLimitStore:
+    if settings.RATE_LIMIT_REDIS_URL:
+        if redis is None:
+            print("Warning: RATE_LIMIT_REDIS_URL is set but the redis package is not installed; "
+                  "using per-process rate limits")
+        else:
+            return RedisRateLimitStore(settings.RATE_LIMIT_REDIS_URL)
+    return MemoryRateLimitStore()
+
+
+class RateLimitService:
+    """Per-user and global limits for LLM endpoints, plus daily token accounting"""
+
+    def __init__(self, store: Optional[RateLimitStore] = None):
+        """Initialize with a store (built from settings on first use when omitted)"""
+        self._store = store
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> RateLimitStore:
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = _build_store()
+        return self._store
+
+    def use_store(self, store: RateLimitStore) -> None:
+        """Replace the state backend (e.g. a shared store for multi-worker deployments)"""
+        self._store = store
+
+    def _usage_key(self, user_id: str) -> str:
+        return f"tokens:{user_id}:{datetime.now(timezone.utc).date().isoformat()}"
+
+    def check(self, endpoint: str, user_id: str) -> Dict[str, Any]:
+        """
+        Admit or limit one LLM call
+
+        Args:
+            endpoint: Endpoint name, e.g. "chat" or "motivation"
+            user_id: Caller
+
+        Returns:
+            {"allowed", "reason" ("daily_tokens" | "user_rate" | "global_rate" | None), "retry_after" seconds}
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return {"allowed": True, "reason": None, "retry_after": 0}
+        try:
+            budget = settings.LLM_DAILY_TOKENS_PER_USER
+            if budget and self.store.get(self._usage_key(user_id)) >= budget:
+                now = datetime.now(timezone.utc)
+                seconds_left = 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+                return {"allowed": False, "reason": "daily_tokens", "retry_after": seconds_left}
+
+            user_key = f"{endpoint}:user:{user_id}"
+            user_rate = settings.RATE_LIMIT_USER_PER_MINUTE / 60.0
+            wait = self.store.take(user_key, settings.RATE_LIMIT_USER_BURST, user_rate)
+            if wait:
+                return {"allowed": False, "reason": "user_rate", "retry_after": math.ceil(wait)}
+
+            global_rate = settings.RATE_LIMIT_GLOBAL_PER_MINUTE / 60.0
+            wait = self.store.take(f"{endpoint}:global", settings.RATE_LIMIT_GLOBAL_BURST, global_rate)
+            if wait:
+                # Not this user's fault: give their token back
+                self.store.take(user_key, settings.RATE_LIMIT_USER_BURST, user_rate, cost=-1)
+                return {"allowed": False, "reason": "global_rate", "retry_after": math.ceil(wait)}
+        except Exception as e:
+            # A store outage must not take the LLM endpoints down with it
+            print(f"Warning: rate limit store unavailable, allowing request: {e}")
+        return {"allowed": True, "reason": None, "retry_after": 0}
+
+    def should_reject(self) -> bool:
+        """Whether limited calls get 429 instead of a degraded response"""
+        return settings.RATE_LIMIT_MODE == "reject"
+
+    def rejection(self, decision: Dict[str, Any]) -> HTTPException:
+        """429 error for a denied check(), with Retry-After"""
+        detail = ("Daily AI usage limit reached" if decision["reason"] == "daily_tokens"
+                  else "Too many AI requests, please slow down")
+        return HTTPException(status_code=429, detail=detail,
+                             headers={"Retry-After": str(int(decision["retry_after"]))})
+
+    def record_usage(self, user_id: str, tokens: int) -> None:
+        """Add completion tokens to the user's daily total"""
+        if not tokens:
+            return
+        try:
+            self.store.incr(self._usage_key(user_id), int(tokens), USAGE_TTL_SECONDS)
+        except Exception as e:
+            print(f"Warning: could not record token usage: {e}")
+
+    def usage_today(self, user_id: str) -> Dict[str, int]:
+        """Tokens used today by a user and the daily budget (0 = unlimited)"""
+        return {"tokens": self.store.get(self._usage_key(user_id)), "budget": settings.LLM_DAILY_TOKENS_PER_USER}
+
+
+# Global instance
+rate_limit_service = RateLimitService()
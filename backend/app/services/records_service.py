@@ -0,0 +1,281 @@
+"""
+Personal Records Service
+Per-user, per-exercise best-set index maintained on workout writes
+
+Records live in the personal_records table (one row per user/exercise) and are
+cached in-process until the next progress write, so PR badges and "last time you
+did X" never re-parse the progress.notes history. log_workout folds the session
+into freshly read rows and merges them in SQL (merge_personal_records keeps the
+greatest values, so concurrent workers never lower a record); deleting or
+editing a workout rebuilds them by replaying the user's history in date order
+and replacing the rows in one transaction (replace_personal_records).
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.analytics_service import TrainingHistory, analytics_service, estimate_1rm
+from app.services.cache_service import cache_service
+from app.services.supabase_service import supabase_service
+from app.services.workout_data import normalize_exercises
+
+# Upper bound on how long an idle user's records stay in memory
+RECORDS_CACHE_TTL_SECONDS = 3600
+
+
+def _weight_key(weight: float) -> str:
+    """JSON object key for a load (80.0 -> "80", 82.5 -> "82.5")"""
+    return f"{weight:g}"
+
+
+def _new_record(user_id: str, name: str, workout_date: str) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "exercise_key": name.lower(),
+        "exercise_name": name,
+        "first_date": workout_date,
+        "max_weight": 0.0,
+        "max_weight_reps": 0,
+        "max_weight_date": None,
+        "reps_at_weight": {},
+        "best_e1rm": 0.0,
+        "best_e1rm_date": None,
+        "max_session_volume": 0.0,
+        "max_session_volume_date": None,
+        "last_date": None,
+        "last_sets": [],
+    }
+
+
+def apply_session(records: Dict[str, Dict[str, Any]], user_id: str, workout_date: str,
+                  exercises: Iterable[Dict[str, Any]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Fold one workout session into the record index (in place)
+
+    The first session of an exercise sets its baseline and is not reported as a PR.
+
+    Args:
+        records: exercise_key -> record row, updated in place
+        user_id: Owner of the records
+        workout_date: Session date (YYYY-MM-DD)
+        exercises: Normalized exercises [{"name", "sets": [{"reps", "weight"}]}]
+
+    Returns:
+        (changed exercise keys, new PR events)
+    """
+    changed: List[str] = []
+    events: List[Dict[str, Any]] = []
+
+    for ex in exercises:
+        sets = ex["sets"]
+        if not sets:
+            continue
+        key = ex["name"].lower()
+        reps = np.array([s["reps"] for s in sets], dtype=np.float64)
+        weight = np.array([s["weight"] for s in sets], dtype=np.float64)
+
+        max_weight = float(weight.max())
+        max_weight_reps = int(reps[weight == max_weight].max())
+        best_e1rm = round(float(estimate_1rm(weight, reps).max()), 1)
+        volume = round(float((reps * weight).sum()), 1)
+
+        record = records.get(key)
+        is_baseline = record is None
+        if is_baseline:
+            record = _new_record(user_id, ex["name"], workout_date)
+            records[key] = record
+
+        def pr(kind: str, value: float, previous: float, **extra):
+            if not is_baseline:
+                events.append({
+                    "exercise": record["exercise_name"], "type": kind,
+                    "value": value, "previous": previous, "date": workout_date, **extra
+                })
+
+        if max_weight > 0 and max_weight > float(record["max_weight"] or 0):
+            pr("max_weight", max_weight, float(record["max_weight"] or 0), reps=max_weight_reps)
+            record.update(max_weight=max_weight, max_weight_reps=max_weight_reps, max_weight_date=workout_date)
+        elif max_weight > 0 and max_weight == float(record["max_weight"] or 0) \
+                and max_weight_reps > int(record["max_weight_reps"] or 0):
+            record.update(max_weight_reps=max_weight_reps, max_weight_date=workout_date)
+
+        reps_at_weight = dict(record["reps_at_weight"] or {})
+        for w, r in zip(weight.tolist(), reps.tolist()):
+            if w <= 0 or r <= 0:
+                continue
+            wkey = _weight_key(w)
+            previous = reps_at_weight.get(wkey)
+            if previous is None or r > previous:
+                if previous is not None:
+                    pr("reps_at_weight", int(r), int(previous), weight=w)
+                reps_at_weight[wkey] = int(r)
+        record["reps_at_weight"] = reps_at_weight
+
+        if best_e1rm > float(record["best_e1rm"] or 0):
+            pr("e1rm", best_e1rm, float(record["best_e1rm"] or 0))
+            record.update(best_e1rm=best_e1rm, best_e1rm_date=workout_date)
+
+        if volume > float(record["max_session_volume"] or 0):
+            pr("session_volume", volume, float(record["max_session_volume"] or 0))
+            record.update(max_session_volume=volume, max_session_volume_date=workout_date)
+
+        if workout_date >= (record["last_date"] or ""):
+            record.update(last_date=workout_date, last_sets=sets)
+        if workout_date < (record["first_date"] or workout_date):
+            record["first_date"] = workout_date
+
+        changed.append(key)
+
+    return changed, events
+
+
+class RecordsService:
+    """Reads and maintains the personal_records index"""
+
+    def _load(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Current rows from the table (not the cache)"""
+        result = supabase_service.select("personal_records.full")\
+            .eq("user_id", user_id)\
+            .execute()
+        return {row["exercise_key"]: row for row in result.data or []}
+
+    def _replay(self, user_id: str, exclude_progress_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Rebuild records from the training history, oldest session first
+
+        Args:
+            user_id: User identifier
+            exclude_progress_id: Progress row left out of the replay (a session about to be folded in)
+        """
+        if exclude_progress_id:
+            rows = [row for row in analytics_service.fetch_workout_rows(user_id)
+                    if str(row.get("id")) != str(exclude_progress_id)]
+            history = TrainingHistory.from_rows(rows)
+        else:
+            history = analytics_service.get_history(user_id)
+        records: Dict[str, Dict[str, Any]] = {}
+        dates = np.datetime_as_string(history.session_dates, unit="D").tolist()
+        names = history.exercise_names
+
+        session: Optional[int] = None
+        exercises: Dict[int, Dict[str, Any]] = {}
+        for s, e, r, w in zip(history.session_idx.tolist(), history.exercise_idx.tolist(),
+                              history.reps.tolist(), history.weight.tolist()):
+            if s != session:
+                if session is not None:
+                    apply_session(records, user_id, dates[session], exercises.values())
+                session, exercises = s, {}
+            exercises.setdefault(e, {"name": names[e], "sets": []})["sets"].append({"reps": int(r), "weight": w})
+        if session is not None:
+            apply_session(records, user_id, dates[session], exercises.values())
+        return records
+
+    def get_records(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the user's record index
+
+        Cached until the next progress write (tracked by the shared "progress" write version).
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            exercise_key -> record row (empty in mock mode)
+        """
+        if not supabase_service.is_connected() or not supabase_service._is_valid_uuid(user_id):
+            return {}
+        version = (supabase_service.get_write_versions(str(user_id), ["progress"]) or {}).get("progress")
+        cached = cache_service.get("personal_records", str(user_id))
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        try:
+            records = self._load(user_id)
+            if not records:
+                # Users with history logged before the index existed get it built once
+                records = self.rebuild(user_id)
+        except Exception as e:
+            print(f"Error loading personal records, rebuilding from history: {e}")
+            records = self._replay(user_id)
+
+        cache_service.set("personal_records", str(user_id), (version, records), ttl=RECORDS_CACHE_TTL_SECONDS)
+        return records
+
+    def get_recent_prs(self, user_id: str, days: int = 14) -> List[Dict[str, Any]]:
+        """
+        Get exercises whose best estimated 1RM improved in the last N days
+
+        Baselines (an exercise's first session) do not count as PRs.
+
+        Returns:
+            [{"exercise", "best_e1rm", "date"}], newest first
+        """
+        since = (date.today() - timedelta(days=days)).isoformat()
+        prs = [
+            {"exercise": r["exercise_name"], "best_e1rm": r["best_e1rm"], "date": r["best_e1rm_date"]}
+            for r in self.get_records(user_id).values()
+            if r.get("best_e1rm_date") and r["best_e1rm_date"] >= since
+            and r["best_e1rm_date"] > (r.get("first_date") or "")
+        ]
+        return sorted(prs, key=lambda p: p["date"], reverse=True)
+
+    def record_workout(self, user_id: str, workout_date: str, exercises: Any,
+                       progress_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Fold a newly logged workout into the index
+
+        Args:
+            user_id: User identifier
+            workout_date: Session date (YYYY-MM-DD)
+            exercises: Exercises as logged ([{"name", "sets": [{"reps", "weight"}]}])
+            progress_id: Progress row of the session (already saved); left out if the
+                index has to be built from history first
+
+        Returns:
+            New PR events for the session
+        """
+        if not supabase_service.is_connected() or not supabase_service._is_valid_uuid(user_id):
+            return apply_session({}, user_id, workout_date, normalize_exercises(exercises))[1]
+
+        records = self._load(user_id)
+        if not records:
+            # First indexed workout: build the index from the history before this session,
+            # otherwise the session would be compared against itself and report no PRs
+            records = self.rebuild(user_id, exclude_progress_id=progress_id)
+        records = {k: dict(v) for k, v in records.items()}
+        changed, events = apply_session(records, user_id, workout_date, normalize_exercises(exercises))
+        try:
+            rows = [records[k] for k in changed]
+            if rows:
+                supabase_service.supabase.rpc("merge_personal_records", {"p_rows": rows}).execute()
+        except Exception as e:
+            print(f"Error saving personal records: {e}")
+        cache_service.invalidate("personal_records", str(user_id))
+        return events
+
+    def rebuild(self, user_id: str, exclude_progress_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Recompute the user's records from scratch (after a workout is deleted or edited)
+
+        Must run after the write has bumped the "progress" version so the history reloads.
+
+        Args:
+            user_id: User identifier
+            exclude_progress_id: Progress row left out of the replay (see record_workout)
+        """
+        records = self._replay(user_id, exclude_progress_id)
+        try:
+            supabase_service.supabase.rpc("replace_personal_records", {
+                "p_user_id": user_id,
+                "p_rows": list(records.values())
+            }).execute()
+        except Exception as e:
+            print(f"Error rebuilding personal records: {e}")
+        cache_service.invalidate("personal_records", str(user_id))
+        return records
+
+
+# Global instance
+records_service = RecordsService()
@@ -0,0 +1,139 @@
+"""
+Activity Rollup Service
+Daily per-user activity rollups (workouts, sets, volume) for admin evolution charts
+
+Rollups are refreshed for the affected (user, day) on every progress write, and
+can be rebuilt for any date range from progress. The global per-day series is
+served by the daily_activity_global view over the rollups, so admin charts never
+rescan progress.
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.supabase_service import supabase_service
+from app.services.workout_data import parse_workout_notes, workout_volume
+
+# Rows fetched per request while scanning progress or rollups
+ROLLUP_PAGE_SIZE = 1000
+
+
+def _day(value: Any) -> str:
+    """Normalize a date/datetime value to YYYY-MM-DD"""
+    return str(value or "")[:10]
+
+
+def aggregate_progress(rows: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Aggregate progress rows into per-(user, day) rollups
+
+    Args:
+        rows: Progress rows with user_id, workout_date and notes
+
+    Returns:
+        (user_id, day) -> rollup row
+    """
+    rollups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for row in rows:
+        user_id, day = row.get("user_id"), _day(row.get("workout_date"))
+        if not user_id or not day:
+            continue
+        volume, sets = workout_volume(parse_workout_notes(row.get("notes")))
+        rollup = rollups.setdefault((user_id, day), {
+            "user_id": user_id, "day": day, "workouts": 0, "sets": 0, "volume": 0.0
+        })
+        rollup["workouts"] += 1
+        rollup["sets"] += sets
+        rollup["volume"] = round(rollup["volume"] + volume, 1)
+    return rollups
+
+
+class RollupService:
+    """Maintains and reads daily_activity_rollups"""
+
+    def _paged(self, build_query) -> List[Dict[str, Any]]:
+        """Run a query page by page until a short page comes back"""
+        rows: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            batch = build_query().range(start, start + ROLLUP_PAGE_SIZE - 1).execute().data or []
+            rows.extend(batch)
+            if len(batch) < ROLLUP_PAGE_SIZE:
+                return rows
+            start += ROLLUP_PAGE_SIZE
+
+    def _upsert(self, rollups: List[Dict[str, Any]]) -> None:
+        if not rollups:
+            return
+        now = datetime.utcnow().isoformat()
+        for i in range(0, len(rollups), ROLLUP_PAGE_SIZE):
+            supabase_service.supabase.table("daily_activity_rollups")\
+                .upsert([{**r, "updated_at": now} for r in rollups[i:i + ROLLUP_PAGE_SIZE]],
+                        on_conflict="user_id,day")\
+                .execute()
+
+    def refresh_day(self, user_id: Optional[str], day: Any) -> None:
+        """
+        Recompute one user's rollup for one day from progress
+
+        Idempotent, so it is correct after inserts, edits and deletes alike.
+        """
+        day = _day(day)
+        if not user_id or not day or not supabase_service.is_connected():
+            return
+        try:
+            result = supabase_service.select("progress.rollup")\
+                .eq("user_id", user_id)\
+                .eq("workout_date", day)\
+                .execute()
+            rollup = aggregate_progress(result.data or []).get((user_id, day))
+            if rollup:
+                self._upsert([rollup])
+            else:
+                supabase_service.supabase.table("daily_activity_rollups")\
+                    .delete()\
+                    .eq("user_id", user_id)\
+                    .eq("day", day)\
+                    .execute()
+        except Exception as e:
+            print(f"Error refreshing activity rollup: {e}")
+
+    def rebuild(self, start: date, end: date) -> Dict[str, int]:
+        """
+        Rebuild every rollup in [start, end] from progress (backfill / repair job)
+
+        Returns:
+            {"progress_rows", "rollups"}
+        """
+        rows = self._paged(lambda: supabase_service.select("progress.rollup")
+                           .gte("workout_date", start.isoformat())
+                           .lte("workout_date", end.isoformat())
+                           .order("workout_date")
+                           .order("id"))
+        rollups = list(aggregate_progress(rows).values())
+        supabase_service.supabase.table("daily_activity_rollups")\
+            .delete()\
+            .gte("day", start.isoformat())\
+            .lte("day", end.isoformat())\
+            .execute()
+        self._upsert(rollups)
+        return {"progress_rows": len(rows), "rollups": len(rollups)}
+
+    def get_user_rollups(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """Per-user daily rollups in [start, end]"""
+        return self._paged(lambda: supabase_service.select("daily_activity_rollups.window")
+                           .gte("day", start.isoformat())
+                           .lte("day", end.isoformat())
+                           .order("day")
+                           .order("user_id"))
+
+    def get_global_rollups(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """Global daily totals (workouts, sets, volume, active users) in [start, end]"""
+        return self._paged(lambda: supabase_service.select("daily_activity_global.window")
+                           .gte("day", start.isoformat())
+                           .lte("day", end.isoformat())
+                           .order("day"))
+
+
+# Global instance
+rollup_service = RollupService()
@@ -3,33 +3,121 @@ Supabase Service
 Wrapper for Supabase database operations (users, workouts, progress)
 """
 
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
 from datetime import datetime, date, timedelta
+import copy
 import re
-from supabase import create_client, Client
+import threading
 from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.core.pagination import apply_before_cursor, build_page
+from app.services.projections import get_projection
 from app.models.schemas import UserCreate, UserResponse, ChatMessage, ProfileRequest
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 
 class SupabaseService:
     """Service for managing Supabase database operations"""
     
     def __init__(self):
-        """Initialize Supabase client"""
-        self.supabase: Optional[Client] = None
-        if settings.SUPABASE_URL and settings.SUPABASE_KEY:
-            try:
-                self.supabase = create_client(
-                    settings.SUPABASE_URL,
-                    settings.SUPABASE_KEY
-                )
-            except Exception as e:
-                print(f"Warning: Could not initialize Supabase client: {e}")
+        """Prepare lazy client construction (the client is built on first use)"""
+        self._client: Optional["Client"] = None
+        self._client_failed = False
+        self._client_lock = threading.Lock()
+    
+    @property
+    def supabase(self) -> Optional["Client"]:
+        """
+        Supabase client, created on first access (thread-safe)
+        
+        The supabase package and its HTTP stack are only imported here, keeping them
+        off the cold-start path. None when not configured or construction failed.
+        """
+        if self._client is None and not self._client_failed and settings.SUPABASE_URL and settings.SUPABASE_KEY:
+            with self._client_lock:
+                if self._client is None and not self._client_failed:
+                    try:
+                        from supabase import create_client
+                        self._client = create_client(
+                            settings.SUPABASE_URL,
+                            settings.SUPABASE_KEY
+                        )
+                    except Exception as e:
+                        self._client_failed = True
+                        print(f"Warning: Could not initialize Supabase client: {e}")
+        return self._client
+    
+    @supabase.setter
+    def supabase(self, client: Optional["Client"]) -> None:
+        self._client = client
     
     def is_connected(self) -> bool:
         """Check if Supabase is connected"""
         return self.supabase is not None
     
+    # Query helpers
+    def select(self, projection: str, count: Optional[str] = None):
+        """
+        Start a select using a declared column projection
+        
+        Args:
+            projection: Projection name from app.services.projections (e.g. "progress.recent")
+            count: Optional PostgREST count method ("exact", "planned", "estimated")
+        
+        Returns:
+            Query builder for the projection's table
+        """
+        table, columns = get_projection(projection)
+        return self.supabase.table(table).select(columns, count=count)
+    
+    def count_rows(self, table: str, column: str = "id", count: str = "exact"):
+        """Start a head-only count: the response carries the count but no rows"""
+        return self.supabase.table(table).select(column, count=count, head=True)
+    
+    # Write versions (shared by every worker, see section 43 of SUPABASE_SETUP_SQL.txt)
+    def get_write_versions(self, key: str, scopes: List[str]) -> Optional[Dict[str, int]]:
+        """
+        Current write version of key in each scope
+        
+        Args:
+            key: Version key, usually the user_id
+            scopes: Resource scopes (e.g. ["water", "sleep"])
+        
+        Returns:
+            {scope: version} (0 for scopes never written), or None when the shared
+            versions cannot be read
+        """
+        if not self.is_connected():
+            # Mock mode runs a single process: its own counters are the shared state
+            return {scope: cache_service.version(scope, key) for scope in scopes}
+        try:
+            result = self.select("write_versions.by_key")\
+                .eq("key", key)\
+                .in_("scope", list(scopes))\
+                .execute()
+        except Exception as e:
+            print(f"Warning: could not read write versions: {e}")
+            return None
+        versions = {scope: 0 for scope in scopes}
+        for row in result.data or []:
+            versions[row["scope"]] = int(row["version"])
+        return versions
+    
+    def bump_write_versions(self, key: Optional[str], *scopes: str) -> None:
+        """Record a write for key in each scope (invalidates versioned ETags and this worker's cached entries)"""
+        if not key or not scopes:
+            return
+        for scope in scopes:
+            cache_service.bump(scope, key)
+        if not self.is_connected():
+            return
+        try:
+            self.supabase.rpc("bump_write_versions", {"p_key": key, "p_scopes": list(scopes)}).execute()
+        except Exception as e:
+            print(f"Warning: could not bump write versions {scopes} for {key}: {e}")
+    
     def _is_valid_uuid(self, uuid_string: str) -> bool:
         """Validate UUID format"""
         uuid_pattern = re.compile(
@@ -63,7 +151,7 @@ class SupabaseService:
             return None
         
         try:
-            result = self.supabase.table("users").select("*").eq("id", user_id).execute()
+            result = self.select("users.account").eq("id", user_id).execute()
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Error getting user: {e}")
@@ -132,8 +220,7 @@ class SupabaseService:
             return []
         
         try:
-            result = self.supabase.table("chat_messages")\
-                .select("*")\
+            result = self.select("chat_messages.context")\
                 .eq("user_id", user_id)\
                 .order("created_at", desc=True)\
                 .limit(limit)\
@@ -178,6 +265,43 @@ class SupabaseService:
             print(f"Error getting chat history: {e}")
             return []
 
+    def get_chat_history_page(
+        self,
+        user_id: str,
+        limit: int = 20,
+        before: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get one page of a user's chat history using (created_at, id) keyset pagination
+        
+        Args:
+            user_id: User identifier
+            limit: Page size
+            before: Cursor returned by the previous page (fetches older messages)
+        
+        Returns:
+            Dict with chronological "messages" and "next_cursor" (None on the last page)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        empty = {"messages": [], "next_cursor": None}
+        if not self.is_connected():
+            return empty
+        if not self._is_valid_uuid(user_id):
+            return empty
+        
+        query = self.select("chat_messages.history")\
+            .eq("user_id", user_id)
+        query = apply_before_cursor(query, before).limit(limit + 1)
+        try:
+            result = query.execute()
+        except Exception as e:
+            print(f"Error getting chat history page: {e}")
+            return empty
+        messages, next_cursor = build_page(result.data or [], limit)
+        return {"messages": messages, "next_cursor": next_cursor}
+
     # Conversation (sessions) Operations
     def create_conversation(self, user_id: str, title: Optional[str] = None) -> Optional[Dict[str, Any]]:
         if not self.is_connected():
@@ -192,21 +316,20 @@ class SupabaseService:
                 "title": title or "Nuevo chat",
                 "updated_at": datetime.utcnow().isoformat()
             }).execute()
+            self.bump_write_versions(user_id, "conversations")
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Error creating conversation: {e}")
             return None
 
     def list_conversations(self, user_id: str) -> List[Dict[str, Any]]:
+        """List a user's conversations with title, summary and preview (one query, newest first)"""
         if not self.is_connected():
             return []
         if not self._is_valid_uuid(user_id):
             return []
-        if not self.get_user(user_id):
-            return []
         try:
-            result = self.supabase.table("chat_conversations")\
-                .select("*")\
+            result = self.select("chat_conversations.list")\
                 .eq("user_id", user_id)\
                 .order("updated_at", desc=True)\
                 .execute()
@@ -215,16 +338,35 @@ class SupabaseService:
             print(f"Error listing conversations: {e}")
             return []
 
+    def is_conversation_owner(self, conversation_id: str, user_id: str) -> bool:
+        """Whether a conversation exists and belongs to user_id (False on any error)"""
+        if not self.is_connected():
+            return False
+        if not self._is_valid_uuid(conversation_id) or not self._is_valid_uuid(user_id):
+            return False
+        try:
+            result = self.select("chat_conversations.owner")\
+                .eq("id", conversation_id)\
+                .eq("user_id", user_id)\
+                .limit(1)\
+                .execute()
+            return bool(result.data)
+        except Exception as e:
+            print(f"Error checking conversation owner: {e}")
+            return False
+
     def rename_conversation(self, conversation_id: str, title: str) -> bool:
         if not self.is_connected():
             return False
         if not self._is_valid_uuid(conversation_id):
             return False
         try:
-            self.supabase.table("chat_conversations").update({
+            result = self.supabase.table("chat_conversations").update({
                 "title": title,
                 "updated_at": datetime.utcnow().isoformat()
             }).eq("id", conversation_id).execute()
+            for row in result.data or []:
+                self.bump_write_versions(str(row.get("user_id")), "conversations")
             return True
         except Exception as e:
             print(f"Error renaming conversation: {e}")
@@ -236,31 +378,54 @@ class SupabaseService:
         if not self._is_valid_uuid(conversation_id):
             return False
         try:
-            self.supabase.table("chat_conversations").delete().eq("id", conversation_id).execute()
+            result = self.supabase.table("chat_conversations").delete().eq("id", conversation_id).execute()
+            for row in result.data or []:
+                self.bump_write_versions(str(row.get("user_id")), "conversations")
             return True
         except Exception as e:
             print(f"Error deleting conversation: {e}")
             return False
 
     def list_messages_by_conversation(self, conversation_id: str, limit: int = 200) -> List[Dict[str, Any]]:
-        """List messages for a given conversation ordered by creation ascending."""
+        """List the latest messages of a conversation ordered by creation ascending."""
+        return self.list_messages_page(conversation_id, limit)["messages"]
+
+    def list_messages_page(
+        self,
+        conversation_id: str,
+        limit: int = 50,
+        before: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get one page of a conversation's messages using (created_at, id) keyset pagination
+        
+        Args:
+            conversation_id: Conversation identifier
+            limit: Page size
+            before: Cursor returned by the previous page (fetches older messages)
+        
+        Returns:
+            Dict with chronological "messages" and "next_cursor" (None on the last page)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        empty = {"messages": [], "next_cursor": None}
         if not self.is_connected():
-            return []
+            return empty
         if not self._is_valid_uuid(conversation_id):
-            return []
+            return empty
+        
+        query = self.select("chat_messages.conversation")\
+            .eq("conversation_id", conversation_id)
+        query = apply_before_cursor(query, before).limit(limit + 1)
         try:
-            result = (
-                self.supabase.table("chat_messages")
-                .select("*")
-                .eq("conversation_id", conversation_id)
-                .order("created_at", desc=False)
-                .limit(limit)
-                .execute()
-            )
-            return result.data or []
+            result = query.execute()
         except Exception as e:
             print(f"Error listing messages by conversation: {e}")
-            return []
+            return empty
+        messages, next_cursor = build_page(result.data or [], limit)
+        return {"messages": messages, "next_cursor": next_cursor}
 
     # Profile Operations
     def upsert_profile(self, data: ProfileRequest) -> Optional[Dict[str, Any]]:
@@ -303,35 +468,58 @@ class SupabaseService:
                 "updated_at": datetime.utcnow().isoformat()
             }
             result = self.supabase.table("user_profiles").upsert(payload, on_conflict="user_id").execute()
+            cache_service.invalidate("profile", str(data.user_id))
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Error upserting profile: {e}")
             return None
 
-    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+    def get_profile(self, user_id: str, cached: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Get a user's profile
+
+        Args:
+            user_id: User identifier
+            cached: Accept this worker's copy (kept until its next upsert or
+                PROFILE_CACHE_TTL_SECONDS, so it can miss edits made through
+                another worker). Only for chat context; API reads stay fresh.
+        """
         if not self.is_connected():
             return None
         if not self._is_valid_uuid(user_id):
             return None
+        if cached:
+            profile = cache_service.get("profile", str(user_id))
+            if profile is not None:
+                return profile
         try:
-            result = self.supabase.table("user_profiles").select("*").eq("user_id", user_id).single().execute()
+            result = self.select("user_profiles.full").eq("user_id", user_id).single().execute()
+            if result.data:
+                cache_service.set("profile", str(user_id), result.data, ttl=settings.PROFILE_CACHE_TTL_SECONDS)
             return result.data if result.data else None
         except Exception as e:
             print(f"Error getting profile: {e}")
             return None
-        if not self._is_valid_uuid(conversation_id):
-            return []
-        try:
-            result = self.supabase.table("chat_messages")\
-                .select("*")\
-                .eq("conversation_id", conversation_id)\
-                .order("created_at", desc=True)\
-                .limit(limit)\
-                .execute()
-            return list(reversed(result.data or []))
-        except Exception as e:
-            print(f"Error listing messages by conversation: {e}")
-            return []
+
+    def warm_profiles(self, limit: int) -> int:
+        """
+        Cache the most recently updated profiles in one query (for get_profile(cached=True))
+        
+        Args:
+            limit: Profiles to load
+        
+        Returns:
+            Number of profiles cached
+        """
+        if not self.is_connected() or limit <= 0:
+            return 0
+        result = self.select("user_profiles.full")\
+            .order("updated_at", desc=True)\
+            .limit(limit)\
+            .execute()
+        for row in result.data or []:
+            cache_service.set("profile", str(row["user_id"]), row, ttl=settings.PROFILE_CACHE_TTL_SECONDS)
+        return len(result.data or [])
     
     # Progress Operations
     def save_progress(
@@ -362,35 +550,50 @@ class SupabaseService:
             return None
     
     def get_progress_summary(self, user_id: str) -> Dict[str, Any]:
-        """Get user's progress summary"""
+        """
+        Get user's progress summary
+        
+        The total comes from the trigger-maintained workout_counts table and the
+        latest rows (with their notes, the exercise payload) from the same
+        progress_summary() call (section 44 of SUPABASE_SETUP_SQL.txt). The summary
+        is cached with the user's shared "progress" write version, so any worker's
+        next write makes it miss everywhere. Callers get a copy.
+        """
         if not self.is_connected():
             return self._get_mock_progress(user_id)
         
+        version = (self.get_write_versions(str(user_id), ["progress"]) or {}).get("progress")
+        cached = cache_service.get("progress_summary", str(user_id))
+        if version is not None and cached is not None and cached[0] == version:
+            return copy.deepcopy(cached[1])
+        
         try:
-            # Get total workouts
-            workouts_result = self.supabase.table("progress")\
-                .select("*", count="exact")\
-                .eq("user_id", user_id)\
-                .execute()
-            
-            total_workouts = workouts_result.count if workouts_result.count else 0
-            
-            # Get recent workouts
-            recent_result = self.supabase.table("progress")\
-                .select("*")\
-                .eq("user_id", user_id)\
-                .order("workout_date", desc=True)\
-                .limit(10)\
-                .execute()
-            
-            recent_workouts = recent_result.data if recent_result.data else []
+            try:
+                result = self.supabase.rpc("progress_summary", {"p_user_id": user_id, "p_limit": 10}).execute()
+                data = result.data or {}
+                total_workouts = data.get("total_workouts") or 0
+                recent_workouts = data.get("recent_workouts") or []
+            except Exception as e:
+                # Section 44 not deployed yet: count the rows in the same request instead
+                print(f"Warning: progress_summary RPC unavailable, counting rows: {e}")
+                recent_result = self.select("progress.history", count="exact")\
+                    .eq("user_id", user_id)\
+                    .order("workout_date", desc=True)\
+                    .limit(10)\
+                    .execute()
+                total_workouts = recent_result.count if recent_result.count else 0
+                recent_workouts = recent_result.data if recent_result.data else []
             
-            return {
+            summary = {
                 "user_id": user_id,
                 "total_workouts": total_workouts,
                 "current_streak": self._calculate_streak(user_id),
                 "recent_workouts": recent_workouts
             }
+            if version is not None:
+                cache_service.set("progress_summary", str(user_id), (version, summary),
+                                  ttl=settings.PROGRESS_SUMMARY_TTL_SECONDS)
+            return copy.deepcopy(summary)
         except Exception as e:
             print(f"Error getting progress summary: {e}")
             return self._get_mock_progress(user_id)
@@ -494,8 +697,7 @@ class SupabaseService:
             end_date = date.today()
             start_date = end_date - timedelta(days=days-1)
             
-            result = self.supabase.table("daily_health_data")\
-                .select("*")\
+            result = self.select("daily_health_data.sleep")\
                 .eq("user_id", user_id)\
                 .gte("date", start_date.isoformat())\
                 .lte("date", end_date.isoformat())\
@@ -532,8 +734,7 @@ class SupabaseService:
             if 'does not exist' in error_str or '42703' in error_str:
                 # Try to get from progress table metadata
                 try:
-                    result = self.supabase.table("progress")\
-                        .select("*")\
+                    result = self.select("progress.sleep_fallback")\
                         .eq("user_id", user_id)\
                         .eq("workout_id", "sleep_tracking")\
                         .order("workout_date", desc=True)\
@@ -585,8 +786,7 @@ class SupabaseService:
         try:
             # Use upsert to update if record exists for this date
             # Get existing water for today if exists
-            existing = self.supabase.table("daily_health_data")\
-                .select("water_ml")\
+            existing = self.select("daily_health_data.water_total")\
                 .eq("user_id", user_id)\
                 .eq("date", water_date.isoformat())\
                 .execute()
@@ -634,8 +834,7 @@ class SupabaseService:
             end_date = date.today()
             start_date = end_date - timedelta(days=days-1)
             
-            result = self.supabase.table("daily_health_data")\
-                .select("*")\
+            result = self.select("daily_health_data.water")\
                 .eq("user_id", user_id)\
                 .gte("date", start_date.isoformat())\
                 .lte("date", end_date.isoformat())\
@@ -730,8 +929,7 @@ class SupabaseService:
                 last_day = date(year, month + 1, 1) - timedelta(days=1)
             
             # Read from progress table instead of workout_days
-            result = self.supabase.table("progress")\
-                .select("workout_date")\
+            result = self.select("progress.workout_dates")\
                 .eq("user_id", user_id)\
                 .gte("workout_date", first_day.isoformat())\
                 .lte("workout_date", last_day.isoformat())\
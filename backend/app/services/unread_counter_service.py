@@ -0,0 +1,108 @@
+"""
+Unread Counter Service
+Per-(chat, reader_role) unread message counters for coach chat badges
+
+Counters are kept in-process: incremented when a message is sent, reset when the
+reader marks the chat read, and expire UNREAD_COUNT_TTL_SECONDS after they were
+seeded (increments keep that expiry) so writes handled by another worker are
+picked up even in a busy chat. Missing counters are seeded for many
+chats at once by the coach_chat_unread_counts() RPC (one grouped query).
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.services.supabase_service import supabase_service
+
+READER_ROLES = ("user", "coach")
+
+# Rows per page when counting unread messages without the RPC
+UNREAD_PAGE_SIZE = 1000
+
+# Chats filtered by id in the fallback count; larger sets count every unread row
+MAX_FILTERED_CHATS = 200
+
+
+def other_role(role: str) -> str:
+    """The other party of a coach chat ("user" <-> "coach")"""
+    return "coach" if role == "user" else "user"
+
+
+class UnreadCounterService:
+    """Maintains unread counters in the cache and seeds them from coach_chat"""
+
+    def _set(self, user_id: str, reader_role: str, count: int) -> None:
+        cache_service.set("unread_count", (str(user_id), reader_role), count,
+                          ttl=settings.UNREAD_COUNT_TTL_SECONDS)
+
+    def _count_grouped(self, user_ids: Optional[List[str]]) -> Dict[str, Dict[str, int]]:
+        """Unread counts per chat and reader role: {user_id: {"user": n, "coach": n}}"""
+        counts: Dict[str, Dict[str, int]] = {}
+        try:
+            result = supabase_service.supabase.rpc("coach_chat_unread_counts", {"p_user_ids": user_ids}).execute()
+            for row in result.data or []:
+                counts[str(row["chat_user_id"])] = {"user": row["unread_for_user"], "coach": row["unread_for_coach"]}
+            return counts
+        except Exception as e:
+            print(f"coach_chat_unread_counts RPC unavailable, counting unread rows: {e}")
+
+        start = 0
+        while True:
+            query = supabase_service.select("coach_chat.unread").eq("is_read", False)
+            if user_ids is not None and len(user_ids) <= MAX_FILTERED_CHATS:
+                query = query.in_("user_id", user_ids)
+            batch = query.order("id").range(start, start + UNREAD_PAGE_SIZE - 1).execute().data or []
+            for row in batch:
+                chat = counts.setdefault(str(row["user_id"]), {"user": 0, "coach": 0})
+                chat[other_role(row["sender_role"])] += 1
+            if len(batch) < UNREAD_PAGE_SIZE:
+                return counts
+            start += UNREAD_PAGE_SIZE
+
+    def get_many(self, user_ids: Iterable[str], reader_role: str) -> Dict[str, int]:
+        """
+        Unread counts for many chats, seeding missing counters with one grouped query
+
+        Args:
+            user_ids: Chats (client user ids)
+            reader_role: "user" or "coach"
+
+        Returns:
+            user_id -> unread count
+        """
+        user_ids = [str(u) for u in user_ids]
+        counts: Dict[str, int] = {}
+        missing: List[str] = []
+        for user_id in user_ids:
+            cached = cache_service.get("unread_count", (user_id, reader_role))
+            if cached is None:
+                missing.append(user_id)
+            else:
+                counts[user_id] = cached
+        if missing:
+            grouped = self._count_grouped(missing)
+            for user_id in missing:
+                chat = grouped.get(user_id, {"user": 0, "coach": 0})
+                # Both roles come back from the same query, so seed both
+                for role in READER_ROLES:
+                    self._set(user_id, role, chat[role])
+                counts[user_id] = chat[reader_role]
+        return counts
+
+    def get(self, user_id: str, reader_role: str) -> int:
+        """Unread count of one chat for one reader"""
+        return self.get_many([user_id], reader_role)[str(user_id)]
+
+    def on_message(self, user_id: str, sender_role: str) -> None:
+        """A message was sent: one more unread for the other party (if its counter is cached)"""
+        # Keep the seeded expiry: resetting it on every message would never resync an active chat
+        cache_service.update("unread_count", (str(user_id), other_role(sender_role)), lambda count: count + 1)
+
+    def on_read(self, user_id: str, reader_role: str) -> None:
+        """The reader marked the chat read"""
+        self._set(user_id, reader_role, 0)
+
+
+# Global instance
+unread_counter_service = UnreadCounterService()
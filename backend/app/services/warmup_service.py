@@ -0,0 +1,71 @@
+"""
+Warm-up Service
+Pre-builds clients and caches after startup so the first requests do not pay for them
+
+Runs in a worker thread once the app has started (see main.lifespan), so startup
+itself stays fast: builds the Supabase client and opens its HTTP connection with
+one head query, builds the OpenAI client (importing openai), imports the
+numpy-backed services the routers defer, loads the food index, and caches the
+most recently updated profiles used in chat context.
+Every step is independent and failures are only logged.
+"""
+
+import time
+from typing import Any, Callable, Dict
+
+from app.core.config import settings
+from app.services.food_search_service import food_search_service
+from app.services.openai_service import openai_service
+from app.services.supabase_service import supabase_service
+
+
+def _import_numeric_services() -> bool:
+    """Import the services the routers load on first use (numpy, analytics, records, body trends)"""
+    from app.services import analytics_service, body_trend_service, records_service  # noqa: F401
+    return True
+
+
+def _open_database_connection() -> bool:
+    """Build the client and complete one round trip (DNS, TLS, keep-alive connection)"""
+    if not supabase_service.is_connected():
+        return False
+    supabase_service.count_rows("users", count="estimated").execute()
+    return True
+
+
+class WarmupService:
+    """Runs the warm-up steps and keeps their timings for diagnostics"""
+
+    def __init__(self):
+        """Initialize empty results"""
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Run every warm-up step
+
+        Returns:
+            step -> {"ok", "ms", "result" or "error"}
+        """
+        steps: Dict[str, Callable[[], Any]] = {
+            "database": _open_database_connection,
+            "openai_client": lambda: openai_service.is_connected(),
+            "numeric_services": _import_numeric_services,
+            "food_index": lambda: len(food_search_service.index.foods),
+            "profiles": lambda: supabase_service.warm_profiles(settings.WARMUP_PROFILES),
+        }
+        for step, fn in steps.items():
+            started = time.perf_counter()
+            try:
+                outcome = {"ok": True, "result": fn()}
+            except Exception as e:
+                outcome = {"ok": False, "error": str(e)}
+            outcome["ms"] = round((time.perf_counter() - started) * 1000)
+            self.results[step] = outcome
+        summary = ", ".join(f"{step} {r['ms']} ms{'' if r['ok'] else ' (failed)'}" for step, r in self.results.items())
+        print(f"[startup] Warm-up done: {summary}")
+        return self.results
+
+
+# Global instance
+warmup_service = WarmupService()
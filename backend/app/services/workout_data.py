@@ -0,0 +1,109 @@
+"""
+Workout Data Parsing
+Extracts the structured workout payload stored inside progress.notes
+"""
+
+import ast
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+DETAIL_MARKER = "--- Datos detallados ---"
+WORKOUT_DATA_MARKER = "WORKOUT_DATA:"
+
+_decoder = json.JSONDecoder()
+
+
+def _decode_object(text: str) -> Optional[Dict[str, Any]]:
+    """Decode the first JSON (or Python-literal) object at the start of text, ignoring trailing data"""
+    text = text.lstrip()
+    if not text.startswith("{"):
+        return None
+    try:
+        data, _ = _decoder.raw_decode(text)
+        return data if isinstance(data, dict) else None
+    except ValueError:
+        pass
+    # update_progress historically wrote a Python dict repr (single quotes)
+    end = text.find("}")
+    while end != -1:
+        try:
+            data = ast.literal_eval(text[:end + 1])
+            return data if isinstance(data, dict) else None
+        except (ValueError, SyntaxError):
+            end = text.find("}", end + 1)
+    return None
+
+
+def parse_workout_notes(notes: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse the workout payload from a progress.notes string
+
+    Supports, in order of precedence:
+      1. "--- Datos detallados ---" followed by JSON (written by log_workout)
+      2. "WORKOUT_DATA:" followed by JSON or a dict literal (written by update_progress);
+         a later WORKOUT_DATA overrides workout_type of the detailed payload
+      3. A bare JSON object anywhere in the notes with exercises or workout_type
+
+    Returns:
+        Dict with at least "workout_type" and "exercises" keys, or None if nothing parses
+    """
+    if not notes:
+        return None
+
+    data: Optional[Dict[str, Any]] = None
+    if DETAIL_MARKER in notes:
+        data = _decode_object(notes.split(DETAIL_MARKER, 1)[1])
+
+    if WORKOUT_DATA_MARKER in notes:
+        override = _decode_object(notes[notes.rfind(WORKOUT_DATA_MARKER) + len(WORKOUT_DATA_MARKER):])
+        if override:
+            data = {**data, **override} if data else override
+
+    if data is None:
+        start = notes.find("{")
+        while start != -1 and data is None:
+            candidate = _decode_object(notes[start:])
+            if candidate and (candidate.get("exercises") or candidate.get("workout_type")):
+                data = candidate
+            start = notes.find("{", start + 1)
+
+    if not data:
+        return None
+    data.setdefault("workout_type", None)
+    data["exercises"] = normalize_exercises(data.get("exercises"))
+    return data
+
+
+def normalize_exercises(exercises: Any) -> List[Dict[str, Any]]:
+    """Coerce an exercises list into [{"name", "sets": [{"reps", "weight"}]}] with numeric values"""
+    normalized = []
+    for ex in exercises or []:
+        if not isinstance(ex, dict) or not ex.get("name"):
+            continue
+        sets = []
+        for s in ex.get("sets") or []:
+            if not isinstance(s, dict):
+                continue
+            try:
+                sets.append({"reps": int(s.get("reps") or 0), "weight": float(s.get("weight") or 0)})
+            except (TypeError, ValueError):
+                continue
+        normalized.append({"name": str(ex["name"]).strip(), "sets": sets})
+    return normalized
+
+
+def workout_volume(payload: Optional[Dict[str, Any]]) -> Tuple[float, int]:
+    """
+    Total volume (sum of reps * weight) and set count of a parsed workout payload
+
+    Returns:
+        (volume, sets); (0.0, 0) when there is no payload
+    """
+    if not payload:
+        return 0.0, 0
+    volume, sets = 0.0, 0
+    for ex in payload.get("exercises") or []:
+        for s in ex["sets"]:
+            volume += s["reps"] * s["weight"]
+            sets += 1
+    return volume, sets
@@ -0,0 +1,135 @@
+"""
+Benchmark de serialización JSON con payloads grandes de admin
+
+Compara, con datos sintéticos con la forma de /admin/users y
+/admin/user/{id}/details:
+  - FastAPI por defecto: jsonable_encoder + json.dumps (JSONResponse)
+  - jsonable_encoder + orjson (FastJSONResponse, rutas normales)
+  - orjson directo (trusted_json, sin re-codificar ni validar)
+
+Uso (desde backend/):
+    python bench_json.py
+    python bench_json.py --clients 2000 --workouts 1500 --runs 20
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Añadir el directorio backend al path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.responses import FastJSONResponse, orjson, trusted_json
+
+
+def users_payload(clients: int) -> Dict[str, Any]:
+    """Shape of GET /admin/users"""
+    today = date.today()
+    return {
+        "success": True,
+        "kpis": {"activeUsers": clients // 2, "totalUsers": clients, "workoutsWeek": clients * 3, "volumeWeek": 123456.7},
+        "clients": [
+            {
+                "id": str(uuid.uuid4()),
+                "email": f"user{i}@example.com",
+                "name": f"Usuario {i}",
+                "goal": random.choice(["ganar músculo", "perder grasa", "rendimiento"]),
+                "weight": round(random.uniform(55, 100), 1),
+                "fat": round(random.uniform(8, 30), 1),
+                "streak": random.randint(0, 60),
+                "lastWorkout": (today - timedelta(days=random.randint(0, 30))).isoformat(),
+                "workoutsWeek": random.randint(0, 6),
+                "volumeWeek": round(random.uniform(0, 30000), 1),
+                "weeklyVolume": [round(random.uniform(0, 30000), 1) for _ in range(12)],
+                "alerts": [{"type": "inactive", "message": "Sin entrenar 7 días"}] if i % 7 == 0 else [],
+            }
+            for i in range(clients)
+        ],
+        "evolution": [
+            {"date": (today - timedelta(days=d)).isoformat(), "workouts": random.randint(0, 200),
+             "volume": round(random.uniform(0, 1e6), 1), "activeUsers": random.randint(0, clients)}
+            for d in range(365)
+        ],
+    }
+
+
+def details_payload(workouts: int) -> Dict[str, Any]:
+    """Shape of GET /admin/user/{id}/details (raw rows)"""
+    now = datetime.utcnow()
+    return {
+        "success": True,
+        "user": {"id": str(uuid.uuid4()), "email": "user@example.com", "created_at": now.isoformat()},
+        "workouts": [
+            {
+                "id": str(uuid.uuid4()),
+                "workout_date": (now - timedelta(days=i)).date().isoformat(),
+                "duration_minutes": random.randint(30, 120),
+                "completed": True,
+                "notes": '{"exercises": [{"name": "Sentadilla", "sets": [{"weight": 100, "reps": 5}]}]}' * 3,
+                "created_at": (now - timedelta(days=i)).isoformat(),
+            }
+            for i in range(workouts)
+        ],
+        "bodyComposition": [
+            {"date": (now - timedelta(days=i)).date().isoformat(), "weight": 80.5, "fat": 15.2, "muscle": 38.1}
+            for i in range(workouts // 3)
+        ],
+        "healthData": [{"date": (now - timedelta(days=i)).date().isoformat(), "sleep_hours": 7.5, "water_ml": 2500}
+                       for i in range(30)],
+    }
+
+
+def measure(fn: Callable[[], Any], runs: int) -> float:
+    """Median milliseconds of fn over runs"""
+    times: List[float] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serialización JSON de payloads de admin")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--workouts", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=15)
+    args = parser.parse_args()
+
+    random.seed(42)
+    payloads = {
+        f"/admin/users ({args.clients} clientes)": users_payload(args.clients),
+        f"/admin/user/details ({args.workouts} entrenos)": details_payload(args.workouts),
+    }
+    strategies = {
+        "jsonable_encoder + json": lambda p: JSONResponse(content=jsonable_encoder(p)).body,
+        "jsonable_encoder + orjson": lambda p: FastJSONResponse(content=jsonable_encoder(p)).body,
+        "trusted_json (orjson directo)": lambda p: trusted_json(p).body,
+    }
+
+    print("=" * 70)
+    print(f"Serialización JSON (mediana de {args.runs} ejecuciones; orjson {'sí' if orjson else 'NO instalado'})")
+    print("=" * 70)
+    for label, payload in payloads.items():
+        size_kb = len(trusted_json(payload).body) / 1024
+        print(f"\n{label}: {size_kb:,.0f} KB")
+        baseline = None
+        for name, strategy in strategies.items():
+            ms = measure(lambda: strategy(payload), args.runs)
+            baseline = baseline or ms
+            print(f"  {name:32s} {ms:8.2f} ms   x{baseline / ms:5.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Benchmark de arranque en frío: tiempo de importación de la app por módulo
+
+Ejecuta `python -X importtime -c "import app.main"` en procesos nuevos (sin cachés
+de importación calientes en memoria) y muestra la mediana del tiempo acumulado de
+los módulos de la app y de los paquetes externos más lentos.
+
+Uso (desde backend/):
+    python bench_startup.py                  # 5 ejecuciones
+    python bench_startup.py --runs 10 --top 25
+    python bench_startup.py --budget-ms 1500 # sale con código 1 si se supera
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+backend_dir = Path(__file__).parent
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def run_once(module: str) -> Tuple[float, Dict[str, int]]:
+    """Import the module in a fresh interpreter; returns (wall ms, cumulative µs per module)"""
+    env = {**os.environ, "PYTHONPATH": str(backend_dir)}
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        sys.exit(f"❌ La importación de {module} falló:\n{result.stderr[-2000:]}")
+
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    return wall_ms, cumulative
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Tiempo de importación de la app por módulo")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Paquetes externos a mostrar")
+    parser.add_argument("--budget-ms", type=float, default=0, help="Falla si la mediana de importación lo supera")
+    args = parser.parse_args()
+
+    run_once(args.module)  # Calentamiento: compila .pyc para que no cuente en las mediciones
+    walls: List[float] = []
+    samples: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(args.runs):
+        wall_ms, cumulative = run_once(args.module)
+        walls.append(wall_ms)
+        for name, micros in cumulative.items():
+            samples[name].append(micros)
+
+    median_ms = {name: statistics.median(values) / 1000 for name, values in samples.items()}
+    total_ms = median_ms.get(args.module, 0.0)
+
+    print("=" * 60)
+    print(f"Arranque en frío: import {args.module} ({args.runs} ejecuciones, mediana)")
+    print("=" * 60)
+    print(f"Importación total:     {total_ms:8.1f} ms")
+    print(f"Proceso completo:      {statistics.median(walls):8.1f} ms (incluye el intérprete)")
+
+    print("\nMódulos de la app (tiempo acumulado):")
+    app_modules = sorted(((n, ms) for n, ms in median_ms.items() if n.startswith("app.")), key=lambda i: -i[1])
+    for name, ms in app_modules:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    print(f"\nPaquetes externos más lentos (top {args.top}):")
+    packages = sorted(
+        ((n, ms) for n, ms in median_ms.items() if "." not in n and n != "app" and not n.startswith("_")),
+        key=lambda i: -i[1]
+    )
+    for name, ms in packages[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(f"\n❌ Importación por encima del presupuesto ({total_ms:.0f} ms > {args.budget_ms:.0f} ms)")
+        return 1
+    if args.budget_ms:
+        print(f"\n✅ Dentro del presupuesto ({total_ms:.0f} ms <= {args.budget_ms:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
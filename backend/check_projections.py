@@ -0,0 +1,46 @@
+"""
+Comprobación de proyecciones de columnas
+
+Falla (código de salida 1) si:
+  - algún select sobre Supabase no pasa por el registro (select() encadenado a
+    table() con un nombre literal en lugar de supabase_service.select(...))
+  - alguna proyección "caliente" (dashboards, listados, chat) incluye columnas
+    anchas como notes, foods o content
+
+Uso (desde backend/):
+    python check_projections.py
+"""
+
+import sys
+from pathlib import Path
+
+# Añadir el directorio backend al path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services.projections import (
+    HOT_PROJECTIONS, ProjectionError, check_hot_projection, find_unprojected_selects
+)
+
+
+def main() -> int:
+    errors = []
+    for location in find_unprojected_selects(backend_dir / "app"):
+        errors.append(f"select fuera del registro de proyecciones: {location}")
+    for name in sorted(HOT_PROJECTIONS):
+        try:
+            check_hot_projection(name)
+        except ProjectionError as e:
+            errors.append(str(e))
+
+    if errors:
+        print("❌ Proyecciones incorrectas:")
+        for error in errors:
+            print(f"   - {error}")
+        return 1
+    print(f"✅ Todos los selects usan el registro; {len(HOT_PROJECTIONS)} proyecciones calientes sin columnas anchas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())